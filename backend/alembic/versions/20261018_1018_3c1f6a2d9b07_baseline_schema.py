@@ -0,0 +1,145 @@
+"""baseline schema
+
+在引入迁移之前，数据库由 scripts/init_db.py 的 create_all 创建。
+此迁移只创建缺少的表，已有的表保持不变，之后的迁移在此基础上修改结构。
+
+Revision ID: 3c1f6a2d9b07
+Revises: 
+Create Date: 2026-10-18 10:18:53
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f6a2d9b07'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(table: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    if not _has_table("admins"):
+        op.create_table(
+            "admins",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("username", sa.String(50), nullable=False),
+            sa.Column("password_hash", sa.String(255), nullable=False),
+            sa.Column("email", sa.String(100)),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_admins_id", "admins", ["id"])
+        op.create_index("ix_admins_username", "admins", ["username"], unique=True)
+        op.create_index("ix_admins_email", "admins", ["email"], unique=True)
+
+    if not _has_table("rooms"):
+        op.create_table(
+            "rooms",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("room_code", sa.String(10), nullable=False),
+            sa.Column("room_name", sa.String(100), nullable=False),
+            sa.Column(
+                "status",
+                sa.Enum("WAITING", "PREPARING", "IN_PROGRESS", "COMPLETED", name="roomstatus"),
+                nullable=False,
+            ),
+            sa.Column("max_players", sa.Integer(), nullable=False),
+            sa.Column("team_a_name", sa.String(50)),
+            sa.Column("team_b_name", sa.String(50)),
+            sa.Column("created_by", sa.Integer()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+            sa.Column("completed_at", sa.DateTime(timezone=True)),
+            sa.Column("bp_config", sa.JSON()),
+            sa.Column("bp_state", sa.JSON()),
+            sa.Column("bp_result", sa.JSON()),
+        )
+        op.create_index("ix_rooms_id", "rooms", ["id"])
+        op.create_index("ix_rooms_room_code", "rooms", ["room_code"], unique=True)
+
+    if not _has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("username", sa.String(50), nullable=False),
+            sa.Column(
+                "role",
+                sa.Enum("PLAYER", "CAPTAIN_A", "CAPTAIN_B", "SPECTATOR", name="userrole"),
+                nullable=False,
+            ),
+            sa.Column("team", sa.String(10)),
+            sa.Column("roll_value", sa.Integer()),
+            sa.Column("is_ready", sa.Boolean()),
+            sa.Column("joined_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("last_active_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_room_id", "users", ["room_id"])
+
+    if not _has_table("mappools"):
+        op.create_table(
+            "mappools",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("maps", sa.JSON(), nullable=False),
+            sa.Column("is_default", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_mappools_id", "mappools", ["id"])
+        op.create_index("ix_mappools_room_id", "mappools", ["room_id"])
+
+    if not _has_table("bp_records"):
+        op.create_table(
+            "bp_records",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("round_number", sa.Integer(), nullable=False),
+            sa.Column(
+                "operation_type",
+                sa.Enum("ROLL", "BAN", "PICK", "AUTO", name="bpoperationtype"),
+                nullable=False,
+            ),
+            sa.Column("operator_team", sa.String(10)),
+            sa.Column("map_name", sa.String(50)),
+            sa.Column("operation_data", sa.JSON()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_bp_records_id", "bp_records", ["id"])
+        op.create_index("ix_bp_records_room_id", "bp_records", ["room_id"])
+
+    if not _has_table("operation_logs"):
+        op.create_table(
+            "operation_logs",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("user_id", sa.Integer()),
+            sa.Column("action", sa.String(50), nullable=False),
+            sa.Column("details", sa.JSON()),
+            sa.Column("ip_address", sa.String(50)),
+            sa.Column("user_agent", sa.String(255)),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_operation_logs_id", "operation_logs", ["id"])
+        op.create_index("ix_operation_logs_room_id", "operation_logs", ["room_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("operation_logs")
+    op.drop_table("bp_records")
+    op.drop_table("mappools")
+    op.drop_table("users")
+    op.drop_table("rooms")
+    op.drop_table("admins")
+    sa.Enum(name="bpoperationtype").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="userrole").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="roomstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,37 @@
+"""add rooms.bp_version
+
+BP 状态机的乐观锁版本号，已有房间按 BP 记录数回填。
+
+Revision ID: 8d24e5b7c1a3
+Revises: 3c1f6a2d9b07
+Create Date: 2026-10-18 10:18:53
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d24e5b7c1a3'
+down_revision = '3c1f6a2d9b07'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    if _has_column("rooms", "bp_version"):
+        return
+    op.add_column("rooms", sa.Column("bp_version", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE rooms SET bp_version = "
+        "(SELECT COUNT(*) FROM bp_records WHERE bp_records.room_id = rooms.id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("rooms") as batch:
+        batch.drop_column("bp_version")
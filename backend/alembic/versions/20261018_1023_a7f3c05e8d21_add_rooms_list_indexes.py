@@ -0,0 +1,34 @@
+"""add rooms list indexes
+
+管理后台房间列表按状态筛选（键集分页）和按创建时间范围筛选使用的索引。
+
+Revision ID: a7f3c05e8d21
+Revises: 8d24e5b7c1a3
+Create Date: 2026-10-18 10:23:46
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7f3c05e8d21'
+down_revision = '8d24e5b7c1a3'
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table: str, index: str) -> bool:
+    return index in {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    if not _has_index("rooms", "ix_rooms_status_id"):
+        op.create_index("ix_rooms_status_id", "rooms", ["status", "id"])
+    if not _has_index("rooms", "ix_rooms_created_at"):
+        op.create_index("ix_rooms_created_at", "rooms", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rooms_created_at", table_name="rooms")
+    op.drop_index("ix_rooms_status_id", table_name="rooms")
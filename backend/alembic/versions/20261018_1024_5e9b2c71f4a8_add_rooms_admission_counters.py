@@ -0,0 +1,46 @@
+"""add rooms admission counters
+
+房间准入计数器（总人数、A/B 队人数），已有房间按用户表回填。
+
+Revision ID: 5e9b2c71f4a8
+Revises: a7f3c05e8d21
+Create Date: 2026-10-18 10:24:27
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9b2c71f4a8'
+down_revision = 'a7f3c05e8d21'
+branch_labels = None
+depends_on = None
+
+
+COUNTERS = {
+    "player_count": "",
+    "team_a_count": " AND users.team = 'A'",
+    "team_b_count": " AND users.team = 'B'",
+}
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    for column, condition in COUNTERS.items():
+        if _has_column("rooms", column):
+            continue
+        op.add_column("rooms", sa.Column(column, sa.Integer(), nullable=False, server_default="0"))
+        op.execute(
+            f"UPDATE rooms SET {column} = "
+            f"(SELECT COUNT(*) FROM users WHERE users.room_id = rooms.id{condition})"
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("rooms") as batch:
+        for column in reversed(list(COUNTERS)):
+            batch.drop_column(column)
@@ -0,0 +1,56 @@
+"""add bp_records.seq and bp_snapshots
+
+BP 记录改为按房间内 seq 编号的事件流，已有记录按 id 顺序回填 seq；
+新增 bp_snapshots 保存压缩后的 BP 状态。
+
+Revision ID: b41d8e6a2f95
+Revises: 5e9b2c71f4a8
+Create Date: 2026-10-18 10:34:10
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41d8e6a2f95'
+down_revision = '5e9b2c71f4a8'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(table: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    if not _has_column("bp_records", "seq"):
+        op.add_column("bp_records", sa.Column("seq", sa.Integer(), nullable=True))
+        op.execute(
+            "UPDATE bp_records SET seq = "
+            "(SELECT COUNT(*) FROM bp_records AS earlier "
+            "WHERE earlier.room_id = bp_records.room_id AND earlier.id <= bp_records.id)"
+        )
+        with op.batch_alter_table("bp_records") as batch:
+            batch.alter_column("seq", existing_type=sa.Integer(), nullable=False)
+            batch.create_unique_constraint("uq_bp_records_room_seq", ["room_id", "seq"])
+
+    if not _has_table("bp_snapshots"):
+        op.create_table(
+            "bp_snapshots",
+            sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("seq", sa.Integer(), primary_key=True),
+            sa.Column("state", sa.JSON(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("bp_snapshots")
+    with op.batch_alter_table("bp_records") as batch:
+        batch.drop_constraint("uq_bp_records_room_seq", type_="unique")
+        batch.drop_column("seq")
@@ -0,0 +1,44 @@
+"""add chat_messages
+
+房间聊天记录，由聊天记录缓冲区批量写入，按 (room_id, id) 读取最近的消息。
+
+Revision ID: e62a9f0c3d17
+Revises: b41d8e6a2f95
+Create Date: 2026-10-18 10:38:20
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e62a9f0c3d17'
+down_revision = 'b41d8e6a2f95'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(table: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    if _has_table("chat_messages"):
+        return
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("user_id", sa.Integer()),
+        sa.Column("username", sa.String(50), nullable=False),
+        sa.Column("team", sa.String(10)),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_chat_messages_room_id_id", "chat_messages", ["room_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chat_messages_room_id_id", table_name="chat_messages")
+    op.drop_table("chat_messages")
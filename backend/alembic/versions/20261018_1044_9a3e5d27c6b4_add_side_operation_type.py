@@ -0,0 +1,31 @@
+"""add SIDE operation type
+
+BP 记录新增选边操作类型。PostgreSQL 的 bpoperationtype 枚举需要追加取值，
+其他数据库按字符串存储，无需修改。
+
+Revision ID: 9a3e5d27c6b4
+Revises: e62a9f0c3d17
+Create Date: 2026-10-18 10:44:51
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3e5d27c6b4'
+down_revision = 'e62a9f0c3d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # ALTER TYPE ... ADD VALUE 不能在事务中执行
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE bpoperationtype ADD VALUE IF NOT EXISTS 'SIDE'")
+
+
+def downgrade() -> None:
+    # PostgreSQL 不支持删除枚举取值，保留 SIDE
+    pass
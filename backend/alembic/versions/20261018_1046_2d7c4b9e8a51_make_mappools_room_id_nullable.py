@@ -0,0 +1,37 @@
+"""make mappools.room_id nullable
+
+模板地图池原先以 room_id=0 表示不关联房间，违反外键约束；
+改为可空，已有的模板地图池改为 NULL。
+
+Revision ID: 2d7c4b9e8a51
+Revises: 9a3e5d27c6b4
+Create Date: 2026-10-18 10:46:36
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7c4b9e8a51'
+down_revision = '9a3e5d27c6b4'
+branch_labels = None
+depends_on = None
+
+
+def _is_nullable(table: str, column: str) -> bool:
+    columns = {c["name"]: c for c in sa.inspect(op.get_bind()).get_columns(table)}
+    return columns[column]["nullable"]
+
+
+def upgrade() -> None:
+    if not _is_nullable("mappools", "room_id"):
+        with op.batch_alter_table("mappools") as batch:
+            batch.alter_column("room_id", existing_type=sa.Integer(), nullable=True)
+    op.execute("UPDATE mappools SET room_id = NULL WHERE room_id = 0")
+
+
+def downgrade() -> None:
+    op.execute("UPDATE mappools SET room_id = 0 WHERE room_id IS NULL")
+    with op.batch_alter_table("mappools") as batch:
+        batch.alter_column("room_id", existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,33 @@
+"""add rooms.state_version
+
+房间状态版本号，用于房间用户列表和 BP 状态的 ETag。
+此前没有下发过 ETag，已有房间从 0 开始即可。
+
+Revision ID: c5f17a3b2e96
+Revises: 2d7c4b9e8a51
+Create Date: 2026-10-18 10:48:45
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f17a3b2e96'
+down_revision = '2d7c4b9e8a51'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    if not _has_column("rooms", "state_version"):
+        op.add_column("rooms", sa.Column("state_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("rooms") as batch:
+        batch.drop_column("state_version")
@@ -0,0 +1,36 @@
+"""add mappools.replaced_by
+
+地图池改为不可修改的版本链：修改时写入新版本，旧版本的 replaced_by 指向新版本。
+
+Revision ID: f83b6c1d4e20
+Revises: c5f17a3b2e96
+Create Date: 2026-10-18 11:07:38
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f83b6c1d4e20'
+down_revision = 'c5f17a3b2e96'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    if _has_column("mappools", "replaced_by"):
+        return
+    with op.batch_alter_table("mappools") as batch:
+        batch.add_column(sa.Column("replaced_by", sa.Integer(), nullable=True))
+        batch.create_foreign_key("fk_mappools_replaced_by", "mappools", ["replaced_by"], ["id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("mappools") as batch:
+        batch.drop_constraint("fk_mappools_replaced_by", type_="foreignkey")
+        batch.drop_column("replaced_by")
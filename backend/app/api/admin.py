@@ -1,31 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select, update, func
 
+from ..core.conditional import is_not_modified, not_modified, validator_headers
 from ..core.deps import get_db, get_current_user
-from ..core.security import verify_password, get_password_hash, create_access_token
-from ..schemas.admin import AdminLoginRequest, AdminLoginResponse, MapPoolCreateRequest, RoomCreateRequest
-from ..models import Admin, MapPool, Room
+from ..core.config import get_settings
+from ..core import token_cache
+from ..core.security import (
+    verify_password_async,
+    get_password_hash,
+    create_access_token,
+    decode_access_token,
+    oauth2_scheme,
+)
+from ..core.throttle import FailureThrottle, client_ip as get_client_ip
+from ..schemas.admin import (
+    AdminLoginRequest,
+    AdminLoginResponse,
+    AdminStatusUpdateRequest,
+    BulkRoomCreateRequest,
+    MapPoolCreateRequest,
+    RoomCreateRequest,
+)
+from ..models import Admin, MapPool, Room, RoomStatus
+from ..services import map_registry, room_version
+from ..services.bp_format import compile_format, format_key
+from ..services.room_codes import allocate_room_codes
 
 router = APIRouter()
 
+# 登录失败限流（按用户名 / IP）
+username_throttle = FailureThrottle(
+    get_settings().LOGIN_MAX_FAILURES_PER_USERNAME,
+    get_settings().LOGIN_FAILURE_WINDOW,
+)
+ip_throttle = FailureThrottle(
+    get_settings().LOGIN_MAX_FAILURES_PER_IP,
+    get_settings().LOGIN_FAILURE_WINDOW,
+)
+
 
 @router.post("/login")
 async def login(
     request: AdminLoginRequest,
+    http_request: Request,
     db: AsyncSession = Depends(get_db),
 ):
     """管理员登录"""
+    client_ip = get_client_ip(http_request)
+    
+    # 校验密码之前先检查限流
+    retry_after = max(username_throttle.retry_after(request.username), ip_throttle.retry_after(client_ip))
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="登录失败次数过多，请稍后再试",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+    
     # 从数据库验证管理员
     result = await db.execute(select(Admin).where(Admin.username == request.username))
     admin = result.scalar_one_or_none()
     
-    if not admin or not verify_password(request.password, admin.password_hash):
+    if not await verify_password_async(request.password, admin.password_hash if admin else None):
+        username_throttle.record_failure(request.username)
+        ip_throttle.record_failure(client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
         )
     
+    username_throttle.reset(request.username)
+    
     if not admin.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -36,6 +86,43 @@ async def login(
     return AdminLoginResponse(token=token, username=admin.username)
 
 
+@router.post("/logout")
+async def logout(
+    token: str = Depends(oauth2_scheme),
+    current_user: dict = Depends(get_current_user),
+):
+    """管理员登出，注销当前令牌"""
+    payload = decode_access_token(token)
+    await token_cache.revoke_token(token, payload["exp"])
+    return {"success": True}
+
+
+@router.put("/admins/{username}/status")
+async def update_admin_status(
+    username: str,
+    request: AdminStatusUpdateRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """启用 / 禁用管理员，禁用后其已签发的令牌立即失效"""
+    result = await db.execute(select(Admin).where(Admin.username == username))
+    admin = result.scalar_one_or_none()
+    
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="管理员不存在",
+        )
+    
+    admin.is_active = request.is_active
+    await db.commit()
+    
+    if not request.is_active:
+        await token_cache.revoke_admin(username)
+    
+    return {"username": admin.username, "is_active": admin.is_active}
+
+
 @router.post("/mappools")
 async def create_mappool(
     request: MapPoolCreateRequest,
@@ -44,7 +131,7 @@ async def create_mappool(
 ):
     """创建地图池"""
     mappool = MapPool(
-        room_id=0,  # 管理员创建的地图池不关联房间
+        room_id=None,  # 管理员创建的地图池不关联房间
         name=request.name,
         maps=request.maps,
         is_default=False
@@ -52,6 +139,43 @@ async def create_mappool(
     db.add(mappool)
     await db.commit()
     await db.refresh(mappool)
+    await map_registry.invalidate()
+    return {"id": mappool.id, "name": mappool.name, "maps": mappool.maps}
+
+
+@router.put("/mappools/{mappool_id}")
+async def update_mappool(
+    mappool_id: int,
+    request: MapPoolCreateRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """修改地图池：写入新版本并返回新版本 ID（已开始 BP 的房间继续使用开始时的版本）"""
+    current = await map_registry.resolve_pool(db, str(mappool_id))
+    
+    mappool = MapPool(
+        room_id=current.room_id,
+        name=request.name,
+        maps=request.maps,
+        is_default=current.is_default,
+    )
+    db.add(mappool)
+    await db.flush()
+    
+    # 旧版本只在仍是最新版本时指向新版本，避免并发修改产生分叉
+    result = await db.execute(
+        update(MapPool)
+        .where(MapPool.id == current.id, MapPool.replaced_by.is_(None))
+        .values(replaced_by=mappool.id, is_default=False)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="地图池已被修改，请刷新后重试",
+        )
+    await db.commit()
+    await map_registry.invalidate()
     return {"id": mappool.id, "name": mappool.name, "maps": mappool.maps}
 
 
@@ -60,26 +184,9 @@ async def get_mappools(
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    """获取所有地图池"""
-    result = await db.execute(select(MapPool))
-    mappools = result.scalars().all()
-    
-    # 转换为前端格式
-    response = []
-    for mp in mappools:
-        maps_dict = {}
-        for i, m in enumerate(mp.maps, 1):
-            maps_dict[f"map{i:02d}_name"] = m["name"]
-            maps_dict[f"map{i:02d}_icon"] = m.get("image", "/images/default-map-icon.png")
-        
-        response.append({
-            "id": str(mp.id),
-            "name": mp.name,
-            "is_default": mp.is_default,
-            **maps_dict
-        })
-    
-    return response
+    """获取所有地图池（注册表中预先渲染的响应）"""
+    registry = await map_registry.get_registry(db)
+    return Response(content=registry.admin_payload, media_type="application/json")
 
 
 @router.post("/rooms")
@@ -89,28 +196,26 @@ async def create_room(
     current_user: dict = Depends(get_current_user),
 ):
     """创建房间"""
-    import random
-    import string
-    
-    # 生成6位房间码
-    room_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    
-    # 检查房间码是否已存在
-    existing = await db.execute(select(Room).where(Room.room_code == room_code))
-    if existing.scalar_one_or_none():
+    mappool = await map_registry.resolve_pool(db, request.mappool_config_id)
+    try:
+        compile_format(format_key(request.bp_config), len(mappool.names))
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="房间码已存在，请重试",
+            detail=f"BP 赛制配置无效: {e}",
         )
     
+    # 生成6位房间码（自动避开已存在的房间码）
+    room_code = (await allocate_room_codes(db, 1))[0]
+    
     room = Room(
         room_code=room_code,
         room_name=request.room_name or f"房间 {room_code}",
         team_a_name=request.team_a_name or "Team A",
         team_b_name=request.team_b_name or "Team B",
-        max_players=request.max_players or 10,
+        max_players=request.max_players,
         status="waiting",
-        bp_config=request.bp_config or {},
+        bp_config={**(request.bp_config or {}), "mappool_id": mappool.id},
         bp_state={"current_phase": "waiting"},
     )
     db.add(room)
@@ -126,46 +231,169 @@ async def create_room(
     }
 
 
+@router.post("/rooms/bulk")
+async def bulk_create_rooms(
+    request: BulkRoomCreateRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """按赛程批量创建房间（单个事务、单条多行 INSERT），按赛程顺序返回创建的房间"""
+    count = len(request.matches)
+    if not 0 < count <= get_settings().ROOM_BULK_CREATE_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"房间数量必须在 1 到 {get_settings().ROOM_BULK_CREATE_MAX} 之间",
+        )
+    
+    # 先校验全部比赛，任何一场无效都不创建房间
+    rows = []
+    for index, match in enumerate(request.matches, 1):
+        mappool = await map_registry.resolve_pool(db, match.mappool_config_id or request.mappool_config_id)
+        bp_config = match.bp_config if match.bp_config is not None else request.bp_config
+        try:
+            compile_format(format_key(bp_config), len(mappool.names))
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"第 {index} 场比赛 BP 赛制配置无效: {e}",
+            )
+        rows.append({
+            "room_name": match.room_name,
+            "team_a_name": match.team_a_name,
+            "team_b_name": match.team_b_name,
+            "max_players": request.max_players,
+            "status": RoomStatus.WAITING,
+            "bp_config": {**(bp_config or {}), "mappool_id": mappool.id},
+            "bp_state": {"current_phase": "waiting"},
+        })
+    
+    for row, room_code in zip(rows, await allocate_room_codes(db, count)):
+        row["room_code"] = room_code
+        row["room_name"] = row["room_name"] or f"房间 {room_code}"
+    
+    try:
+        result = await db.execute(
+            insert(Room).returning(
+                Room.id,
+                Room.room_code,
+                Room.room_name,
+                Room.team_a_name,
+                Room.team_b_name,
+                Room.status,
+                sort_by_parameter_order=True,
+            ),
+            rows,
+        )
+        created = result.all()
+        await db.commit()
+    except IntegrityError:
+        # 查询之后其他请求占用了同一房间码
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="房间码已存在，请重试",
+        )
+    
+    return {
+        "total": len(created),
+        "items": [
+            {
+                "id": str(room.id),
+                "room_code": room.room_code,
+                "room_name": room.room_name,
+                "team_a_name": room.team_a_name,
+                "team_b_name": room.team_b_name,
+                "status": room.status,
+            }
+            for room in created
+        ],
+    }
+
+
 @router.get("/rooms")
 async def get_rooms(
-    skip: int = 0,
-    limit: int = 20,
+    cursor: Optional[int] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    room_status: Optional[RoomStatus] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    """获取房间列表"""
-    result = await db.execute(select(Room).offset(skip).limit(limit))
-    rooms = result.scalars().all()
+    """获取房间列表（按创建顺序倒序，使用游标分页）
+
+    skip 为兼容旧客户端保留，在游标之后再跳过指定条数；翻页较深时应使用 next_cursor
+    """
+    filters = []
+    if room_status is not None:
+        filters.append(Room.status == room_status)
+    if created_from is not None:
+        filters.append(Room.created_at >= created_from)
+    if created_to is not None:
+        filters.append(Room.created_at < created_to)
+    
+    # 游标为上一页最后一个房间的ID，避免 OFFSET 随历史数据增长而变慢
+    query = (
+        select(
+            Room.id,
+            Room.room_code,
+            Room.room_name,
+            Room.team_a_name,
+            Room.team_b_name,
+            Room.status,
+            Room.created_at,
+        )
+        .where(*filters)
+        .order_by(Room.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        query = query.where(Room.id < cursor)
+    if skip:
+        query = query.offset(skip)
+    result = await db.execute(query)
+    rows = result.all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
     # 获取总数
-    count_result = await db.execute(select(Room))
-    total = len(count_result.scalars().all())
+    total = await db.scalar(select(func.count()).select_from(Room).where(*filters))
     
     items = []
-    for room in rooms:
+    for row in rows:
         items.append({
-            "id": str(room.id),
-            "room_code": room.room_code,
-            "room_name": room.room_name,
-            "team_a_name": room.team_a_name,
-            "team_b_name": room.team_b_name,
-            "status": room.status,
-            "created_at": room.created_at.isoformat() if room.created_at else None,
+            "id": str(row.id),
+            "room_code": row.room_code,
+            "room_name": row.room_name,
+            "team_a_name": row.team_a_name,
+            "team_b_name": row.team_b_name,
+            "status": row.status,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
         })
     
     return {
         "total": total,
         "items": items,
+        "next_cursor": str(rows[-1].id) if has_more else None,
     }
 
 
 @router.get("/rooms/{room_id}")
 async def get_room_detail(
     room_id: int,
+    http_request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    """获取房间详情"""
+    """获取房间详情（支持 If-None-Match / If-Modified-Since）"""
+    etag, last_modified = await room_version.get_validators(db, room_id)
+    if is_not_modified(http_request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    response.headers.update(validator_headers(etag, last_modified))
+    
     result = await db.execute(select(Room).where(Room.id == room_id))
     room = result.scalar_one_or_none()
     
@@ -221,7 +449,7 @@ async def get_bp_record(
     result = await db.execute(
         select(BPRecord)
         .where(BPRecord.room_id == room_id)
-        .order_by(BPRecord.created_at)
+        .order_by(BPRecord.seq)
     )
     bp_records = result.scalars().all()
     
@@ -232,6 +460,7 @@ async def get_bp_record(
         "operation_logs": [],
     }
     
+    decider_map = None
     for record in bp_records:
         phase_key = f"phase_{record.round_number}"
         if record.operation_type == "ban":
@@ -242,17 +471,24 @@ async def get_bp_record(
             phase_key = "roll"
         elif record.operation_type == "auto":
             phase_key = "decider"
+            decider_map = record.map_name
+        elif record.operation_type == "side":
+            # 选边记录的地图是对应的 Pick 图或决胜图
+            phase_key = "decider_side" if record.map_name == decider_map else phase_key + "_side"
         
         response[phase_key] = {
             "map_id": record.map_name,
             "team": record.operator_team,
         }
         
-        response["operation_logs"].append({
+        log = {
             "phase": phase_key,
             "map_name": record.map_name,
             "team": record.operator_team,
             "created_at": record.created_at.isoformat() if record.created_at else None,
-        })
+        }
+        if record.operation_type == "side":
+            response[phase_key]["side"] = log["side"] = (record.operation_data or {}).get("side")
+        response["operation_logs"].append(log)
     
     return response
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from datetime import datetime
+from sqlalchemy import select, update, func
 
+from ..core import cluster
+from ..core.conditional import is_not_modified, not_modified, validator_headers
 from ..core.deps import get_db
 from ..schemas.user import JoinRoomRequest, SelectTeamRequest, UserResponse
-from ..models import User, Room, UserRole
+from ..models import User, Room, RoomStatus, UserRole
+from ..services import room_version
+from ..services.bp_service import begin_draft
 
 router = APIRouter()
 
+# 每队最多人数
+MAX_TEAM_PLAYERS = 5
+
+# 队伍对应的房间人数计数器
+TEAM_COUNTERS = {"A": "team_a_count", "B": "team_b_count"}
+
 
 @router.get("/me")
 async def get_current_user_info(
@@ -44,29 +53,46 @@ async def join_room(
     db: AsyncSession = Depends(get_db),
 ):
     """加入房间"""
-    # 检查房间是否存在
-    room_result = await db.execute(select(Room).where(Room.room_code == request.room_code))
-    room = room_result.scalar_one_or_none()
-    
-    if not room:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="房间不存在",
+    # 原子地占用一个名额：条件更新同时完成状态检查、人数检查并锁定房间行
+    admit_result = await db.execute(
+        update(Room)
+        .where(
+            Room.room_code == request.room_code,
+            Room.status == RoomStatus.WAITING,
+            Room.player_count < Room.max_players,
         )
-    
-    if room.status != "waiting":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="房间已开始游戏，无法加入",
+        .values(player_count=Room.player_count + 1, **room_version.NEXT_VERSION)
+        .returning(
+            Room.id,
+            Room.room_code,
+            Room.room_name,
+            Room.team_a_name,
+            Room.team_b_name,
+            Room.status,
         )
-    
-    # 检查房间人数
-    user_count_result = await db.execute(
-        select(User).where(User.room_id == room.id)
+        .execution_options(synchronize_session=False)
     )
-    user_count = len(user_count_result.scalars().all())
+    room = admit_result.one_or_none()
     
-    if user_count >= room.max_players:
+    if not room:
+        await db.rollback()
+        room_result = await db.execute(
+            select(Room.status).where(Room.room_code == request.room_code)
+        )
+        room_status = room_result.scalar_one_or_none()
+        
+        if room_status is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="房间不存在",
+            )
+        
+        if room_status != RoomStatus.WAITING:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="房间已开始游戏，无法加入",
+            )
+        
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="房间已满",
@@ -113,43 +139,91 @@ async def select_team(
             detail="用户不存在",
         )
     
-    # 获取房间
-    room_result = await db.execute(select(Room).where(Room.id == user.room_id))
-    room = room_result.scalar_one_or_none()
-    
-    if not room:
+    if request.team not in TEAM_COUNTERS:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="房间不存在",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="队伍无效",
         )
     
-    if room.status != "waiting":
+    if user.team == request.team:
+        return {
+            "success": True,
+            "data": {
+                "user_id": str(user.id),
+                "team": user.team,
+            },
+        }
+    
+    # 原子地占用目标队伍名额，并释放原队伍名额
+    new_counter = TEAM_COUNTERS[request.team]
+    values = {new_counter: getattr(Room, new_counter) + 1, **room_version.NEXT_VERSION}
+    if user.team in TEAM_COUNTERS:
+        old_counter = TEAM_COUNTERS[user.team]
+        values[old_counter] = getattr(Room, old_counter) - 1
+    
+    admit_result = await db.execute(
+        update(Room)
+        .where(
+            Room.id == user.room_id,
+            Room.status == RoomStatus.WAITING,
+            getattr(Room, new_counter) < MAX_TEAM_PLAYERS,
+        )
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+    
+    if admit_result.rowcount != 1:
+        room_id = user.room_id  # rollback 会使 user 过期
+        await db.rollback()
+        room_result = await db.execute(select(Room.status).where(Room.id == room_id))
+        room_status = room_result.scalar_one_or_none()
+        
+        if room_status is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="房间不存在",
+            )
+        
+        if room_status != RoomStatus.WAITING:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="房间已开始游戏，无法切换队伍",
+            )
+        
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="房间已开始游戏，无法切换队伍",
+            detail="队伍已满",
         )
     
-    # 检查队伍人数
-    team_users_result = await db.execute(
-        select(User).where(User.room_id == room.id, User.team == request.team)
+    # 只有队伍未被并发修改时才更新，防止重复释放原队伍名额
+    user_update = await db.execute(
+        update(User)
+        .where(User.id == user.id, User.team.is_(None) if user.team is None else User.team == user.team)
+        .values(team=request.team)
+        .execution_options(synchronize_session=False)
     )
-    team_users = team_users_result.scalars().all()
     
-    if len(team_users) >= 5:
+    if user_update.rowcount != 1:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="队伍已满",
+            status_code=status.HTTP_409_CONFLICT,
+            detail="队伍已变更，请刷新后重试",
         )
     
-    # 更新用户队伍
-    user.team = request.team
     await db.commit()
     
+    # 同步 Socket.IO 连接会话中缓存的身份
+    await cluster.notify("identity_changed", {
+        "room_id": user.room_id,
+        "user_id": user.id,
+        "fields": {"team": request.team},
+    })
+    
     return {
         "success": True,
         "data": {
             "user_id": str(user.id),
-            "team": user.team,
+            "team": request.team,
         },
     }
 
@@ -172,8 +246,16 @@ async def toggle_ready(
     
     # 切换准备状态
     user.is_ready = not user.is_ready
+    await room_version.bump(db, user.room_id)
     await db.commit()
     
+    # 同步 Socket.IO 连接会话中缓存的身份
+    await cluster.notify("identity_changed", {
+        "room_id": user.room_id,
+        "user_id": user.id,
+        "fields": {"is_ready": user.is_ready},
+    })
+    
     return {
         "success": True,
         "data": {
@@ -220,13 +302,38 @@ async def roll_dice(
     # 生成 Roll 点
     roll_value = random.randint(1, 100)
     user.roll_value = roll_value
+    room_id = room.id
+    await room_version.bump(db, room_id)
     await db.commit()
     
+    # 双方队伍都 Roll 点后决定先后手，点数较大的队伍先手（平局需重新 Roll）
+    rolls_result = await db.execute(
+        select(User.team, func.max(User.roll_value))
+        .where(
+            User.room_id == room_id,
+            User.team.in_(TEAM_COUNTERS),
+            User.roll_value.is_not(None),
+        )
+        .group_by(User.team)
+    )
+    rolls = dict(rolls_result.all())
+    
+    bp_state = None
+    if len(rolls) == 2 and rolls["A"] != rolls["B"]:
+        first_team = "A" if rolls["A"] > rolls["B"] else "B"
+        try:
+            bp_state = await begin_draft(db, room_id, first_team, rolls)
+        except HTTPException as e:
+            # 另一方的 Roll 请求已经开始了 BP
+            if e.status_code != status.HTTP_409_CONFLICT:
+                raise
+    
     return {
         "success": True,
         "data": {
             "user_id": str(user.id),
             "roll_value": roll_value,
+            "bp_state": bp_state,
         },
     }
 
@@ -234,18 +341,16 @@ async def roll_dice(
 @router.get("/room-users/{room_id}")
 async def get_room_users(
     room_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
 ):
-    """获取房间用户列表"""
-    # 检查房间是否存在
-    room_result = await db.execute(select(Room).where(Room.id == room_id))
-    room = room_result.scalar_one_or_none()
-    
-    if not room:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="房间不存在",
-        )
+    """获取房间用户列表（支持 If-None-Match / If-Modified-Since）"""
+    # 只读取房间版本号，未变化时不加载用户
+    etag, last_modified = await room_version.get_validators(db, room_id)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    response.headers.update(validator_headers(etag, last_modified))
     
     # 获取房间用户
     user_result = await db.execute(select(User).where(User.room_id == room_id))
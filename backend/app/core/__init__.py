@@ -1,5 +1,21 @@
 from .config import get_settings
-from .security import verify_password, get_password_hash, create_access_token, decode_access_token
+from .security import (
+    verify_password,
+    verify_password_async,
+    get_password_hash,
+    get_password_hash_async,
+    create_access_token,
+    decode_access_token,
+)
 from .deps import get_db
 
-__all__ = ["get_settings", "verify_password", "get_password_hash", "create_access_token", "decode_access_token", "get_db"]
+__all__ = [
+    "get_settings",
+    "verify_password",
+    "verify_password_async",
+    "get_password_hash",
+    "get_password_hash_async",
+    "create_access_token",
+    "decode_access_token",
+    "get_db",
+]
@@ -0,0 +1,49 @@
+"""
+跨进程事件总线
+多个 worker 共享 Socket.IO 消息队列时，用于通知其他进程丢弃本地缓存
+单进程部署时 publish 不做任何事
+"""
+import inspect
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# 事件处理器: {event: [handler]}
+_handlers: Dict[str, List[Callable[[dict], Any]]] = {}
+
+# 消息发布函数，由 Socket.IO 客户端管理器注入
+_publisher: Optional[Callable[[dict], Awaitable[None]]] = None
+
+
+def subscribe(event: str, handler: Callable[[dict], Any]) -> None:
+    """订阅其他进程发布的事件"""
+    _handlers.setdefault(event, []).append(handler)
+
+
+def set_publisher(publisher: Optional[Callable[[dict], Awaitable[None]]]) -> None:
+    """设置消息发布函数"""
+    global _publisher
+    _publisher = publisher
+
+
+def enabled() -> bool:
+    """是否有其他进程（已设置消息发布函数）"""
+    return _publisher is not None
+
+
+async def publish(event: str, data: dict) -> None:
+    """向其他进程发布事件（本进程不会收到）"""
+    if _publisher is not None:
+        await _publisher({"event": event, "data": data})
+
+
+async def notify(event: str, data: dict) -> None:
+    """同时通知本进程和其他进程"""
+    await dispatch({"event": event, "data": data})
+    await publish(event, data)
+
+
+async def dispatch(message: dict) -> None:
+    """分发其他进程发布的事件"""
+    for handler in _handlers.get(message.get("event"), []):
+        result = handler(message.get("data") or {})
+        if inspect.isawaitable(result):
+            await result
@@ -0,0 +1,128 @@
+"""
+主进程选举
+多个 worker 共享 Redis 时，只有持有 Redis 锁的进程执行全局唯一的任务（如回合计时），
+持有者按 TTL 定期续期，退出或失联后由其他进程接管；
+未使用 Redis 客户端管理器时本进程始终是持有者
+"""
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from .config import get_settings
+
+# 锁仍属于本进程时续期，否则尝试获取
+HOLD_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+# 只释放本进程持有的锁
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLock:
+    """基于 Redis 锁的主进程选举"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.token = uuid.uuid4().hex
+        self.held = False
+        self.on_acquired: Optional[Callable[[], Awaitable[Any]]] = None
+        self.on_lost: Optional[Callable[[], Any]] = None
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        """是否需要选举（只有 Redis 客户端管理器会有多个进程）"""
+        return get_settings().SOCKETIO_MANAGER == "redis"
+
+    @property
+    def is_leader(self) -> bool:
+        return self.held or not self.enabled
+
+    @property
+    def key(self) -> str:
+        return f"{get_settings().SOCKETIO_CHANNEL}:leader:{self.name}"
+
+    async def _acquire(self) -> bool:
+        """获取或续期锁"""
+        ttl_ms = int(get_settings().LEADER_LOCK_TTL * 1000)
+        return bool(await self._redis.eval(HOLD_SCRIPT, 1, self.key, self.token, ttl_ms))
+
+    async def _release(self) -> None:
+        await self._redis.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+
+    async def poll(self) -> None:
+        """获取或续期一次锁，持有状态变化时调用回调"""
+        try:
+            held = await self._acquire()
+        except Exception as e:
+            print(f"主进程锁 {self.name} 续期失败: {e}")
+            held = False
+
+        if held and not self.held:
+            self.held = True
+            print(f"本进程成为 {self.name} 的主进程")
+            if self.on_acquired is not None:
+                try:
+                    await self.on_acquired()
+                except Exception as e:
+                    print(f"{self.name} 主进程初始化失败: {e}")
+        elif not held and self.held:
+            self.held = False
+            print(f"本进程不再是 {self.name} 的主进程")
+            if self.on_lost is not None:
+                self.on_lost()
+
+    async def _run(self) -> None:
+        while True:
+            await self.poll()
+            # 每个 TTL 内续期三次，单次失败不会丢失锁
+            await asyncio.sleep(get_settings().LEADER_LOCK_TTL / 3)
+
+    async def start(
+        self,
+        on_acquired: Callable[[], Awaitable[Any]],
+        on_lost: Callable[[], Any],
+    ) -> None:
+        """开始选举；不需要选举时直接作为持有者初始化"""
+        self.on_acquired = on_acquired
+        self.on_lost = on_lost
+        if not self.enabled:
+            await on_acquired()
+            return
+        if self._task is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.Redis.from_url(get_settings().REDIS_URL)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止选举并释放锁，其他进程无需等待锁过期即可接管"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self.held:
+            self.held = False
+            try:
+                await self._release()
+            except Exception as e:
+                print(f"主进程锁 {self.name} 释放失败: {e}")
+        await self._redis.aclose()
+        self._redis = None
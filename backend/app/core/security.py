@@ -1,16 +1,32 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from . import token_cache
 from .config import get_settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+T = TypeVar("T")
+
+# bcrypt 计算放到独立线程池，不阻塞事件循环；排队任务数有上限
+_password_executor = ThreadPoolExecutor(
+    max_workers=get_settings().PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_password_slots = asyncio.Semaphore(get_settings().PASSWORD_HASH_MAX_PENDING)
+
+# 用户名不存在时也校验一次，避免通过响应时间判断用户名是否存在
+_DUMMY_HASH = "$2b$12$YArcVs.AQU3mQJDaqyzVxO7PP59nUucdCcK7oA4lKPsamEhsOYhYi"
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
@@ -22,6 +38,29 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_task(fn: Callable[..., T], *args) -> T:
+    if _password_slots.locked():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="服务繁忙，请稍后重试",
+        )
+    async with _password_slots:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, fn, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """在线程池中验证密码；hashed_password 为空时仍执行一次校验并返回 False"""
+    if hashed_password is None:
+        await _run_password_task(verify_password, plain_password, _DUMMY_HASH)
+        return False
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """在线程池中计算密码哈希值"""
+    return await _run_password_task(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建访问令牌"""
     to_encode = data.copy()
@@ -56,28 +95,38 @@ def decode_access_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> dict:
-    """获取当前用户"""
+async def get_current_user(token: str, db: AsyncSession) -> dict:
+    """获取当前管理员，同一令牌只在首次使用时校验并查库"""
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证凭据",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = decode_access_token(token)
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    if token_cache.is_revoked(token):
         raise credentials_exception
     
-    # TODO: 从数据库获取用户信息
-    return {"username": username}
-
-
-# 依赖注入
-from .deps import get_db
+    payload = decode_access_token(token)
+    username: Optional[str] = payload.get("sub")
+    if username is None:
+        raise credentials_exception
+    
+    from ..models import Admin
+    
+    result = await db.execute(select(Admin).where(Admin.username == username))
+    admin = result.scalar_one_or_none()
+    if admin is None:
+        raise credentials_exception
+    if not admin.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="账户已被禁用",
+        )
+    
+    principal = {"id": admin.id, "username": admin.username}
+    token_cache.put(token, payload["exp"], principal)
+    return principal
@@ -0,0 +1,83 @@
+"""
+登录限流
+按用户名和 IP 分别统计时间窗口内的失败次数，超出后在窗口内拒绝登录，
+在校验密码之前检查，暴力破解不会消耗 bcrypt 计算
+"""
+import ipaddress
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Deque, Optional, Tuple
+
+from starlette.requests import Request
+
+from .config import get_settings
+
+# 每类键最多跟踪的条目数，超出时淘汰最久未失败的键
+MAX_TRACKED_KEYS = 10000
+
+
+class FailureThrottle:
+    """滑动窗口失败计数"""
+
+    def __init__(self, max_failures: int, window: float):
+        self.max_failures = max_failures
+        self.window = window
+        self._failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def _prune(self, key: str, now: float) -> Optional[Deque[float]]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, key: str) -> float:
+        """被限流时返回需要等待的秒数，否则返回 0"""
+        now = time.monotonic()
+        failures = self._prune(key, now)
+        if failures is None or len(failures) < self.max_failures:
+            return 0
+        return failures[0] + self.window - now
+
+    def record_failure(self, key: str) -> None:
+        """记录一次失败"""
+        now = time.monotonic()
+        failures = self._prune(key, now)
+        if failures is None:
+            failures = self._failures[key] = deque(maxlen=self.max_failures)
+        failures.append(now)
+        self._failures.move_to_end(key)
+        while len(self._failures) > MAX_TRACKED_KEYS:
+            self._failures.popitem(last=False)
+
+    def reset(self, key: str) -> None:
+        """登录成功后清除失败记录"""
+        self._failures.pop(key, None)
+
+
+@lru_cache()
+def _trusted_networks(proxies: Tuple[str, ...]) -> tuple:
+    return tuple(ipaddress.ip_network(proxy, strict=False) for proxy in proxies)
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    networks = _trusted_networks(tuple(get_settings().TRUSTED_PROXIES))
+    return any(address in network for network in networks)
+
+
+def client_ip(request: Request) -> str:
+    """客户端 IP：只有直连地址是受信任的反向代理时才读取 X-Real-IP"""
+    host = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-real-ip", "").strip()
+    if forwarded and _is_trusted_proxy(host):
+        return forwarded
+    return host
@@ -0,0 +1,100 @@
+"""
+已验证令牌缓存
+按令牌缓存校验结果和对应的管理员信息，条目在令牌 exp 到期时失效；
+禁用管理员或注销令牌时通过集群总线通知所有进程立即清除
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from . import cluster, metrics
+from .config import get_settings
+
+token_cache_lookups = metrics.register(metrics.Counter(
+    "auth_token_cache_lookups_total", "令牌缓存查询次数", ("result",),
+))
+
+# 已验证的令牌: {token: (过期时间戳, 管理员信息)}，按最近使用排序
+_entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+# 管理员的已缓存令牌: {username: {token}}
+_tokens_by_admin: Dict[str, Set[str]] = {}
+
+# 已注销的令牌: {token: 过期时间戳}
+_revoked: Dict[str, float] = {}
+
+
+def _drop(token: str) -> None:
+    entry = _entries.pop(token, None)
+    if entry is None:
+        return
+    username = entry[1]["username"]
+    tokens = _tokens_by_admin.get(username)
+    if tokens is not None:
+        tokens.discard(token)
+        if not tokens:
+            del _tokens_by_admin[username]
+
+
+def get(token: str) -> Optional[dict]:
+    """获取令牌对应的管理员信息，未缓存或已过期时返回 None"""
+    entry = _entries.get(token)
+    if entry is None:
+        token_cache_lookups.inc("miss")
+        return None
+    if entry[0] <= time.time():
+        _drop(token)
+        token_cache_lookups.inc("miss")
+        return None
+    _entries.move_to_end(token)
+    token_cache_lookups.inc("hit")
+    return entry[1]
+
+
+def put(token: str, expires_at: float, principal: dict) -> None:
+    """缓存已验证的令牌，最长缓存 TOKEN_CACHE_TTL 秒且不超过令牌的 exp"""
+    settings = get_settings()
+    _drop(token)
+    _entries[token] = (min(expires_at, time.time() + settings.TOKEN_CACHE_TTL), principal)
+    _tokens_by_admin.setdefault(principal["username"], set()).add(token)
+    while len(_entries) > settings.TOKEN_CACHE_SIZE:
+        _drop(next(iter(_entries)))
+
+
+def is_revoked(token: str) -> bool:
+    """令牌是否已被注销"""
+    expires_at = _revoked.get(token)
+    if expires_at is None:
+        return False
+    if expires_at <= time.time():
+        del _revoked[token]
+        return False
+    return True
+
+
+def _on_token_revoked(data: dict) -> None:
+    now = time.time()
+    for token, expires_at in list(_revoked.items()):
+        if expires_at <= now:
+            del _revoked[token]
+    _revoked[data["token"]] = data["expires_at"]
+    _drop(data["token"])
+
+
+def _on_admin_revoked(data: dict) -> None:
+    for token in list(_tokens_by_admin.get(data["username"], ())):
+        _drop(token)
+
+
+async def revoke_token(token: str, expires_at: float) -> None:
+    """注销单个令牌（在所有进程中生效，直到令牌过期）"""
+    await cluster.notify("token_revoked", {"token": token, "expires_at": expires_at})
+
+
+async def revoke_admin(username: str) -> None:
+    """清除管理员的全部缓存令牌，下一次请求重新查库"""
+    await cluster.notify("admin_revoked", {"username": username})
+
+
+cluster.subscribe("token_revoked", _on_token_revoked)
+cluster.subscribe("admin_revoked", _on_admin_revoked)
@@ -0,0 +1,125 @@
+"""
+SQL 查询统计
+按 HTTP 请求 / Socket.IO 事件统计查询次数和数据库耗时，记录慢查询并提示疑似 N+1 的重复语句
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+
+from ..core import metrics
+from ..core.config import get_settings
+
+# 当前请求 / 事件的统计
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+db_queries_per_unit = metrics.register(metrics.Histogram(
+    "db_queries_per_unit", "每个 HTTP 请求 / Socket.IO 事件执行的 SQL 数", ("kind",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+))
+db_slow_queries = metrics.register(metrics.Counter(
+    "db_slow_queries_total", "慢查询数",
+))
+db_repeated_statements = metrics.register(metrics.Counter(
+    "db_repeated_statements_total", "出现重复语句（疑似 N+1）的请求 / 事件数", ("kind",),
+))
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """一次请求 / 事件内的查询统计"""
+    kind: str
+    label: str
+    count: int = 0
+    duration: float = 0.0
+    statements: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+
+def current_stats() -> Optional[QueryStats]:
+    """获取当前请求 / 事件的查询统计"""
+    return _current.get()
+
+
+@contextmanager
+def track_queries(kind: str, label: str) -> Iterator[QueryStats]:
+    """在上下文内统计查询，结束时上报指标并检查重复语句"""
+    stats = QueryStats(kind=kind, label=label)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        _report(stats)
+
+
+def _report(stats: QueryStats) -> None:
+    db_queries_per_unit.observe(stats.count, stats.kind)
+
+    threshold = get_settings().SQL_REPEATED_STATEMENT_THRESHOLD
+    repeated = {sql: n for sql, n in stats.statements.items() if n >= threshold}
+    if repeated:
+        db_repeated_statements.inc(stats.kind)
+        for sql, n in repeated.items():
+            print(f"[SQL] 疑似 N+1: {stats.label} 重复执行 {n} 次: {_shorten(sql)}")
+
+
+def _shorten(statement: str, limit: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    if elapsed * 1000 >= get_settings().SQL_SLOW_QUERY_MS:
+        db_slow_queries.inc()
+        label = stats.label if stats is not None else "-"
+        print(f"[SQL] 慢查询 {elapsed * 1000:.1f}ms ({label}): {_shorten(statement)}")
+
+
+def instrument_engine(engine) -> None:
+    """为引擎注册查询统计事件"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """按 HTTP 请求统计查询，调试模式下通过响应头返回统计结果"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        debug = get_settings().DEBUG
+
+        with track_queries("http", f"{scope['method']} {scope['path']}") as stats:
+            async def send_wrapper(message):
+                if debug and message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-query-count", str(stats.count).encode()),
+                        (b"x-db-query-time-ms", f"{stats.duration * 1000:.2f}".encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
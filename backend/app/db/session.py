@@ -1,13 +1,56 @@
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 
 from .base import Base
-from ..core.config import get_settings
+from ..core.config import Settings, get_settings
+
+# 同步驱动 URL 对应的异步驱动（Alembic 仍使用同步驱动）
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """将数据库 URL 转换为异步驱动的 URL"""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def get_engine_options(settings: Settings) -> Dict[str, Any]:
+    """根据配置生成引擎参数"""
+    url = get_async_database_url(settings.DATABASE_URL)
+    options: Dict[str, Any] = {"echo": settings.DEBUG}
+    
+    if url.startswith("sqlite"):
+        # SQLite 仅用于本地开发和压测，写锁冲突时等待而不是立即报错
+        options["connect_args"] = {"timeout": 30}
+        return options
+    
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {
+            "timeout": settings.DB_CONNECT_TIMEOUT,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+            # asyncpg 自身的预编译语句缓存，使用 PgBouncer 事务模式时需设为 0
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
 
 engine = create_async_engine(
-    get_settings().DATABASE_URL,
-    echo=get_settings().DEBUG,
+    get_async_database_url(get_settings().DATABASE_URL),
+    **get_engine_options(get_settings()),
 )
 
 async_session_maker = async_sessionmaker(
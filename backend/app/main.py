@@ -1,12 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from .core import metrics
 from .core.config import get_settings
 
 app = FastAPI(
     title=get_settings().APP_NAME,
     version=get_settings().APP_VERSION,
     debug=get_settings().DEBUG,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS 中间件
@@ -18,17 +21,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# SQL 查询统计
+if get_settings().SQL_QUERY_STATS_ENABLED:
+    from .db.query_stats import QueryStatsMiddleware, instrument_engine
+    from .db.session import engine
+    
+    app.add_middleware(QueryStatsMiddleware)
+    instrument_engine(engine)
+
+# 运行指标
+if get_settings().METRICS_ENABLED:
+    from .db.session import engine
+    
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_pool(engine.sync_engine.pool)
+
 # 健康检查
 @app.get("/health")
 async def health_check():
     """健康检查端点"""
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus 指标端点"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.on_event("startup")
 async def startup_event():
     """应用启动事件"""
     print("应用启动中...")
     # 数据库初始化由 Alembic 处理
+    
+    # 启动 BP 回合计时器
+    from .services.bp_timer import timer_owner, timer_wheel
+    from .websocket.manager import emit_timer_ticks, handle_turn_timeout
+    timer_wheel.start(emit_timer_ticks, handle_turn_timeout)
+    
+    # 成为计时器主进程时恢复进行中房间的回合计时器（重启前已过期的回合会在下一个刻度自动操作），
+    # 失去主进程身份时取消本进程的计时器
+    from .services.bp_service import rehydrate_timers
+    
+    async def restore_timers():
+        try:
+            print(f"已恢复 {await rehydrate_timers()} 个房间的回合计时器")
+        except Exception as e:
+            print(f"回合计时器恢复失败: {e}")
+    
+    await timer_owner.start(restore_timers, timer_wheel.clear)
+    
+    # 同步其他进程的在线用户
+    from .websocket.presence import cluster_presence
+    await cluster_presence.start()
+    
+    # 启动聊天记录批量写入
+    from .websocket.chat_history import chat_flusher
+    chat_flusher.start()
+    
+    # 启动观众合并推送
+    from .websocket.manager import emit_spectator_update, render_spectator_update
+    from .websocket.spectators import spectator_fanout
+    spectator_fanout.start(render_spectator_update, emit_spectator_update)
+    
+    if get_settings().METRICS_ENABLED:
+        metrics.loop_lag_monitor.start()
     print("应用启动完成")
 
 @app.on_event("shutdown")
@@ -36,6 +92,19 @@ async def shutdown_event():
     """应用关闭事件"""
     print("应用关闭中...")
     # 清理资源
+    from .services.bp_timer import timer_owner, timer_wheel
+    await timer_owner.stop()
+    await timer_wheel.stop()
+    
+    from .websocket.presence import cluster_presence
+    await cluster_presence.stop()
+    
+    from .websocket.chat_history import chat_flusher
+    await chat_flusher.stop()
+    
+    from .websocket.spectators import spectator_fanout
+    await spectator_fanout.stop()
+    await metrics.loop_lag_monitor.stop()
     print("应用关闭完成")
 
 # 导入路由
@@ -1,7 +1,20 @@
 from .admin import Admin
-from .room import Room
-from .user import User
+from .room import Room, RoomStatus
+from .user import User, UserRole
 from .mappool import MapPool
-from .bp_record import BPRecord, OperationLog
+from .bp_record import BPRecord, BPSnapshot, OperationLog, BPOperationType
+from .chat_message import ChatMessage
 
-__all__ = ["Admin", "Room", "User", "MapPool", "BPRecord", "OperationLog"]
+__all__ = [
+    "Admin",
+    "Room",
+    "RoomStatus",
+    "User",
+    "UserRole",
+    "MapPool",
+    "BPRecord",
+    "BPSnapshot",
+    "OperationLog",
+    "BPOperationType",
+    "ChatMessage",
+]
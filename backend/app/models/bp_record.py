@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Enum, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -10,15 +10,21 @@ class BPOperationType(str, enum.Enum):
     ROLL = "roll"  # Roll 点
     BAN = "ban"  # 禁用地图
     PICK = "pick"  # 选择地图
+    SIDE = "side"  # 选择开局阵营
     AUTO = "auto"  # 自动选择（决胜图）
 
 
 class BPRecord(Base):
-    """BP 记录模型"""
+    """BP 记录模型（房间 BP 事件流，按 seq 顺序回放）"""
     __tablename__ = "bp_records"
+    __table_args__ = (
+        # 每个房间内事件序号唯一且单调递增
+        UniqueConstraint("room_id", "seq", name="uq_bp_records_room_seq"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False, index=True)
+    seq = Column(Integer, nullable=False)  # 房间内事件序号，从 1 开始
     round_number = Column(Integer, nullable=False)  # 轮次编号
     operation_type = Column(Enum(BPOperationType), nullable=False)  # 操作类型
     operator_team = Column(String(10), nullable=True)  # 操作队伍 "A" or "B"
@@ -30,6 +36,16 @@ class BPRecord(Base):
     room = relationship("Room", back_populates="bp_records")
 
 
+class BPSnapshot(Base):
+    """BP 状态快照模型（事件流压缩后的状态，读取时只需回放之后的事件）"""
+    __tablename__ = "bp_snapshots"
+
+    room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)  # 快照包含的最后一个事件序号
+    state = Column(JSON, nullable=False)  # 压缩后的 BP 状态
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class OperationLog(Base):
     """操作日志模型"""
     __tablename__ = "operation_logs"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class ChatMessage(Base):
+    """聊天消息模型（由聊天记录缓冲区批量写入）"""
+    __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_room_id_id", "room_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, nullable=True)  # 发送者用户ID
+    username = Column(String(50), nullable=False)
+    team = Column(String(10), nullable=True)
+    content = Column(Text, nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=False)  # 发送时间（服务端时间）
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
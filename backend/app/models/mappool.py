@@ -9,9 +9,11 @@ class MapPool(Base):
     __tablename__ = "mappools"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False, index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=True, index=True)  # 为空表示模板地图池
     name = Column(String(100), nullable=False)  # 地图池名称
     maps = Column(JSON, nullable=False)  # 地图列表 [{"name": "Dust2", "image": "..."}, ...]
     is_default = Column(Boolean, default=False)  # 是否为默认地图池
+    # 地图池的每个版本不可修改：修改时写入新版本，旧版本指向新版本，已开始 BP 的房间继续使用旧版本
+    replaced_by = Column(Integer, ForeignKey("mappools.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Enum
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -16,12 +16,20 @@ class RoomStatus(str, enum.Enum):
 class Room(Base):
     """房间模型"""
     __tablename__ = "rooms"
+    __table_args__ = (
+        # 管理后台按状态筛选、按创建时间范围筛选
+        Index("ix_rooms_status_id", "status", "id"),
+        Index("ix_rooms_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     room_code = Column(String(10), unique=True, index=True, nullable=False)
     room_name = Column(String(100), nullable=False)
     status = Column(Enum(RoomStatus), default=RoomStatus.WAITING, nullable=False)
     max_players = Column(Integer, default=10, nullable=False)
+    player_count = Column(Integer, default=0, nullable=False)  # 当前人数（准入计数器）
+    team_a_count = Column(Integer, default=0, nullable=False)  # A队人数
+    team_b_count = Column(Integer, default=0, nullable=False)  # B队人数
     team_a_name = Column(String(50), default="Team A")
     team_b_name = Column(String(50), default="Team B")
     created_by = Column(Integer, nullable=True)  # 创建者用户ID
@@ -33,6 +41,8 @@ class Room(Base):
     bp_config = Column(JSON, nullable=True)  # BP 配置（轮次、时间等）
     bp_state = Column(JSON, nullable=True)  # BP 当前状态
     bp_result = Column(JSON, nullable=True)  # BP 结果
+    bp_version = Column(Integer, default=0, nullable=False)  # BP 状态版本号（乐观锁）
+    state_version = Column(Integer, default=0, nullable=False)  # 房间状态版本号（ETag）
 
     # 关系
     users = relationship("User", back_populates="room", cascade="all, delete-orphan")
@@ -1,15 +1,28 @@
-from .admin import AdminLoginRequest, AdminLoginResponse, MapPoolCreateRequest, RoomCreateRequest
+from .admin import (
+    AdminLoginRequest,
+    AdminLoginResponse,
+    AdminStatusUpdateRequest,
+    BracketMatch,
+    BulkRoomCreateRequest,
+    MapPoolCreateRequest,
+    RoomCreateRequest,
+)
 from .room import RoomInfo, JoinRoomRequest, UpdateReadyRequest
-from .bp import BanMapRequest, PickMapRequest
+from .bp import StartBPRequest, BanMapRequest, PickMapRequest, PickSideRequest
 
 __all__ = [
     "AdminLoginRequest",
     "AdminLoginResponse",
+    "AdminStatusUpdateRequest",
+    "BracketMatch",
+    "BulkRoomCreateRequest",
     "MapPoolCreateRequest",
     "RoomCreateRequest",
     "RoomInfo",
     "JoinRoomRequest",
     "UpdateReadyRequest",
+    "StartBPRequest",
     "BanMapRequest",
     "PickMapRequest",
+    "PickSideRequest",
 ]
@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# 房间人数上限的取值范围
+MIN_PLAYERS = 2
+MAX_PLAYERS = 64
 
 
 class AdminLoginRequest(BaseModel):
@@ -13,6 +17,11 @@ class AdminLoginResponse(BaseModel):
     username: str
 
 
+class AdminStatusUpdateRequest(BaseModel):
+    """启用 / 禁用管理员请求"""
+    is_active: bool
+
+
 class MapPoolCreateRequest(BaseModel):
     """创建地图池请求"""
     name: str
@@ -31,6 +40,14 @@ class MapPoolCreateRequest(BaseModel):
     map07_name: str
     map07_icon: str
 
+    @property
+    def maps(self) -> list[dict]:
+        """转换为 MapPool.maps 格式"""
+        return [
+            {"name": getattr(self, f"map{i:02d}_name"), "image": getattr(self, f"map{i:02d}_icon")}
+            for i in range(1, 8)
+        ]
+
 
 class RoomCreateRequest(BaseModel):
     """创建房间请求"""
@@ -39,3 +56,23 @@ class RoomCreateRequest(BaseModel):
     team_b_name: str
     team_b_icon: str = "/assets/images/default-team-icon.png"
     mappool_config_id: str
+    room_name: str | None = None
+    max_players: int = Field(10, ge=MIN_PLAYERS, le=MAX_PLAYERS)
+    bp_config: dict | None = None
+
+
+class BracketMatch(BaseModel):
+    """赛程中的一场比赛（对应一个房间）"""
+    team_a_name: str
+    team_b_name: str
+    room_name: str | None = None
+    mappool_config_id: str | None = None  # 为空时使用赛程的地图池
+    bp_config: dict | None = None  # 为空时使用赛程的 BP 配置
+
+
+class BulkRoomCreateRequest(BaseModel):
+    """按赛程批量创建房间请求"""
+    mappool_config_id: str = "default"
+    bp_config: dict | None = None
+    max_players: int = Field(10, ge=MIN_PLAYERS, le=MAX_PLAYERS)
+    matches: list[BracketMatch]
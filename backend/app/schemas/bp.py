@@ -1,13 +1,24 @@
 from pydantic import BaseModel
 
 
+class StartBPRequest(BaseModel):
+    """开始BP请求"""
+    user_id: int | None = None
+
+
 class BanMapRequest(BaseModel):
     """Ban地图请求"""
-    session_id: str
-    map_id: str
+    user_id: int
+    map_name: str
 
 
 class PickMapRequest(BaseModel):
     """Pick地图请求"""
-    session_id: str
-    map_id: str
+    user_id: int
+    map_name: str
+
+
+class PickSideRequest(BaseModel):
+    """选择阵营请求"""
+    user_id: int
+    side: str  # CT / T
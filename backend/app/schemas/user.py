@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+
+
+class JoinRoomRequest(BaseModel):
+    """加入房间请求"""
+    room_code: str
+    username: str
+
+
+class SelectTeamRequest(BaseModel):
+    """选择队伍请求"""
+    user_id: int
+    team: str
+
+
+class UserResponse(BaseModel):
+    """用户信息响应"""
+    id: str
+    username: str
+    role: str
+    team: str | None = None
+    is_ready: bool
+    room_id: str
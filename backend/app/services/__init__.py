@@ -0,0 +1,28 @@
+from .bp_service import (
+    get_engine,
+    read_engine,
+    evict_engine,
+    reset_room,
+    begin_draft,
+    apply_operation,
+    apply_timeout,
+    rehydrate_timers,
+    on_transition,
+)
+from .bp_timer import timer_wheel
+from .bp_snapshot import read_snapshot, invalidate_snapshot
+
+__all__ = [
+    "get_engine",
+    "read_engine",
+    "evict_engine",
+    "reset_room",
+    "begin_draft",
+    "apply_operation",
+    "apply_timeout",
+    "rehydrate_timers",
+    "on_transition",
+    "timer_wheel",
+    "read_snapshot",
+    "invalidate_snapshot",
+]
@@ -0,0 +1,131 @@
+"""
+BP 赛制
+将声明式的赛制配置（Room.bp_config）编译为不可变的步骤表并缓存，
+状态机每一步只需按下标取出步骤
+
+配置示例:
+    {"format": "bo3"}
+    {"format": "bo5", "side_pick": true}
+    {"format": "custom", "steps": [["ban", 0], ["ban", 1], ["pick", 0], ["pick", 1]], "side_pick": true}
+
+steps 中 0 表示先手队伍，1 表示后手队伍；步骤不足时双方交替 Ban 至只剩一张决胜图。
+side_pick 开启时每次 Pick 之后由对方选择开局阵营，决胜图由最后一次 Ban 的对方选择
+（没有 Ban 步骤时由最后一次 Pick 的对方选择）
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from ..core.config import get_settings
+
+SIDES: Tuple[str, ...] = ("CT", "T")
+
+# 决胜图在步骤表中的目标下标
+DECIDER = -1
+
+# 预设赛制（0: 先手队伍, 1: 后手队伍）
+PRESETS = {
+    # Ban 至只剩一张图
+    "bo1": (),
+    # Ban -> Ban -> Ban -> Ban -> Pick -> Pick -> Decider
+    "bo3": (
+        ("ban", 0),
+        ("ban", 1),
+        ("ban", 0),
+        ("ban", 1),
+        ("pick", 0),
+        ("pick", 1),
+    ),
+    # Ban -> Ban -> Pick -> Pick -> Pick -> Pick -> Decider
+    "bo5": (
+        ("ban", 0),
+        ("ban", 1),
+        ("pick", 0),
+        ("pick", 1),
+        ("pick", 0),
+        ("pick", 1),
+    ),
+}
+
+# 赛制键: (名称, 地图步骤, 是否选边)
+FormatKey = Tuple[str, Tuple[Tuple[str, int], ...], bool]
+
+
+@dataclass(frozen=True, slots=True)
+class Step:
+    """步骤表中的一步"""
+    operation: str  # ban / pick / side
+    order: int  # 0: 先手队伍, 1: 后手队伍
+    round: int  # 轮次编号
+    target: int  # Ban/Pick 为地图在 sequence 中的位置；选边为对应地图的位置，决胜图为 DECIDER
+
+
+@dataclass(frozen=True, slots=True)
+class BPFormat:
+    """编译后的赛制"""
+    name: str
+    steps: Tuple[Step, ...]
+    map_steps: Tuple[int, ...]  # 消耗地图的步骤下标（按顺序）
+    side_steps: Tuple[int, ...]  # 选边步骤下标（按顺序）
+    decider_after: int  # 执行完该步骤后自动选出决胜图
+
+
+def format_key(config: Optional[dict]) -> FormatKey:
+    """校验赛制配置并转为可哈希的键，配置无效时抛出 ValueError"""
+    config = config or {}
+    name = str(config.get("format") or get_settings().BP_DEFAULT_FORMAT).lower()
+    side_pick = bool(config.get("side_pick", False))
+
+    if name in PRESETS:
+        return name, PRESETS[name], side_pick
+    if name != "custom":
+        raise ValueError(f"未知的赛制: {name}")
+
+    steps = []
+    for item in config.get("steps") or ():
+        try:
+            operation, order = item
+        except (TypeError, ValueError):
+            raise ValueError(f"无效的步骤: {item}")
+        if operation not in ("ban", "pick") or order not in (0, 1):
+            raise ValueError(f"无效的步骤: {item}")
+        steps.append((operation, order))
+    return name, tuple(steps), side_pick
+
+
+@lru_cache(maxsize=256)
+def compile_format(key: FormatKey, map_count: int) -> BPFormat:
+    """将赛制编译为步骤表，地图数量不足时抛出 ValueError"""
+    name, map_plan, side_pick = key
+    required = max(len(map_plan) + 1, 2)
+    if map_count < required:
+        raise ValueError(f"赛制 {name} 至少需要 {required} 张地图")
+
+    plan = list(map_plan)
+    while len(plan) < map_count - 1:
+        plan.append(("ban", len(plan) % 2))
+
+    steps = []
+    map_steps = []
+    side_steps = []
+    for slot, (operation, order) in enumerate(plan):
+        round_number = slot // 2 + 1
+        map_steps.append(len(steps))
+        steps.append(Step(operation, order, round_number, slot))
+        if side_pick and operation == "pick":
+            side_steps.append(len(steps))
+            steps.append(Step("side", 1 - order, round_number, slot))
+
+    decider_after = len(steps) - 1
+    if side_pick:
+        last_ban = next((order for operation, order in reversed(plan) if operation == "ban"), plan[-1][1])
+        side_steps.append(len(steps))
+        steps.append(Step("side", 1 - last_ban, len(plan) // 2 + 1, DECIDER))
+
+    return BPFormat(
+        name=name,
+        steps=tuple(steps),
+        map_steps=tuple(map_steps),
+        side_steps=tuple(side_steps),
+        decider_after=decider_after,
+    )
@@ -0,0 +1,716 @@
+"""
+BP 状态机引擎
+每个进行中的房间在内存中持有一份权威 BP 状态，轮次与地图校验不访问数据库，
+每次状态转移只产生一次写事务（以 bp_version 做乐观锁，兼容多进程部署）
+
+BP 记录是按房间内 seq 编号的事件流，状态由事件回放得到；
+每隔 BP_LOG_SNAPSHOT_INTERVAL 个事件写入一次压缩快照，加载时只需读取最新快照和之后的少量事件
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from ..core import cluster
+from ..core.config import get_settings
+from ..models import Room, User, BPRecord, BPSnapshot, BPOperationType, RoomStatus
+from .bp_format import DECIDER, SIDES, BPFormat, Step, compile_format, format_key
+from .bp_snapshot import invalidate_snapshot
+from .bp_timer import timer_owner, timer_wheel
+from .map_registry import PINNED_KEY, room_pool
+from .room_version import NEXT_VERSION
+
+
+def other_team(team: str) -> str:
+    """获取对方队伍"""
+    return "B" if team == "A" else "A"
+
+
+@dataclass(slots=True)
+class BPEngine:
+    """单个房间的 BP 状态机"""
+    room_id: int
+    status: str
+    maps: Tuple[str, ...]
+    format: BPFormat
+    first_team: Optional[str] = None
+    step: int = 0
+    used_mask: int = 0  # 已被 Ban/Pick 的地图位图
+    sequence: List[int] = field(default_factory=list)  # 按操作顺序排列的地图下标
+    sides: List[int] = field(default_factory=list)  # 按操作顺序排列的阵营下标（SIDES）
+    decider: Optional[int] = None
+    deadline: Optional[float] = None  # 当前步骤截止时间（Unix 时间戳）
+    version: int = 0
+    seq: int = 0  # 已应用的最后一个事件序号
+    roster: Dict[int, Tuple[Optional[str], str]] = field(default_factory=dict)  # {user_id: (team, username)}
+    map_info: Sequence[dict] = ()  # 地图池原始数据（含图片等）
+    map_index: Mapping[str, int] = field(default_factory=dict)  # 通常为地图池注册表中共享的只读索引
+    mappool_id: Optional[int] = None  # 使用的地图池版本
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def __post_init__(self):
+        if not self.map_index:
+            self.map_index = {name: i for i, name in enumerate(self.maps)}
+
+    @property
+    def finished(self) -> bool:
+        return self.step >= len(self.format.steps)
+
+    @property
+    def round_number(self) -> int:
+        if self.finished:
+            return len(self.format.map_steps) // 2 + 1
+        return self.format.steps[self.step].round
+
+    def _team(self, order: int) -> str:
+        return self.first_team if order == 0 else other_team(self.first_team)
+
+    def current_turn(self) -> Tuple[Optional[str], Optional[str]]:
+        """当前操作类型及操作队伍"""
+        if self.finished or self.first_team is None:
+            return None, None
+        step = self.format.steps[self.step]
+        return step.operation, self._team(step.order)
+
+    def target_map(self, step: Step) -> Optional[str]:
+        """选边步骤对应的地图"""
+        if step.target == DECIDER:
+            return self.maps[self.decider] if self.decider is not None else None
+        return self.maps[self.sequence[step.target]]
+
+    def validate(self, user_id: int, operation: str, choice: str) -> Tuple[str, str]:
+        """校验操作合法性（choice 为地图名或阵营），返回 (队伍, 用户名)"""
+        if self.status != RoomStatus.IN_PROGRESS.value:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="当前不是BP阶段",
+            )
+
+        member = self.roster.get(user_id)
+        if member is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="用户不存在",
+            )
+
+        expected_operation, expected_team = self.current_turn()
+        if expected_operation != operation:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="当前阶段不允许该操作",
+            )
+
+        team, username = member
+        if team != expected_team:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="不是你的操作轮次",
+            )
+
+        if operation == BPOperationType.SIDE.value:
+            if choice not in SIDES:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="无效的阵营",
+                )
+            return team, username
+
+        index = self.map_index.get(choice)
+        if index is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="地图不在地图池中",
+            )
+
+        if self.used_mask & (1 << index):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="地图已被禁用或选择",
+            )
+
+        return team, username
+
+    def advance(self, choice: str) -> List[Tuple[int, str, Optional[str], str]]:
+        """执行当前步骤（choice 为地图名或阵营），返回新增的记录 [(轮次, 操作类型, 队伍, 地图名)]"""
+        step = self.format.steps[self.step]
+        team = self._team(step.order)
+        if step.operation == BPOperationType.SIDE.value:
+            self.sides.append(SIDES.index(choice))
+            entries = [(step.round, step.operation, team, self.target_map(step))]
+        else:
+            index = self.map_index[choice]
+            self.used_mask |= 1 << index
+            self.sequence.append(index)
+            entries = [(step.round, step.operation, team, choice)]
+
+        if self.step == self.format.decider_after:
+            # 自动选择剩余的最后一张地图作为决胜图
+            remaining = [i for i in range(len(self.maps)) if not self.used_mask & (1 << i)]
+            if remaining:
+                self.decider = remaining[0]
+                self.used_mask |= 1 << self.decider
+                entries.append((len(self.format.map_steps) // 2 + 1, BPOperationType.AUTO.value, None, self.maps[self.decider]))
+        self.step += 1
+
+        self.deadline = None if self.finished else time.time() + get_settings().BP_TURN_SECONDS
+        if self.finished:
+            self.status = RoomStatus.COMPLETED.value
+
+        self.version += 1
+        return entries
+
+    def begin(self, first_team: str) -> None:
+        """Roll 点完成，由先手队伍开始第一次 Ban"""
+        self.first_team = first_team
+        self.status = RoomStatus.IN_PROGRESS.value
+        self.deadline = time.time() + get_settings().BP_TURN_SECONDS
+        self.version += 1
+
+    def apply_event(
+        self,
+        seq: int,
+        operation: str,
+        team: Optional[str],
+        map_name: Optional[str],
+        data: Optional[dict],
+    ) -> None:
+        """回放一个已持久化的事件"""
+        data = data or {}
+        if operation == BPOperationType.ROLL.value:
+            self.first_team = team
+        elif operation == BPOperationType.AUTO.value:
+            self.decider = self.map_index[map_name]
+            self.used_mask |= 1 << self.decider
+        elif operation == BPOperationType.SIDE.value:
+            self.sides.append(SIDES.index(data["side"]))
+            self.step += 1
+        else:
+            index = self.map_index[map_name]
+            self.used_mask |= 1 << index
+            self.sequence.append(index)
+            self.step += 1
+        if "deadline" in data:
+            self.deadline = data["deadline"]
+        self.seq = seq
+
+    def snapshot_state(self) -> dict:
+        """压缩后的状态，用于写入 BPSnapshot"""
+        return {
+            "first_team": self.first_team,
+            "sequence": [self.maps[i] for i in self.sequence],
+            "sides": [SIDES[i] for i in self.sides],
+            "decider": self.maps[self.decider] if self.decider is not None else None,
+            "deadline": self.deadline,
+        }
+
+    def restore(self, seq: int, state: dict) -> None:
+        """从快照恢复状态"""
+        self.first_team = state.get("first_team")
+        for map_name in state.get("sequence", []):
+            index = self.map_index[map_name]
+            self.used_mask |= 1 << index
+            self.sequence.append(index)
+            self.step += 1
+        for side in state.get("sides", []):
+            self.sides.append(SIDES.index(side))
+            self.step += 1
+        if state.get("decider") is not None:
+            self.decider = self.map_index[state["decider"]]
+            self.used_mask |= 1 << self.decider
+        self.deadline = state.get("deadline")
+        self.seq = seq
+
+    def default_choice(self) -> Optional[str]:
+        """超时自动操作的选择（结果确定）：选边取 CT，否则取地图池顺序中第一张可用地图"""
+        if not self.finished and self.format.steps[self.step].operation == BPOperationType.SIDE.value:
+            return SIDES[0]
+        for i, name in enumerate(self.maps):
+            if not self.used_mask & (1 << i):
+                return name
+        return None
+
+    def _taken(self, operation: str) -> List[dict]:
+        result = []
+        for step_index, index in zip(self.format.map_steps, self.sequence):
+            step = self.format.steps[step_index]
+            if step.operation == operation:
+                result.append({"map_name": self.maps[index], "team": self._team(step.order)})
+        return result
+
+    def _side_picks(self) -> List[dict]:
+        result = []
+        for step_index, side in zip(self.format.side_steps, self.sides):
+            step = self.format.steps[step_index]
+            result.append({"map_name": self.target_map(step), "team": self._team(step.order), "side": SIDES[side]})
+        return result
+
+    def to_bp_state(self) -> dict:
+        """序列化为对外返回的 bp_state"""
+        operation, team = self.current_turn()
+        if operation is None:
+            if self.status == RoomStatus.WAITING.value:
+                operation = "waiting"
+            else:
+                operation = "completed" if self.finished else "roll"
+        return {
+            "current_phase": operation,
+            "current_team": team,
+            "first_team": self.first_team,
+            "round_number": self.round_number,
+            "step": self.step,
+            "format": self.format.name,
+            "sequence": [self.maps[i] for i in self.sequence],
+            "side_picks": self._side_picks(),
+            "timer": get_settings().BP_TURN_SECONDS,
+            "deadline": self.deadline,
+            "version": self.version,
+        }
+
+    def to_delta(
+        self,
+        operation: str,
+        map_name: Optional[str],
+        team: Optional[str],
+        side: Optional[str] = None,
+    ) -> dict:
+        """本次状态转移的增量：操作、地图、队伍、下一步以及新版本号"""
+        next_operation, next_team = self.current_turn()
+        delta = {
+            "room_id": str(self.room_id),
+            "version": self.version,
+            "op": operation,
+            "map": map_name,
+            "team": team,
+            "next": {
+                "op": next_operation or ("completed" if self.finished else None),
+                "team": next_team,
+                "deadline": self.deadline,
+            },
+        }
+        if side is not None:
+            delta["side"] = side
+        if self.decider is not None:
+            delta["decider"] = self.maps[self.decider]
+        return delta
+
+    def to_bp_result(self) -> dict:
+        """序列化为 Room.bp_result"""
+        return {
+            "banned_maps": self._taken("ban"),
+            "picked_maps": self._taken("pick"),
+            "decider_map": {"map_name": self.maps[self.decider]} if self.decider is not None else None,
+            "side_picks": self._side_picks(),
+        }
+
+
+# 内存中的房间状态机: {room_id: BPEngine}
+_engines: Dict[int, BPEngine] = {}
+
+# 状态转移监听器，由 Socket.IO 层注册用于广播增量
+_listeners: List[Callable[[dict], Awaitable[None]]] = []
+
+
+def on_transition(listener: Callable[[dict], Awaitable[None]]) -> None:
+    """注册状态转移监听器，每次状态转移按版本号顺序收到一条增量"""
+    _listeners.append(listener)
+
+
+async def _notify(delta: dict) -> None:
+    for listener in _listeners:
+        try:
+            await listener(delta)
+        except Exception as e:
+            print(f"房间 {delta['room_id']} 增量广播失败: {e}")
+
+
+async def _load_engine(db: AsyncSession, room_id: int, with_roster: bool = True) -> BPEngine:
+    """从数据库加载房间状态机：最新快照 + 之后的事件"""
+    room_result = await db.execute(
+        select(Room.status, Room.bp_version, Room.bp_config).where(Room.id == room_id)
+    )
+    room = room_result.first()
+
+    if not room:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="房间不存在",
+        )
+
+    # 地图池来自进程内注册表，不访问数据库
+    mappool = await room_pool(db, room_id, room.bp_config)
+
+    roster = {}
+    if with_roster:
+        user_result = await db.execute(
+            select(User.id, User.team, User.username).where(User.room_id == room_id)
+        )
+        roster = {user_id: (team, username) for user_id, team, username in user_result.all()}
+
+    try:
+        bp_format = compile_format(format_key(room.bp_config), len(mappool.names))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"BP 赛制配置无效: {e}",
+        )
+
+    engine = BPEngine(
+        room_id=room_id,
+        status=RoomStatus(room.status).value,
+        maps=mappool.names,
+        format=bp_format,
+        version=room.bp_version or 0,
+        roster=roster,
+        map_info=mappool.map_info,
+        map_index=mappool.index,
+        mappool_id=mappool.id,
+    )
+
+    snapshot_result = await db.execute(
+        select(BPSnapshot.seq, BPSnapshot.state)
+        .where(BPSnapshot.room_id == room_id)
+        .order_by(BPSnapshot.seq.desc())
+        .limit(1)
+    )
+    snapshot = snapshot_result.first()
+    if snapshot is not None:
+        engine.restore(snapshot.seq, snapshot.state)
+
+    events_result = await db.execute(
+        select(
+            BPRecord.seq,
+            BPRecord.operation_type,
+            BPRecord.operator_team,
+            BPRecord.map_name,
+            BPRecord.operation_data,
+        )
+        .where(BPRecord.room_id == room_id, BPRecord.seq > engine.seq)
+        .order_by(BPRecord.seq)
+    )
+    for seq, operation_type, team, map_name, data in events_result.all():
+        engine.apply_event(seq, BPOperationType(operation_type).value, team, map_name, data)
+
+    return engine
+
+
+async def get_engine(db: AsyncSession, room_id: int) -> BPEngine:
+    """获取房间状态机，首次访问时从数据库加载；只缓存进行中的房间"""
+    engine = _engines.get(room_id)
+    if engine is not None:
+        return engine
+
+    engine = await _load_engine(db, room_id)
+    if engine.status != RoomStatus.IN_PROGRESS.value:
+        return engine
+
+    engine = _engines.setdefault(room_id, engine)
+    if room_id not in timer_wheel.timers:
+        _schedule_turn(engine)
+    return engine
+
+
+async def read_engine(db: AsyncSession, room_id: int) -> BPEngine:
+    """只读访问房间状态：优先使用内存状态机，否则从快照和事件回放（不缓存）"""
+    engine = _engines.get(room_id)
+    if engine is not None and not engine.lock.locked():
+        return engine
+    # 状态转移进行中时内存状态可能尚未提交，以数据库为准
+    return await _load_engine(db, room_id, with_roster=False)
+
+
+def evict_engine(room_id: int) -> None:
+    """移除内存中的房间状态机，下次访问时重新加载"""
+    _engines.pop(room_id, None)
+    timer_wheel.cancel(room_id)
+
+
+def _arm_timer(room_id: int, version: int, deadline: Optional[float]) -> None:
+    """按截止时间设置回合计时器，只有计时器主进程设置"""
+    if not timer_owner.is_leader:
+        return
+    if deadline is None:
+        delay = get_settings().BP_TURN_SECONDS
+    else:
+        delay = deadline - time.time()
+    timer_wheel.schedule(room_id, version, delay)
+
+
+def _schedule_turn(engine: BPEngine) -> None:
+    """为当前步骤设置回合计时器"""
+    if engine.finished or engine.first_team is None:
+        timer_wheel.cancel(engine.room_id)
+        return
+    _arm_timer(engine.room_id, engine.version, engine.deadline)
+
+
+def _state_changed(engine: BPEngine) -> dict:
+    """bp_state_changed 消息，附带当前步骤的计时信息供计时器主进程重设计时器"""
+    data = {"room_id": engine.room_id}
+    if not engine.finished and engine.first_team is not None:
+        data["turn"] = {"version": engine.version, "deadline": engine.deadline}
+    return data
+
+
+async def rehydrate_timers() -> int:
+    """成为计时器主进程时加载进行中的房间并按持久化的截止时间恢复回合计时器，返回房间数"""
+    from ..db.session import async_session_maker
+
+    async with async_session_maker() as db:
+        result = await db.execute(select(Room.id).where(Room.status == RoomStatus.IN_PROGRESS))
+        room_ids = result.scalars().all()
+        for room_id in room_ids:
+            try:
+                engine = await get_engine(db, room_id)
+            except Exception as e:
+                print(f"房间 {room_id} 计时器恢复失败: {e}")
+                continue
+            # 成为主进程之前已缓存的状态机没有计时器
+            if room_id not in timer_wheel.timers:
+                _schedule_turn(engine)
+    return len(room_ids)
+
+
+def _on_state_changed(data: dict) -> None:
+    """其他进程修改了房间 BP 状态，丢弃本地状态机和快照；计时器主进程按新的步骤重设计时器"""
+    room_id = data.get("room_id")
+    evict_engine(room_id)
+    invalidate_snapshot(room_id)
+    turn = data.get("turn")
+    if turn is not None:
+        _arm_timer(room_id, turn["version"], turn["deadline"])
+
+
+cluster.subscribe("bp_state_changed", _on_state_changed)
+
+
+async def reset_room(room_id: int) -> None:
+    """重置房间的内存状态机和状态快照（包括其他进程）"""
+    evict_engine(room_id)
+    invalidate_snapshot(room_id)
+    await cluster.publish("bp_state_changed", {"room_id": room_id})
+
+
+async def _append_events(
+    db: AsyncSession,
+    engine: BPEngine,
+    entries: List[Tuple[int, str, Optional[str], Optional[str], Optional[dict]]],
+) -> None:
+    """追加事件并按间隔写入压缩快照，调用方负责提交事务"""
+    first_seq = engine.seq + 1
+    await db.execute(
+        insert(BPRecord),
+        [
+            {
+                "room_id": engine.room_id,
+                "seq": first_seq + i,
+                "round_number": round_number,
+                "operation_type": BPOperationType(operation),
+                "operator_team": team,
+                "map_name": map_name,
+                "operation_data": data,
+            }
+            for i, (round_number, operation, team, map_name, data) in enumerate(entries)
+        ],
+    )
+    engine.seq = first_seq + len(entries) - 1
+
+    interval = get_settings().BP_LOG_SNAPSHOT_INTERVAL
+    if engine.finished or engine.seq // interval > (first_seq - 1) // interval:
+        # 只保留最新的快照
+        await db.execute(
+            delete(BPSnapshot).where(BPSnapshot.room_id == engine.room_id)
+        )
+        await db.execute(
+            insert(BPSnapshot).values(
+                room_id=engine.room_id,
+                seq=engine.seq,
+                state=engine.snapshot_state(),
+            )
+        )
+
+
+async def _persist(
+    db: AsyncSession,
+    engine: BPEngine,
+    expected_version: int,
+    entries: List[Tuple[int, str, Optional[str], str]],
+    operation_data: dict,
+) -> None:
+    """以单个事务写入 BP 事件与房间版本号"""
+    values: Dict[str, Any] = {"bp_version": engine.version, **NEXT_VERSION}
+    if engine.finished:
+        values.update(
+            status=RoomStatus.COMPLETED,
+            bp_result=engine.to_bp_result(),
+            completed_at=func.now(),
+        )
+
+    result = await db.execute(
+        update(Room)
+        .where(Room.id == engine.room_id, Room.bp_version == expected_version)
+        .values(**values)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="BP状态已变更，请刷新后重试",
+        )
+
+    await _append_events(
+        db,
+        engine,
+        [
+            # 队伍操作事件记录下一步的截止时间，回放时据此恢复计时器
+            (round_number, operation, team, map_name, dict(operation_data, deadline=engine.deadline) if team else None)
+            for round_number, operation, team, map_name in entries
+        ],
+    )
+    await db.commit()
+
+
+async def begin_draft(db: AsyncSession, room_id: int, first_team: str, rolls: dict) -> dict:
+    """Roll 点完成后开始 BP，返回新的 bp_state"""
+    engine = await _load_engine(db, room_id)
+
+    if engine.status != RoomStatus.PREPARING.value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="当前不是 Roll 阶段",
+        )
+
+    expected_version = engine.version
+    engine.begin(first_team)
+
+    # 固定本次 BP 使用的地图池版本，之后修改地图池不影响该房间的回放
+    bp_config = await db.scalar(select(Room.bp_config).where(Room.id == room_id))
+    bp_config = {**(bp_config or {}), PINNED_KEY: engine.mappool_id}
+
+    result = await db.execute(
+        update(Room)
+        .where(
+            Room.id == room_id,
+            Room.status == RoomStatus.PREPARING,
+            Room.bp_version == expected_version,
+        )
+        .values(
+            status=RoomStatus.IN_PROGRESS,
+            bp_version=engine.version,
+            bp_config=bp_config,
+            **NEXT_VERSION,
+        )
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="BP状态已变更，请刷新后重试",
+        )
+
+    await _append_events(
+        db,
+        engine,
+        [(0, BPOperationType.ROLL.value, first_team, None, {"rolls": rolls, "deadline": engine.deadline})],
+    )
+    await db.commit()
+
+    invalidate_snapshot(room_id)
+    _engines[room_id] = engine
+    _schedule_turn(engine)
+    await _notify(engine.to_delta("start", None, first_team))
+    await cluster.publish("bp_state_changed", _state_changed(engine))
+    return engine.to_bp_state()
+
+
+async def _transition(
+    db: AsyncSession,
+    engine: BPEngine,
+    choice: str,
+    operation_data: dict,
+) -> dict:
+    """执行当前步骤（choice 为地图名或阵营）、持久化并广播增量，调用方需持有 engine.lock"""
+    operation, team = engine.current_turn()
+    side = choice if operation == BPOperationType.SIDE.value else None
+    if side is not None:
+        operation_data = dict(operation_data, side=side)
+    expected_version = engine.version
+    entries = engine.advance(choice)
+    map_name = entries[0][3]
+    try:
+        await _persist(db, engine, expected_version, entries, operation_data)
+    except Exception:
+        # 持久化失败时丢弃内存状态，下次从数据库重新加载；
+        # 保留当前步骤的计时器，到期时重新加载状态机并按版本号判断是否仍需自动操作
+        _engines.pop(engine.room_id, None)
+        raise
+    finally:
+        invalidate_snapshot(engine.room_id)
+
+    if engine.finished:
+        evict_engine(engine.room_id)
+    else:
+        _schedule_turn(engine)
+
+    # 在持有锁时广播，保证增量按版本号顺序发出
+    delta = engine.to_delta(operation, map_name, team, side)
+    if operation_data.get("timeout"):
+        delta["timeout"] = True
+    await _notify(delta)
+
+    return {
+        "operation": operation,
+        "map_name": map_name,
+        "side": side,
+        "team": team,
+        "username": operation_data.get("username"),
+        "bp_state": engine.to_bp_state(),
+    }
+
+
+async def apply_operation(
+    db: AsyncSession,
+    room_id: int,
+    user_id: int,
+    operation: str,
+    choice: str,
+) -> dict:
+    """执行 Ban/Pick/选边操作，choice 为地图名或阵营"""
+    engine = await get_engine(db, room_id)
+
+    async with engine.lock:
+        team, username = engine.validate(user_id, operation, choice)
+        result = await _transition(db, engine, choice, {"user_id": user_id, "username": username})
+        changed = _state_changed(engine)
+
+    await cluster.publish("bp_state_changed", changed)
+    return result
+
+
+async def apply_timeout(room_id: int, version: int) -> Optional[dict]:
+    """回合超时，为当前队伍自动执行当前步骤；状态已变化时返回 None"""
+    from ..db.session import async_session_maker
+
+    async with async_session_maker() as db:
+        engine = await get_engine(db, room_id)
+
+        async with engine.lock:
+            if (
+                engine.version != version
+                or engine.status != RoomStatus.IN_PROGRESS.value
+                or engine.current_turn()[0] is None
+            ):
+                return None
+            try:
+                result = await _transition(db, engine, engine.default_choice(), {"timeout": True})
+            except HTTPException:
+                # 其他进程已推进该房间
+                return None
+            changed = _state_changed(engine)
+
+    await cluster.publish("bp_state_changed", changed)
+    return result
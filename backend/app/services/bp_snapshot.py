@@ -0,0 +1,110 @@
+"""
+BP 状态快照缓存
+按房间缓存 GET /api/bp/{room_id}/state 的序列化结果及 ETag，以 bp_version 为键，
+Ban/Pick/开始BP 时失效，重复读取（包括条件请求）不访问数据库
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+
+
+class Snapshot(NamedTuple):
+    """序列化后的 BP 状态及其缓存校验信息"""
+    version: int  # bp_version
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+
+# 快照缓存: {room_id: Snapshot}
+_snapshots: "OrderedDict[int, Snapshot]" = OrderedDict()
+
+# 正在构建快照的房间: {room_id: [构建中的请求数, 构建期间的失效次数]}
+# 避免构建期间发生的失效被旧快照覆盖；构建结束即删除，只包含正在构建的房间
+_building: Dict[int, List[int]] = {}
+
+
+def get_snapshot(room_id: int, version: Optional[int] = None) -> Optional[Snapshot]:
+    """读取快照，指定版本时版本不一致视为未命中"""
+    entry = _snapshots.get(room_id)
+    if entry is None or (version is not None and entry.version != version):
+        return None
+    _snapshots.move_to_end(room_id)
+    return entry
+
+
+def put_snapshot(room_id: int, snapshot: Snapshot) -> None:
+    """写入快照，超出容量时淘汰最久未使用的房间"""
+    current = _snapshots.get(room_id)
+    if current is not None and current.version > snapshot.version:
+        # 不用旧版本覆盖新版本
+        return
+    _snapshots[room_id] = snapshot
+    _snapshots.move_to_end(room_id)
+    while len(_snapshots) > get_settings().BP_SNAPSHOT_CACHE_SIZE:
+        _snapshots.popitem(last=False)
+
+
+def invalidate_snapshot(room_id: int) -> None:
+    """使房间快照失效"""
+    _snapshots.pop(room_id, None)
+    building = _building.get(room_id)
+    if building is not None:
+        building[1] += 1
+
+
+async def build_snapshot(db: AsyncSession, room_id: int) -> Snapshot:
+    """由 BP 事件流构建 BP 状态快照"""
+    from .bp_service import read_engine
+    from .room_version import get_validators
+    
+    # 先读取版本号再构建：构建期间发生变化时，响应内容只会比 ETag 新，不会让旧内容被当作最新
+    etag, last_modified = await get_validators(db, room_id)
+    engine = await read_engine(db, room_id)
+    result = engine.to_bp_result()
+    
+    body = orjson.dumps({
+        "success": True,
+        "data": {
+            "room_id": str(room_id),
+            "status": engine.status,
+            "bp_state": engine.to_bp_state(),
+            "maps": engine.map_info,
+            "banned_maps": result["banned_maps"],
+            "picked_maps": result["picked_maps"],
+            "decider_map": result["decider_map"],
+        },
+    })
+    return Snapshot(engine.version, body, etag, last_modified)
+
+
+async def read_snapshot_entry(db: AsyncSession, room_id: int) -> Snapshot:
+    """读取 BP 状态快照，未命中时从数据库构建并写入缓存"""
+    snapshot = get_snapshot(room_id)
+    if snapshot is not None:
+        return snapshot
+    
+    building = _building.get(room_id)
+    if building is None:
+        building = _building[room_id] = [0, 0]
+    building[0] += 1
+    generation = building[1]
+    try:
+        snapshot = await build_snapshot(db, room_id)
+    finally:
+        building[0] -= 1
+        if not building[0]:
+            del _building[room_id]
+    if building[1] == generation:
+        put_snapshot(room_id, snapshot)
+    return snapshot
+
+
+async def read_snapshot(db: AsyncSession, room_id: int) -> bytes:
+    """读取序列化后的 BP 状态"""
+    return (await read_snapshot_entry(db, room_id)).body
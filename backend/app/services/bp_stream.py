@@ -0,0 +1,189 @@
+"""
+BP 状态 SSE 推送
+每个有观众的房间一个 RoomStream：每次状态转移只序列化一次 SSE 帧，
+同一份 bytes 放入所有订阅者的队列；保留最近的帧用于 Last-Event-ID 断线续传，
+无法续传时先下发完整 BP 状态
+"""
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core import cluster, metrics
+from ..core.config import get_settings
+from .bp_service import on_transition
+from .bp_snapshot import invalidate_snapshot, read_snapshot_entry
+
+HEARTBEAT = b": ping\n\n"
+
+# (版本号, SSE 帧)
+Frame = Tuple[int, bytes]
+
+sse_frames_serialized = metrics.register(metrics.Counter(
+    "sse_frames_serialized_total", "序列化的 SSE 帧数", ("event",),
+))
+
+
+def _frame(event: str, version: int, data: bytes) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (version, event.encode(), data)
+
+
+class Subscriber:
+    """单个 SSE 连接"""
+
+    __slots__ = ("queue", "overflowed")
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=get_settings().SSE_QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, frame: Frame) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # 消费过慢：丢弃积压，之后下发一次完整状态
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+
+class RoomStream:
+    """单个房间的 SSE 广播"""
+
+    __slots__ = ("subscribers", "recent", "state")
+
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self.recent: Deque[Frame] = deque(maxlen=get_settings().SSE_REPLAY_SIZE)
+        self.state: Optional[Frame] = None  # 最近一次序列化的完整状态帧
+
+    def publish(self, frame: Frame) -> None:
+        if self.recent and frame[0] <= self.recent[-1][0]:
+            return
+        self.recent.append(frame)
+        for subscriber in self.subscribers:
+            subscriber.push(frame)
+
+    def replay(self, last_id: int) -> Optional[list]:
+        """last_id 之后的帧；缓冲区不连续覆盖时返回 None"""
+        if not self.recent or last_id < self.recent[0][0] - 1 or last_id > self.recent[-1][0]:
+            return None
+        return [frame for frame in self.recent if frame[0] > last_id]
+
+
+# 有观众的房间: {room_id: RoomStream}
+_streams: Dict[str, RoomStream] = {}
+
+metrics.register(metrics.Gauge(
+    "sse_subscribers", "SSE 连接数（本进程）",
+    collect=lambda: {(): sum(len(stream.subscribers) for stream in _streams.values())},
+))
+
+
+def _on_bp_delta(delta: dict) -> None:
+    """收到状态转移增量（本进程或其他进程），序列化一次后分发给所有订阅者"""
+    room_id = delta["room_id"]
+    # 其他进程的增量可能先于快照失效通知到达，这里先失效，保证之后读到的完整状态不旧于增量
+    invalidate_snapshot(int(room_id))
+
+    stream = _streams.get(room_id)
+    if stream is None:
+        return
+    sse_frames_serialized.inc("bp_delta")
+    stream.publish((delta["version"], _frame("bp_delta", delta["version"], orjson.dumps(delta))))
+
+
+async def _forward_delta(delta: dict) -> None:
+    await cluster.notify("bp_delta", delta)
+
+
+on_transition(_forward_delta)
+cluster.subscribe("bp_delta", _on_bp_delta)
+
+
+async def _state_frame(db: AsyncSession, room_id: int, stream: RoomStream) -> Frame:
+    """完整状态帧，同一版本只序列化一次"""
+    snapshot = await read_snapshot_entry(db, room_id)
+    if stream.state is None or stream.state[0] != snapshot.version:
+        sse_frames_serialized.inc("bp_state")
+        data = orjson.loads(snapshot.body)["data"]
+        stream.state = (snapshot.version, _frame("bp_state", snapshot.version, orjson.dumps(data)))
+    return stream.state
+
+
+async def open_stream(db: AsyncSession, room_id: int, last_event_id: Optional[str]) -> AsyncIterator[bytes]:
+    """订阅房间并返回 SSE 字节流；房间不存在时在开始推送前抛出 404"""
+    key = str(room_id)
+    stream = _streams.get(key)
+    if stream is None:
+        stream = _streams[key] = RoomStream()
+    subscriber = Subscriber()
+    # 先订阅再读取初始状态，期间发生的转移会留在队列中
+    stream.subscribers.add(subscriber)
+
+    try:
+        initial = None
+        if last_event_id is not None:
+            try:
+                initial = stream.replay(int(last_event_id))
+            except ValueError:
+                pass
+        if initial is None:
+            initial = [await _state_frame(db, room_id, stream)]
+    except BaseException:
+        _unsubscribe(key, stream, subscriber)
+        raise
+
+    return _iterate(room_id, key, stream, subscriber, initial)
+
+
+def _unsubscribe(key: str, stream: RoomStream, subscriber: Subscriber) -> None:
+    stream.subscribers.discard(subscriber)
+    if not stream.subscribers and _streams.get(key) is stream:
+        del _streams[key]
+
+
+async def _iterate(
+    room_id: int,
+    key: str,
+    stream: RoomStream,
+    subscriber: Subscriber,
+    initial: list,
+) -> AsyncIterator[bytes]:
+    from ..db.session import async_session_maker
+
+    settings = get_settings()
+    sent = -1
+    try:
+        yield b"retry: %d\n\n" % settings.SSE_RETRY_MS
+        for version, frame in initial:
+            sent = version
+            yield frame
+
+        while True:
+            if subscriber.overflowed:
+                subscriber.overflowed = False
+                # 请求的数据库会话此时已关闭，使用新的会话
+                async with async_session_maker() as db:
+                    version, frame = await _state_frame(db, room_id, stream)
+                sent = version
+                yield frame
+                continue
+
+            try:
+                version, frame = await asyncio.wait_for(
+                    subscriber.queue.get(), timeout=settings.SSE_HEARTBEAT_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+
+            if version > sent:
+                sent = version
+                yield frame
+    finally:
+        _unsubscribe(key, stream, subscriber)
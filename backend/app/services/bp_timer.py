@@ -0,0 +1,117 @@
+"""
+BP 回合计时器
+所有房间共用一个时间轮和一个 asyncio 任务，每个刻度合并发出一次计时广播，
+回合到期时回调自动 Ban/Pick；多进程部署时只有 timer_owner 所在的进程设置计时器
+"""
+import asyncio
+import math
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ..core.config import get_settings
+from ..core.leader import LeaderLock
+
+# 计时广播回调: [(room_id, 剩余秒数, bp_version)]
+TickCallback = Callable[[List[Tuple[int, int, int]]], Awaitable[None]]
+# 到期回调: (room_id, bp_version)
+ExpireCallback = Callable[[int, int], Awaitable[None]]
+
+
+class TimerWheel:
+    """哈希时间轮，调度、取消均为 O(1)，每个刻度只处理一个槽位"""
+
+    def __init__(self, slots: int = 64, tick: float = 1.0):
+        self.tick = tick
+        self.now = 0  # 当前刻度
+        self.slots: List[Dict[int, int]] = [{} for _ in range(slots)]  # 每个槽位: {room_id: 到期刻度}
+        self.timers: Dict[int, Tuple[int, int]] = {}  # {room_id: (到期刻度, bp_version)}
+        self.on_tick: Optional[TickCallback] = None
+        self.on_expire: Optional[ExpireCallback] = None
+        self._task: Optional[asyncio.Task] = None
+        self._expiring: Set[asyncio.Task] = set()  # 进行中的到期回调，保留引用防止被垃圾回收
+
+    def schedule(self, room_id: int, version: int, delay: float) -> None:
+        """为房间设置回合计时器，覆盖之前的计时器"""
+        self.cancel(room_id)
+        deadline = self.now + max(1, math.ceil(delay / self.tick))
+        self.slots[deadline % len(self.slots)][room_id] = deadline
+        self.timers[room_id] = (deadline, version)
+
+    def cancel(self, room_id: int) -> None:
+        """取消房间计时器"""
+        timer = self.timers.pop(room_id, None)
+        if timer is not None:
+            self.slots[timer[0] % len(self.slots)].pop(room_id, None)
+
+    def clear(self) -> None:
+        """取消所有计时器"""
+        for slot in self.slots:
+            slot.clear()
+        self.timers.clear()
+
+    def remaining(self, room_id: int) -> Optional[int]:
+        """房间回合剩余秒数"""
+        timer = self.timers.get(room_id)
+        if timer is None:
+            return None
+        return math.ceil((timer[0] - self.now) * self.tick)
+
+    def advance(self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int, int]]]:
+        """前进一个刻度，返回 (到期的计时器, 计时广播)"""
+        self.now += 1
+        slot = self.slots[self.now % len(self.slots)]
+
+        expired = []
+        for room_id, deadline in list(slot.items()):
+            # 同一槽位中还有后续轮次才到期的计时器
+            if deadline == self.now:
+                del slot[room_id]
+                expired.append((room_id, self.timers.pop(room_id)[1]))
+
+        ticks = [
+            (room_id, math.ceil((deadline - self.now) * self.tick), version)
+            for room_id, (deadline, version) in self.timers.items()
+        ]
+        return expired, ticks
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while True:
+            # 按绝对时间对齐刻度，避免累积漂移
+            next_at += self.tick
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+            expired, ticks = self.advance()
+            for room_id, version in expired:
+                if self.on_expire is not None:
+                    task = asyncio.create_task(self.on_expire(room_id, version))
+                    self._expiring.add(task)
+                    task.add_done_callback(self._expiring.discard)
+            if ticks and self.on_tick is not None:
+                try:
+                    await self.on_tick(ticks)
+                except Exception as e:
+                    print(f"计时广播失败: {e}")
+
+    def start(self, on_tick: TickCallback, on_expire: ExpireCallback) -> None:
+        """启动时间轮任务"""
+        self.on_tick = on_tick
+        self.on_expire = on_expire
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止时间轮任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+timer_wheel = TimerWheel(slots=get_settings().BP_TIMER_WHEEL_SLOTS)
+
+# 回合计时的主进程，避免多个进程重复广播计时和重复执行超时操作
+timer_owner = LeaderLock("bp_timer")
@@ -0,0 +1,186 @@
+"""
+地图池注册表
+进程内一次性加载全部地图池，保存为不可变对象（地图名驻留、frozenset 名称索引、
+预先渲染的管理后台响应），地图校验与地图池列表不再访问数据库；
+管理员创建或修改地图池时通知所有进程重新加载
+
+地图池按版本写时复制：修改地图池写入新版本，旧版本保留并指向新版本。
+按 ID 解析得到最新版本；BP 开始时房间固定使用当时的版本（bp_config[PINNED_KEY]），
+之后地图池再被修改，房间的事件回放仍使用同一份地图列表和步骤表
+"""
+import asyncio
+import sys
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core import cluster
+from ..models import MapPool
+
+DEFAULT_MAP_ICON = "/images/default-map-icon.png"
+
+# bp_config 中固定的地图池版本
+PINNED_KEY = "mappool_version_id"
+
+
+@dataclass(frozen=True, slots=True)
+class MapPoolEntry:
+    """不可变的地图池"""
+    id: int
+    name: str
+    is_default: bool
+    room_id: Optional[int]
+    replaced_by: Optional[int]  # 新版本 ID，为空表示当前版本
+    names: Tuple[str, ...]  # 按地图池顺序排列的地图名
+    name_set: FrozenSet[str]
+    index: Mapping[str, int]  # {地图名: 下标}
+    map_info: Tuple[dict, ...]  # 地图原始数据（含图片），只读
+
+    def __contains__(self, map_name: str) -> bool:
+        return map_name in self.name_set
+
+
+@dataclass(frozen=True, slots=True)
+class Registry:
+    """某一时刻的全部地图池"""
+    pools: Mapping[int, MapPoolEntry]  # {地图池 ID（含旧版本 ID）: 最新版本}
+    versions: Mapping[int, MapPoolEntry]  # {版本 ID: 该版本}，包括已被替换的旧版本
+    room_pools: Mapping[int, MapPoolEntry]  # 绑定到房间的地图池: {room_id: 最新版本}
+    default: Optional[MapPoolEntry]
+    admin_payload: bytes  # GET /api/admin/mappools 的响应体
+
+
+_registry: Optional[Registry] = None
+_load_lock = asyncio.Lock()
+
+# 失效计数，避免加载期间发生的失效被旧数据覆盖
+_generation = 0
+
+
+def _to_entry(mappool: MapPool) -> MapPoolEntry:
+    names = tuple(sys.intern(m["name"]) for m in mappool.maps)
+    return MapPoolEntry(
+        id=mappool.id,
+        name=mappool.name,
+        is_default=bool(mappool.is_default),
+        room_id=mappool.room_id,
+        replaced_by=mappool.replaced_by,
+        names=names,
+        name_set=frozenset(names),
+        index=MappingProxyType({name: i for i, name in enumerate(names)}),
+        map_info=tuple(
+            {"name": name, "image": m.get("image", DEFAULT_MAP_ICON)}
+            for name, m in zip(names, mappool.maps)
+        ),
+    )
+
+
+def _render_admin_payload(pools: Tuple[MapPoolEntry, ...]) -> bytes:
+    """转换为前端格式: mapNN_name / mapNN_icon"""
+    response = []
+    for pool in pools:
+        maps_dict = {}
+        for i, m in enumerate(pool.map_info, 1):
+            maps_dict[f"map{i:02d}_name"] = m["name"]
+            maps_dict[f"map{i:02d}_icon"] = m["image"]
+
+        response.append({
+            "id": str(pool.id),
+            "name": pool.name,
+            "is_default": pool.is_default,
+            **maps_dict
+        })
+    return orjson.dumps(response)
+
+
+def _latest(versions: Mapping[int, MapPoolEntry], pool: MapPoolEntry) -> MapPoolEntry:
+    """沿版本链找到最新版本"""
+    while pool.replaced_by is not None and pool.replaced_by in versions:
+        pool = versions[pool.replaced_by]
+    return pool
+
+
+async def get_registry(db: AsyncSession) -> Registry:
+    """获取地图池注册表，首次访问或失效后从数据库加载"""
+    global _registry
+    registry = _registry
+    if registry is not None:
+        return registry
+
+    async with _load_lock:
+        if _registry is not None:
+            return _registry
+
+        generation = _generation
+        result = await db.execute(select(MapPool).order_by(MapPool.id))
+        versions = {mappool.id: _to_entry(mappool) for mappool in result.scalars().all()}
+        current = tuple(pool for pool in versions.values() if pool.replaced_by is None)
+        registry = Registry(
+            pools=MappingProxyType({pool_id: _latest(versions, pool) for pool_id, pool in versions.items()}),
+            versions=MappingProxyType(versions),
+            room_pools=MappingProxyType({pool.room_id: pool for pool in current if pool.room_id is not None}),
+            default=next((pool for pool in current if pool.is_default), None),
+            admin_payload=_render_admin_payload(current),
+        )
+        if generation == _generation:
+            _registry = registry
+        return registry
+
+
+async def resolve_pool(db: AsyncSession, mappool_id: Optional[str]) -> MapPoolEntry:
+    """按 ID 获取地图池，为空或 "default" 时返回默认地图池"""
+    registry = await get_registry(db)
+    if not mappool_id or mappool_id == "default":
+        pool = registry.default
+    else:
+        try:
+            pool = registry.pools.get(int(mappool_id))
+        except ValueError:
+            pool = None
+
+    if pool is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="地图池不存在",
+        )
+    return pool
+
+
+async def room_pool(db: AsyncSession, room_id: int, bp_config: Optional[dict]) -> MapPoolEntry:
+    """房间使用的地图池：BP 开始时固定的版本 > 绑定到房间的地图池 > bp_config.mappool_id > 默认地图池"""
+    registry = await get_registry(db)
+    pool = None
+    if bp_config and bp_config.get(PINNED_KEY) is not None:
+        pool = registry.versions.get(bp_config[PINNED_KEY])
+    if pool is None:
+        pool = registry.room_pools.get(room_id)
+    if pool is None and bp_config and bp_config.get("mappool_id") is not None:
+        pool = registry.pools.get(bp_config["mappool_id"])
+    if pool is None:
+        pool = registry.default
+
+    if pool is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="地图池不存在",
+        )
+    return pool
+
+
+def _on_mappools_changed(data: dict) -> None:
+    global _registry, _generation
+    _registry = None
+    _generation += 1
+
+
+async def invalidate() -> None:
+    """地图池变更后使注册表失效（包括其他进程）"""
+    await cluster.notify("mappools_changed", {})
+
+
+cluster.subscribe("mappools_changed", _on_mappools_changed)
@@ -0,0 +1,44 @@
+"""
+房间码分配
+一次生成一批候选房间码，用一条 IN 查询剔除已存在的房间码，只为冲突的部分重新生成
+"""
+import random
+import string
+from typing import List
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Room
+
+ROOM_CODE_ALPHABET = string.ascii_uppercase + string.digits
+ROOM_CODE_LENGTH = 6
+
+# 每轮查询后仍有冲突时重新生成的最大轮数
+MAX_ATTEMPTS = 5
+
+
+def _random_code() -> str:
+    return ''.join(random.choices(ROOM_CODE_ALPHABET, k=ROOM_CODE_LENGTH))
+
+
+async def allocate_room_codes(db: AsyncSession, count: int) -> List[str]:
+    """分配 count 个互不相同且数据库中不存在的房间码"""
+    codes: set = set()
+    for _ in range(MAX_ATTEMPTS):
+        candidates: set = set()
+        while len(candidates) < count - len(codes):
+            code = _random_code()
+            if code not in codes:
+                candidates.add(code)
+
+        result = await db.execute(select(Room.room_code).where(Room.room_code.in_(candidates)))
+        codes |= candidates - set(result.scalars().all())
+        if len(codes) == count:
+            return list(codes)
+
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="房间码分配失败，请重试",
+    )
@@ -0,0 +1,42 @@
+"""
+房间状态版本号
+房间内任何对外可见的变化（加入、选队、准备、Roll 点、BP 状态转移）都会递增 Room.state_version，
+条件请求只需按主键读取版本号和修改时间，不加载用户和 BP 记录
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.conditional import make_etag
+from ..models import Room
+
+# 在 update(Room).values(...) 中使用
+NEXT_VERSION = {"state_version": Room.state_version + 1}
+
+
+async def bump(db: AsyncSession, room_id: int) -> None:
+    """递增房间状态版本号，调用方负责提交事务"""
+    await db.execute(
+        update(Room)
+        .where(Room.id == room_id)
+        .values(NEXT_VERSION)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_validators(db: AsyncSession, room_id: int) -> Tuple[str, Optional[datetime]]:
+    """房间的 (ETag, Last-Modified)，房间不存在时抛出 404"""
+    result = await db.execute(
+        select(Room.state_version, Room.updated_at, Room.created_at).where(Room.id == room_id)
+    )
+    row = result.first()
+
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="房间不存在",
+        )
+    return make_etag(room_id, row.state_version), row.updated_at or row.created_at
@@ -1,3 +1,5 @@
+from socketio import ASGIApp
+
 from .manager import get_sio, sio
 from .handlers import register_handlers
 
@@ -5,6 +7,6 @@ from .handlers import register_handlers
 register_handlers(sio)
 
 # 创建 Socket.IO ASGI 应用
-socket_app = sio.asgi_app
+socket_app = ASGIApp(sio, socketio_path="")
 
 __all__ = ["get_sio", "socket_app"]
@@ -0,0 +1,176 @@
+"""
+房间聊天记录
+每个房间一个按条数和字节数限制的环形缓冲区，新加入的连接一次性收到历史消息；
+可选按固定间隔批量写入 chat_messages 表，发送消息本身不访问数据库
+"""
+import asyncio
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from ..core.config import get_settings
+from ..models import ChatMessage
+
+# 单条消息的固定开销估算（字节）
+ENTRY_OVERHEAD = 64
+
+# 紧凑表示: (user_id, username, team, content, sent_at)
+Entry = Tuple[Optional[int], str, Optional[str], str, datetime]
+
+
+def _entry_size(entry: Entry) -> int:
+    return ENTRY_OVERHEAD + len(entry[1].encode()) + len(entry[3].encode())
+
+
+def _to_message(room_id: str, entry: Entry) -> dict:
+    user_id, username, team, content, sent_at = entry
+    return {
+        "room_id": room_id,
+        "session_id": str(user_id) if user_id is not None else None,
+        "user_name": username,
+        "team": team,
+        "content": content,
+        "timestamp": sent_at.isoformat().replace("+00:00", "Z"),
+    }
+
+
+class ChatHistory:
+    """单个房间的聊天记录环形缓冲区"""
+
+    __slots__ = ("entries", "size")
+
+    def __init__(self):
+        self.entries: Deque[Entry] = deque()
+        self.size = 0
+
+    def append(self, entry: Entry) -> None:
+        """追加消息，超出条数或字节数限制时丢弃最旧的消息"""
+        settings = get_settings()
+        self.entries.append(entry)
+        self.size += _entry_size(entry)
+        while self.entries and (
+            len(self.entries) > settings.CHAT_HISTORY_MAX_ENTRIES
+            or self.size > settings.CHAT_HISTORY_MAX_BYTES
+        ):
+            self.size -= _entry_size(self.entries.popleft())
+
+
+# 聊天记录: {room_id: ChatHistory}，按最近活跃排序
+_histories: "OrderedDict[str, ChatHistory]" = OrderedDict()
+
+# 待写入数据库的消息: (room_id, entry)
+_pending: Deque[Tuple[int, Entry]] = deque(maxlen=get_settings().CHAT_FLUSH_MAX_PENDING)
+
+
+def _append(room_id: str, entry: Entry) -> None:
+    history = _histories.get(room_id)
+    if history is None:
+        history = _histories[room_id] = ChatHistory()
+    _histories.move_to_end(room_id)
+    history.append(entry)
+    while len(_histories) > get_settings().CHAT_HISTORY_MAX_ROOMS:
+        _histories.popitem(last=False)
+
+
+def record_message(room_id: str, user_id: int, username: str, team: Optional[str], content: str) -> dict:
+    """记录本进程收到的聊天消息，返回广播用的消息"""
+    entry = (user_id, username, team, content, datetime.now(timezone.utc))
+    _append(room_id, entry)
+
+    if get_settings().CHAT_PERSIST_ENABLED:
+        try:
+            _pending.append((int(room_id), entry))
+        except ValueError:
+            pass
+
+    return _to_message(room_id, entry)
+
+
+def record_remote_message(message: dict) -> None:
+    """记录其他进程收到的聊天消息（只进缓冲区，由原进程负责写库）"""
+    session_id = message.get("session_id")
+    entry = (
+        int(session_id) if session_id else None,
+        message["user_name"],
+        message.get("team"),
+        message["content"],
+        datetime.fromisoformat(message["timestamp"].replace("Z", "+00:00")),
+    )
+    _append(message["room_id"], entry)
+
+
+def get_history(room_id: str) -> List[dict]:
+    """房间的历史消息（按时间顺序）"""
+    history = _histories.get(room_id)
+    if history is None:
+        return []
+    return [_to_message(room_id, entry) for entry in history.entries]
+
+
+async def flush_pending() -> int:
+    """将待写入的消息批量写入数据库，返回写入条数"""
+    if not _pending:
+        return 0
+
+    from ..db.session import async_session_maker
+
+    batch = list(_pending)
+    _pending.clear()
+    try:
+        async with async_session_maker() as db:
+            await db.execute(
+                insert(ChatMessage),
+                [
+                    {
+                        "room_id": room_id,
+                        "user_id": user_id,
+                        "username": username,
+                        "team": team,
+                        "content": content,
+                        "sent_at": sent_at,
+                    }
+                    for room_id, (user_id, username, team, content, sent_at) in batch
+                ],
+            )
+            await db.commit()
+    except Exception as e:
+        # 写入失败时放回队列头部，下次重试；写入期间又有新消息时，超出上限的部分丢弃最旧的消息
+        room = _pending.maxlen - len(_pending)
+        dropped = max(len(batch) - room, 0)
+        print(f"聊天记录写入失败: {e}" + (f"，丢弃最旧的 {dropped} 条" if dropped else ""))
+        _pending.extendleft(reversed(batch[dropped:]))
+        return 0
+    return len(batch)
+
+
+class ChatFlusher:
+    """按固定间隔批量写入聊天记录"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(get_settings().CHAT_FLUSH_INTERVAL)
+            await flush_pending()
+
+    def start(self):
+        """启动批量写入任务（未启用持久化时不启动）"""
+        if self._task is None and get_settings().CHAT_PERSIST_ENABLED:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止批量写入任务并写入剩余消息"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await flush_pending()
+
+
+chat_flusher = ChatFlusher()
@@ -0,0 +1,98 @@
+"""
+Socket.IO 客户端管理器
+通过 SOCKETIO_MANAGER 选择后端：
+- memory: 单进程内存管理器（默认）
+- redis: 基于 Redis 发布订阅，多个 worker / 主机共享房间和广播
+- inprocess: 进程内发布订阅，用于测试多节点行为
+"""
+import asyncio
+import json
+import pickle
+from typing import Dict, List, Optional
+
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from ..core import cluster
+from ..core.config import get_settings
+
+
+def _decode(message):
+    """解码消息队列中的消息"""
+    if isinstance(message, dict):
+        return message
+    if isinstance(message, bytes):
+        try:
+            return pickle.loads(message)
+        except Exception:
+            pass
+    try:
+        return json.loads(message)
+    except Exception:
+        return None
+
+
+class ClusterMixin:
+    """在 Socket.IO 消息队列上附带跨进程事件（method = "cluster"）"""
+
+    async def _listen(self):
+        async for message in super()._listen():
+            data = _decode(message)
+            if isinstance(data, dict) and data.get("method") == "cluster":
+                if data.get("host_id") != self.host_id:
+                    await cluster.dispatch(data)
+                continue
+            yield data if data is not None else message
+
+    async def publish_cluster(self, message: dict) -> None:
+        """发布跨进程事件"""
+        await self._publish({"method": "cluster", "host_id": self.host_id, **message})
+
+
+class InProcessPubSubManager(AsyncPubSubManager):
+    """进程内发布订阅管理器，同一进程内的多个 AsyncServer 共享同一频道"""
+    name = "inprocess"
+
+    # 频道订阅队列: {channel: [queue]}
+    _channels: Dict[str, List[asyncio.Queue]] = {}
+
+    async def _publish(self, data):
+        # 与真实消息队列一样经过序列化，避免各节点共享同一个对象
+        message = pickle.dumps(data)
+        for queue in self._channels.get(self.channel, []):
+            queue.put_nowait(message)
+
+    async def _listen(self):
+        queue: asyncio.Queue = asyncio.Queue()
+        self._channels.setdefault(self.channel, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._channels[self.channel].remove(queue)
+
+
+class RedisClientManager(ClusterMixin, socketio.AsyncRedisManager):
+    """Redis 客户端管理器"""
+
+
+class InProcessClientManager(ClusterMixin, InProcessPubSubManager):
+    """进程内客户端管理器"""
+
+
+def create_client_manager() -> Optional[socketio.AsyncManager]:
+    """根据配置创建客户端管理器，返回 None 时使用 Socket.IO 默认内存管理器"""
+    settings = get_settings()
+    backend = settings.SOCKETIO_MANAGER
+
+    if backend == "memory":
+        return None
+    if backend == "redis":
+        manager = RedisClientManager(settings.REDIS_URL, channel=settings.SOCKETIO_CHANNEL)
+    elif backend == "inprocess":
+        manager = InProcessClientManager(channel=settings.SOCKETIO_CHANNEL)
+    else:
+        raise ValueError(f"不支持的 SOCKETIO_MANAGER: {backend}")
+
+    cluster.set_publisher(manager.publish_cluster)
+    return manager
@@ -14,6 +14,7 @@ class SocketEvents:
     # 用户事件
     USER_JOINED = 'user_joined'
     USER_LEFT = 'user_left'
+    USER_UPDATED = 'user_updated'  # 用户改名
     
     # 队伍事件
     TEAM_UPDATED = 'team_updated'
@@ -24,9 +25,17 @@ class SocketEvents:
     MAP_BANNED = 'map_banned'
     MAP_PICKED = 'map_picked'
     TIMER_TICK = 'timer_tick'
+    BP_DELTA = 'bp_delta'  # 服务端生成的带版本号的增量
+    BP_RESYNC = 'bp_resync'  # 客户端发现版本号不连续时请求完整状态
+    BP_STATE = 'bp_state'  # 完整 BP 状态（只发给请求的连接）
+    
+    # 观众事件
+    SPECTATE = 'spectate'  # 以观众身份观看房间
+    SPECTATOR_UPDATE = 'spectator_update'  # 按固定频率合并后的观众推送
     
     # 聊天事件
     CHAT_MESSAGE = 'chat_message'
+    CHAT_HISTORY = 'chat_history'  # 加入房间时一次性补发的历史消息
     
     # BP 结束事件
     BP_FINISHED = 'bp_finished'
@@ -1,41 +1,228 @@
-from typing import Dict
+from typing import Dict, List, Optional, Set, Tuple
 from socketio import AsyncServer
-from fastapi import Request
-from datetime import datetime
+from fastapi import HTTPException, Request
+import orjson
+from sqlalchemy import update
 
+from ..core import cluster, metrics
 from ..core.deps import get_db
 from ..core.config import get_settings
-from ..models import User, Room
+from ..db.query_stats import track_queries
+from ..models import User, Room, UserRole
+from ..services.bp_service import apply_timeout, on_transition
+from ..services import room_version
+from ..services.bp_snapshot import read_snapshot
+from .chat_history import get_history, record_message, record_remote_message
+from .client_manager import create_client_manager
+from .serializer import OrjsonSerializer
+from .events import SocketEvents
+from .presence import cluster_presence
+from .spectators import PendingUpdate, spectate_room, spectator_fanout
+
+class InstrumentedServer(AsyncServer):
+    """按事件名统计发送次数和每个事件的 SQL 查询的 Socket.IO 服务器"""
+    
+    async def emit(self, event, *args, **kwargs):
+        metrics.socketio_emits.inc(event)
+        return await super().emit(event, *args, **kwargs)
+    
+    async def _trigger_event(self, event, namespace, *args):
+        if not get_settings().SQL_QUERY_STATS_ENABLED:
+            return await super()._trigger_event(event, namespace, *args)
+        with track_queries("socketio", f"socket {event}"):
+            return await super()._trigger_event(event, namespace, *args)
+
+
+sio = InstrumentedServer(
+    async_mode='asgi',
+    cors_allowed_origins=get_settings().CORS_ALLOWED_ORIGINS,
+    client_manager=create_client_manager(),
+    json=OrjsonSerializer,
+)
 
-sio = AsyncServer(async_mode='auto', cors_allowed_origins=get_settings().CORS_ALLOWED_ORIGINS)
+# 队伍（与 User.team 一致，观众没有队伍）
+TEAMS = ("A", "B")
+
+# 名称最大长度（与 User.username 一致）
+MAX_NAME_LENGTH = 50
 
 # 存储房间连接: {room_id: {sid: user_id}}
+# 连接表和在线用户缓存只记录本进程的连接，跨进程的房间广播由客户端管理器负责，
+# 其他进程的在线用户由 cluster_presence 同步
 rooms: Dict[str, Dict[str, int]] = {}
 
+# 反向索引: {sid: {room_id: user_id}}
+sid_rooms: Dict[str, Dict[str, int]] = {}
+
+# 用户连接计数: {room_id: {user_id: 连接数}}
+user_connections: Dict[str, Dict[int, int]] = {}
+
+# 在线用户缓存: {room_id: {user_id: user_info}}
+presence: Dict[str, Dict[int, Optional[dict]]] = {}
+
+# 观众连接观看的房间: {sid: {room_id}}
+spectating: Dict[str, Set[str]] = {}
+
+
+def _collect_room_clients() -> Dict[Tuple[str, ...], float]:
+    """采集每个房间本进程的连接数"""
+    return {(room_id,): len(sids) for room_id, sids in rooms.items()}
+
+
+metrics.register(metrics.Gauge(
+    "socketio_room_clients", "房间内的 Socket.IO 连接数（本进程）", ("room_id",),
+    collect=_collect_room_clients,
+))
+metrics.register(metrics.Gauge(
+    "socketio_connected_clients", "Socket.IO 连接总数（本进程）",
+    collect=lambda: {(): len(sio.eio.sockets)},
+))
+
 
 def get_sio():
     """获取Socket.IO实例"""
     return sio
 
 
-async def get_user_info(db, session_id: str) -> dict:
-    """获取用户信息"""
+async def get_users_info(db, room_id: str, user_ids: Set[int]) -> Dict[int, Optional[dict]]:
+    """批量获取房间内用户信息（单次 IN 查询），不存在的用户映射为 None"""
     from sqlalchemy import select
-    result = await db.execute(select(User).where(User.id == int(session_id)))
-    user = result.scalar_one_or_none()
+    result = await db.execute(
+        select(User.id, User.username, User.team, User.role, User.is_ready)
+        .where(User.id.in_(user_ids), User.room_id == int(room_id))
+    )
+    users: Dict[int, Optional[dict]] = dict.fromkeys(user_ids)
+    for user_id, username, team, role, is_ready in result.all():
+        users[user_id] = {
+            "id": str(user_id),
+            "username": username,
+            "team": team,
+            "role": role.value,
+            "is_ready": is_ready,
+        }
+    return users
+
+
+def add_connection(room_id: str, sid: str, user_id: int) -> None:
+    """记录房间连接，同时维护反向索引和用户连接计数"""
+    # 同一连接重复加入时先移除旧记录
+    remove_connection(room_id, sid)
     
-    if not user:
+    rooms.setdefault(room_id, {})[sid] = user_id
+    sid_rooms.setdefault(sid, {})[room_id] = user_id
+    counts = user_connections.setdefault(room_id, {})
+    counts[user_id] = counts.get(user_id, 0) + 1
+
+
+def remove_connection(room_id: str, sid: str) -> Optional[int]:
+    """移除房间连接，返回对应的用户ID；用户已无其他连接时同步清理在线缓存"""
+    connections = rooms.get(room_id)
+    if connections is None or sid not in connections:
         return None
     
+    user_id = connections.pop(sid)
+    
+    joined = sid_rooms.get(sid)
+    if joined is not None:
+        joined.pop(room_id, None)
+        if not joined:
+            del sid_rooms[sid]
+    
+    counts = user_connections[room_id]
+    counts[user_id] -= 1
+    if not counts[user_id]:
+        del counts[user_id]
+        presence.get(room_id, {}).pop(user_id, None)
+    
+    # 如果房间为空，删除房间
+    if not connections:
+        del rooms[room_id]
+        del user_connections[room_id]
+        presence.pop(room_id, None)
+    
+    return user_id
+
+
+async def drop_connection(room_id: str, sid: str) -> Optional[int]:
+    """移除房间连接，用户在本进程已无其他连接时通知其他进程"""
+    user_id = remove_connection(room_id, sid)
+    if user_id is not None and user_id not in user_connections.get(room_id, {}):
+        await cluster_presence.left(room_id, user_id)
+    return user_id
+
+
+async def watch_room(sid: str, room_id: str) -> None:
+    """连接开始观看房间，更新观众数并通知其他进程"""
+    watched = spectating.setdefault(sid, set())
+    if room_id in watched:
+        return
+    watched.add(room_id)
+    await cluster_presence.spectators_changed(room_id, spectator_fanout.watch(room_id))
+
+
+async def unwatch_room(sid: str, room_id: str) -> None:
+    """连接不再观看房间，更新观众数并通知其他进程"""
+    watched = spectating.get(sid)
+    if watched is None or room_id not in watched:
+        return
+    watched.discard(room_id)
+    if not watched:
+        del spectating[sid]
+    await cluster_presence.spectators_changed(room_id, spectator_fanout.unwatch(room_id))
+
+
+def room_users(room_id: str) -> List[dict]:
+    """房间在线用户（包括其他进程的连接）"""
+    users = cluster_presence.room_users(room_id)
+    users.update((user_id, info) for user_id, info in presence.get(room_id, {}).items() if info)
+    return list(users.values())
+
+
+def _local_presence() -> dict:
+    """本进程的完整在线状态，发给新启动的进程"""
     return {
-        "id": str(user.id),
-        "username": user.username,
-        "team": user.team,
-        "role": user.role.value,
-        "is_ready": user.is_ready,
+        "users": {
+            room_id: [info for info in room_presence.values() if info]
+            for room_id, room_presence in presence.items()
+        },
+        "spectators": dict(spectator_fanout.spectators),
     }
 
 
+cluster_presence.local_snapshot = _local_presence
+
+
+def update_presence(room_id: str, session_id, **fields) -> None:
+    """增量更新在线用户缓存（连接会话中的身份引用同一对象，会同步更新）"""
+    try:
+        user_info = presence.get(room_id, {}).get(int(session_id))
+    except (TypeError, ValueError):
+        return
+    if user_info:
+        user_info.update(fields)
+
+
+def _on_identity_changed(data: dict) -> None:
+    """HTTP 接口修改了用户队伍/准备状态，更新本进程的在线用户缓存"""
+    room_id = str(data.get("room_id"))
+    update_presence(room_id, data.get("user_id"), **data.get("fields", {}))
+    cluster_presence.update(room_id, data.get("user_id"), data.get("fields", {}))
+    spectator_fanout.mark_users(room_id)
+
+
+cluster.subscribe("identity_changed", _on_identity_changed)
+cluster.subscribe("chat_appended", record_remote_message)
+
+
+async def get_identity(sid: str, room_id: str) -> Optional[dict]:
+    """读取连接在房间内的身份，join_room 时解析一次并保存在 Socket.IO 会话中"""
+    try:
+        session = await sio.get_session(sid)
+    except KeyError:
+        return None
+    return session.get("identities", {}).get(room_id)
+
+
 @sio.event
 async def connect(sid: str, request: Request):
     """客户端连接"""
@@ -47,22 +234,20 @@ async def disconnect(sid: str):
     """客户端断开连接"""
     print(f"客户端断开连接: {sid}")
     
-    # 从所有房间中移除该连接
-    for room_id in list(rooms.keys()):
-        if sid in rooms[room_id]:
-            del rooms[room_id][sid]
-            
-            # 通知房间其他用户
-            user_id = rooms[room_id].get(sid)
-            await sio.emit("user_left", {"user_id": user_id}, room=room_id)
-            
-            # 如果房间为空，删除房间
-            if not rooms[room_id]:
-                del rooms[room_id]
+    # 通过反向索引只处理该连接加入过的房间
+    for room_id in list(sid_rooms.get(sid, {})):
+        user_id = await drop_connection(room_id, sid)
+        
+        # 通知房间其他用户
+        await sio.emit("user_left", {"room_id": room_id, "user_id": user_id}, room=room_id)
+        spectator_fanout.mark_users(room_id)
+    
+    for room_id in list(spectating.get(sid, ())):
+        await unwatch_room(sid, room_id)
 
 
 @sio.event
-async def join_room(data: dict, sid: str):
+async def join_room(sid: str, data: dict):
     """加入房间"""
     room_id = data.get("room_id")
     session_id = data.get("session_id")
@@ -70,91 +255,172 @@ async def join_room(data: dict, sid: str):
     if not room_id or not session_id:
         return
     
-    # 加入Socket.IO房间
-    await sio.enter_room(sid, room_id)
+    try:
+        user_id = int(session_id)
+    except (TypeError, ValueError):
+        return
     
-    # 存储连接
-    if room_id not in rooms:
-        rooms[room_id] = {}
-    rooms[room_id][sid] = int(session_id)
+    # 已在线用户在各自加入时已缓存，只需查询新加入的用户
+    room_presence = presence.setdefault(room_id, {})
+    if user_id not in room_presence:
+        async for db in get_db():
+            room_presence.update(await get_users_info(db, room_id, {user_id}))
     
-    # 获取房间用户列表并广播
-    from sqlalchemy.ext.asyncio import AsyncSession
-    async for db in get_db():
-        users = []
-        for user_id in rooms[room_id].values():
-            user_info = await get_user_info(db, str(user_id))
-            if user_info:
-                users.append(user_info)
-        
-        await sio.emit("room_users", {"room_id": room_id, "users": users}, room=room_id)
+    user_info = room_presence.get(user_id)
+    if user_info is None:
+        # 不是该房间的用户
+        room_presence.pop(user_id, None)
+        if not room_presence and room_id not in rooms:
+            presence.pop(room_id, None)
+        return
+    
+    # 加入Socket.IO房间并存储连接；观察者只加入观众房间，接收合并后的推送
+    is_spectator = user_info["role"] == UserRole.SPECTATOR.value
+    await sio.enter_room(sid, spectate_room(room_id) if is_spectator else room_id)
+    first_connection = user_id not in user_connections.get(room_id, {})
+    add_connection(room_id, sid, user_id)
+    if first_connection:
+        await cluster_presence.joined(room_id, user_info)
+    if is_spectator:
+        await watch_room(sid, room_id)
+    
+    # 身份保存在会话中，后续事件不再查询数据库
+    async with sio.session(sid) as session:
+        session.setdefault("identities", {})[room_id] = user_info
+    
+    await sio.emit("user_joined", {"room_id": room_id, "user": user_info}, room=room_id, skip_sid=sid)
+    spectator_fanout.mark_users(room_id)
+    
+    if is_spectator:
+        await _send_spectator_snapshot(sid, room_id)
+        return
+    
+    # 完整用户列表只发给新加入的连接，其他人只收到增量
+    await sio.emit("room_users", {"room_id": room_id, "users": room_users(room_id)}, to=sid)
+    
+    # 一次性补发聊天记录
+    history = get_history(room_id)
+    if history:
+        await sio.emit(SocketEvents.CHAT_HISTORY, {"room_id": room_id, "messages": history}, to=sid)
 
 
 @sio.event
-async def leave_room(data: dict, sid: str):
+async def spectate(sid: str, data: dict):
+    """以观众身份观看房间（无需加入房间，只读）"""
+    room_id = data.get("room_id")
+    if not room_id:
+        return
+    
+    try:
+        await _send_spectator_snapshot(sid, room_id)
+    except (HTTPException, ValueError):
+        return
+    await sio.enter_room(sid, spectate_room(room_id))
+    await watch_room(sid, room_id)
+
+
+@sio.event
+async def leave_room(sid: str, data: dict):
     """离开房间"""
     room_id = data.get("room_id")
-    session_id = data.get("session_id")
     
-    if room_id in rooms:
-        if sid in rooms[room_id]:
-            user_id = rooms[room_id][sid]
-            del rooms[room_id][sid]
-            
-            # 通知房间其他用户
-            await sio.emit("user_left", {"room_id": room_id, "user_id": user_id}, room=room_id)
-        
-        if not rooms[room_id]:
-            del rooms[room_id]
+    user_id = await drop_connection(room_id, sid)
+    await sio.leave_room(sid, room_id)
+    await sio.leave_room(sid, spectate_room(room_id))
+    await unwatch_room(sid, room_id)
+    
+    async with sio.session(sid) as session:
+        session.get("identities", {}).pop(room_id, None)
+    
+    if user_id is not None:
+        # 通知房间其他用户
+        await sio.emit("user_left", {"room_id": room_id, "user_id": user_id}, room=room_id)
+        spectator_fanout.mark_users(room_id)
 
 
 @sio.event
-async def select_team(data: dict, sid: str):
-    """选择队伍"""
+async def select_team(sid: str, data: dict):
+    """选择队伍（队伍由 POST /api/users/select-team 修改，这里只广播已保存的队伍）"""
     room_id = data.get("room_id")
-    session_id = data.get("session_id")
-    team = data.get("team")
+    if data.get("team") not in TEAMS:
+        return
+    
+    # 会话中的身份由 HTTP 接口发布的 identity_changed 更新，不信任客户端提交的队伍
+    identity = await get_identity(sid, room_id)
+    if identity is None:
+        return
     
     # 广播队伍更新
     await sio.emit("team_updated", {
         "room_id": room_id,
-        "session_id": session_id,
-        "team": team
+        "session_id": identity["id"],
+        "team": identity["team"]
     }, room=room_id, skip_sid=sid)
+    spectator_fanout.mark_users(room_id)
 
 
 @sio.event
-async def update_name(data: dict, sid: str):
+async def update_name(sid: str, data: dict):
     """更新名称"""
     room_id = data.get("room_id")
-    session_id = data.get("session_id")
     display_name = data.get("display_name")
+    if not isinstance(display_name, str):
+        return
+    display_name = display_name.strip()
+    if not display_name or len(display_name) > MAX_NAME_LENGTH:
+        return
+    
+    identity = await get_identity(sid, room_id)
+    if identity is None:
+        return
+    
+    async for db in get_db():
+        await db.execute(
+            update(User)
+            .where(User.id == int(identity["id"]), User.room_id == int(room_id))
+            .values(username=display_name)
+        )
+        await room_version.bump(db, int(room_id))
+        await db.commit()
+        break
+    
+    # 同步所有进程的在线用户缓存（会话中的身份引用同一对象）
+    await cluster.notify("identity_changed", {
+        "room_id": room_id,
+        "user_id": identity["id"],
+        "fields": {"username": display_name},
+    })
     
     # 广播用户更新
-    await sio.emit("user_joined", {
+    await sio.emit(SocketEvents.USER_UPDATED, {
         "room_id": room_id,
-        "session_id": session_id,
+        "session_id": identity["id"],
         "display_name": display_name
     }, room=room_id, skip_sid=sid)
 
 
 @sio.event
-async def ready(data: dict, sid: str):
-    """准备状态更新"""
+async def ready(sid: str, data: dict):
+    """准备状态更新（准备状态由 POST /api/users/ready 修改，这里只广播已保存的状态）"""
     room_id = data.get("room_id")
-    session_id = data.get("session_id")
-    is_ready = data.get("is_ready")
+    if not isinstance(data.get("is_ready"), bool):
+        return
+    
+    identity = await get_identity(sid, room_id)
+    if identity is None:
+        return
     
     # 广播准备状态
     await sio.emit("ready_updated", {
         "room_id": room_id,
-        "session_id": session_id,
-        "is_ready": is_ready
+        "session_id": identity["id"],
+        "is_ready": identity["is_ready"]
     }, room=room_id, skip_sid=sid)
+    spectator_fanout.mark_users(room_id)
 
 
 @sio.event
-async def roll(data: dict, sid: str):
+async def roll(sid: str, data: dict):
     """Roll点"""
     room_id = data.get("room_id")
     session_id = data.get("session_id")
@@ -169,7 +435,7 @@ async def roll(data: dict, sid: str):
 
 
 @sio.event
-async def ban_map(data: dict, sid: str):
+async def ban_map(sid: str, data: dict):
     """Ban地图"""
     room_id = data.get("room_id")
     session_id = data.get("session_id")
@@ -186,7 +452,7 @@ async def ban_map(data: dict, sid: str):
 
 
 @sio.event
-async def pick_map(data: dict, sid: str):
+async def pick_map(sid: str, data: dict):
     """Pick地图"""
     room_id = data.get("room_id")
     session_id = data.get("session_id")
@@ -203,47 +469,108 @@ async def pick_map(data: dict, sid: str):
 
 
 @sio.event
-async def bp_state_update(data: dict, sid: str):
-    """BP状态更新"""
+async def bp_resync(sid: str, data: dict):
+    """客户端发现增量版本号不连续时，单独下发完整 BP 状态"""
     room_id = data.get("room_id")
-    bp_state = data.get("bp_state")
+    if not room_id:
+        return
     
-    # 广播BP状态更新
-    await sio.emit("bp_state_updated", {
-        "room_id": room_id,
-        "bp_state": bp_state
-    }, room=room_id)
+    try:
+        async for db in get_db():
+            body = await read_snapshot(db, int(room_id))
+            break
+    except (HTTPException, ValueError):
+        return
+    
+    await sio.emit(SocketEvents.BP_STATE, orjson.loads(body)["data"], to=sid)
 
 
 @sio.event
-async def send_chat(data: dict, sid: str):
+async def send_chat(sid: str, data: dict):
     """发送聊天消息"""
     room_id = data.get("room_id")
-    session_id = data.get("session_id")
     content = data.get("content")
     
-    # 获取用户信息
-    user_name = "Unknown"
-    team = "unknown"
+    # 只允许已加入房间的连接发言，身份直接从会话读取
+    identity = await get_identity(sid, room_id)
+    if identity is None:
+        return
     
-    if room_id in rooms and sid in rooms[room_id]:
-        from sqlalchemy.ext.asyncio import AsyncSession
-        async for db in get_db():
-            user_info = await get_user_info(db, session_id)
-            if user_info:
-                user_name = user_info["username"]
-                team = user_info["team"]
-            break
+    if not isinstance(content, str) or not content:
+        return
+    
+    # 写入房间聊天记录（内存），其他进程同步到各自的缓冲区
+    message = record_message(room_id, int(identity["id"]), identity["username"], identity["team"], content)
+    await cluster.publish("chat_appended", message)
     
     # 广播聊天消息
-    await sio.emit("chat_message", {
+    await sio.emit("chat_message", message, room=room_id)
+    spectator_fanout.add_chat(room_id, message)
+
+
+async def emit_timer_ticks(ticks: List[Tuple[int, int, int]]):
+    """广播回合计时（每个刻度每个房间一条）"""
+    for room_id, remaining, version in ticks:
+        await sio.emit(SocketEvents.TIMER_TICK, {
+            "room_id": str(room_id),
+            "remaining": remaining,
+            "version": version,
+        }, room=str(room_id))
+        spectator_fanout.set_timer(str(room_id), remaining, version)
+
+
+async def handle_turn_timeout(room_id: int, version: int):
+    """回合超时，自动 Ban/Pick（增量由状态转移监听器广播）"""
+    try:
+        await apply_timeout(room_id, version)
+    except Exception as e:
+        print(f"房间 {room_id} 超时处理失败: {e}")
+
+
+async def broadcast_bp_delta(delta: dict):
+    """向房间广播 BP 增量"""
+    await sio.emit(SocketEvents.BP_DELTA, delta, room=delta["room_id"])
+    spectator_fanout.mark_bp(delta["room_id"])
+
+
+on_transition(broadcast_bp_delta)
+
+
+async def _load_bp_state(room_id: str) -> dict:
+    async for db in get_db():
+        body = await read_snapshot(db, int(room_id))
+        break
+    return orjson.loads(body)["data"]
+
+
+async def render_spectator_update(room_id: str, pending: PendingUpdate) -> dict:
+    """将一个刷新周期内的变化合并为一条观众推送（只包含变化的部分，均为最新状态）"""
+    payload = {"room_id": room_id}
+    if pending.bp:
+        payload["bp"] = await _load_bp_state(room_id)
+    if pending.users:
+        payload["users"] = room_users(room_id)
+    if pending.timer is not None:
+        payload["timer"] = {"remaining": pending.timer[0], "version": pending.timer[1]}
+    if pending.chat:
+        payload["chat"] = list(pending.chat)
+    return payload
+
+
+async def emit_spectator_update(room_id: str, payload: dict):
+    """向观众房间发送推送"""
+    await sio.emit(SocketEvents.SPECTATOR_UPDATE, payload, room=spectate_room(room_id))
+
+
+async def _send_spectator_snapshot(sid: str, room_id: str):
+    """观众加入时单独下发完整状态"""
+    payload = {
         "room_id": room_id,
-        "session_id": session_id,
-        "user_name": user_name,
-        "team": team,
-        "content": content,
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-    }, room=room_id)
+        "bp": await _load_bp_state(room_id),
+        "users": room_users(room_id),
+        "chat": get_history(room_id),
+    }
+    await sio.emit(SocketEvents.SPECTATOR_UPDATE, payload, to=sid)
 
 
 async def broadcast_to_room(room_id: str, event: str, data: dict):
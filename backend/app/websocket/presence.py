@@ -0,0 +1,203 @@
+"""
+跨进程在线状态
+每个进程只记录本进程的连接（manager.presence）和观众数，用户在本进程上线 / 下线、观众数变化时通过集群总线发布，
+各进程保存其他进程的在线用户和观众数，合并后得到整个房间的在线用户和观众数；
+进程启动时请求其他进程重发完整状态，之后定期发送心跳，
+连续 3 个心跳间隔没有任何消息的进程视为已退出，丢弃其在线用户
+单进程部署时不发布任何消息，其他进程的表始终为空
+"""
+import asyncio
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from ..core import cluster
+from ..core.config import get_settings
+
+# 本进程标识
+HOST_ID = uuid.uuid4().hex
+
+
+class ClusterPresence:
+    """其他进程的在线用户和观众数"""
+
+    def __init__(self):
+        # {room_id: {host_id: {user_id: user_info}}}
+        self.users: Dict[str, Dict[str, Dict[int, dict]]] = {}
+        # {room_id: {host_id: 观众连接数}}
+        self.spectators: Dict[str, Dict[str, int]] = {}
+        # {host_id: 最近一次收到消息的时间}
+        self.seen: Dict[str, float] = {}
+        # 本进程的完整在线状态，由连接管理模块设置:
+        # {"users": {room_id: [user_info]}, "spectators": {room_id: 观众连接数}}
+        self.local_snapshot: Optional[Callable[[], dict]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def room_users(self, room_id: str) -> Dict[int, dict]:
+        """其他进程连接的房间用户"""
+        merged: Dict[int, dict] = {}
+        for users in self.users.get(room_id, {}).values():
+            merged.update(users)
+        return merged
+
+    def has_spectators(self, room_id: str) -> bool:
+        """其他进程是否有该房间的观众"""
+        return room_id in self.spectators
+
+    def update(self, room_id: str, user_id, fields: dict) -> None:
+        """HTTP 接口修改了用户信息，同步更新其他进程的在线用户"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return
+        for users in self.users.get(room_id, {}).values():
+            user_info = users.get(user_id)
+            if user_info:
+                user_info.update(fields)
+
+    def _touch(self, data: dict) -> Optional[str]:
+        """记录来源进程的心跳，返回进程标识；本进程发出的消息返回 None"""
+        host = data.get("host")
+        if not host or host == HOST_ID:
+            return None
+        self.seen[host] = time.monotonic()
+        return host
+
+    def _add(self, host: str, room_id: str, user_info: dict) -> None:
+        self.users.setdefault(room_id, {}).setdefault(host, {})[int(user_info["id"])] = user_info
+
+    def _remove(self, host: str, room_id: str, user_id: int) -> None:
+        hosts = self.users.get(room_id)
+        if hosts is None or host not in hosts:
+            return
+        hosts[host].pop(user_id, None)
+        if not hosts[host]:
+            del hosts[host]
+        if not hosts:
+            del self.users[room_id]
+
+    def _set_spectators(self, host: str, room_id: str, count: int) -> None:
+        hosts = self.spectators.setdefault(room_id, {})
+        if count > 0:
+            hosts[host] = count
+        else:
+            hosts.pop(host, None)
+        if not hosts:
+            del self.spectators[room_id]
+
+    def drop_host(self, host: str) -> None:
+        """丢弃进程的全部在线用户和观众数"""
+        self.seen.pop(host, None)
+        for table in (self.users, self.spectators):
+            for room_id in list(table):
+                hosts = table[room_id]
+                hosts.pop(host, None)
+                if not hosts:
+                    del table[room_id]
+
+    def prune(self) -> None:
+        """丢弃超时没有心跳的进程"""
+        expire_before = time.monotonic() - 3 * get_settings().CLUSTER_HEARTBEAT_INTERVAL
+        for host, seen in list(self.seen.items()):
+            if seen < expire_before:
+                self.drop_host(host)
+
+    def on_joined(self, data: dict) -> None:
+        host = self._touch(data)
+        if host is not None:
+            self._add(host, str(data["room_id"]), data["user"])
+
+    def on_left(self, data: dict) -> None:
+        host = self._touch(data)
+        if host is not None:
+            self._remove(host, str(data["room_id"]), int(data["user_id"]))
+
+    def on_spectators(self, data: dict) -> None:
+        host = self._touch(data)
+        if host is not None:
+            self._set_spectators(host, str(data["room_id"]), int(data["count"]))
+
+    def on_snapshot(self, data: dict) -> None:
+        """其他进程的完整在线状态，替换之前记录的该进程状态"""
+        host = self._touch(data)
+        if host is None:
+            return
+        self.drop_host(host)
+        self.seen[host] = time.monotonic()
+        for room_id, users in data.get("users", {}).items():
+            for user_info in users:
+                self._add(host, room_id, user_info)
+        for room_id, count in data.get("spectators", {}).items():
+            self._set_spectators(host, room_id, int(count))
+
+    async def on_sync(self, data: dict) -> None:
+        """新启动的进程请求完整状态"""
+        if self._touch(data) is not None:
+            await self.publish_snapshot()
+
+    def on_heartbeat(self, data: dict) -> None:
+        self._touch(data)
+
+    def on_down(self, data: dict) -> None:
+        host = data.get("host")
+        if host and host != HOST_ID:
+            self.drop_host(host)
+
+    async def joined(self, room_id: str, user_info: dict) -> None:
+        """用户在本进程上线（第一个连接）"""
+        await cluster.publish("presence_joined", {"host": HOST_ID, "room_id": room_id, "user": user_info})
+
+    async def left(self, room_id: str, user_id: int) -> None:
+        """用户在本进程下线（最后一个连接断开）"""
+        await cluster.publish("presence_left", {"host": HOST_ID, "room_id": room_id, "user_id": user_id})
+
+    async def spectators_changed(self, room_id: str, count: int) -> None:
+        """本进程的房间观众数变化"""
+        await cluster.publish("spectators_changed", {"host": HOST_ID, "room_id": room_id, "count": count})
+
+    async def publish_snapshot(self) -> None:
+        """发布本进程的完整在线状态"""
+        snapshot = self.local_snapshot() if self.local_snapshot is not None else {}
+        await cluster.publish("presence_snapshot", {"host": HOST_ID, **snapshot})
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(get_settings().CLUSTER_HEARTBEAT_INTERVAL)
+            self.prune()
+            try:
+                await cluster.publish("presence_heartbeat", {"host": HOST_ID})
+            except Exception as e:
+                print(f"在线状态心跳发送失败: {e}")
+
+    async def start(self) -> None:
+        """请求其他进程的完整状态并开始发送心跳"""
+        if not cluster.enabled() or self._task is not None:
+            return
+        await cluster.publish("presence_sync", {"host": HOST_ID})
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止心跳，通知其他进程丢弃本进程的在线用户"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await cluster.publish("presence_down", {"host": HOST_ID})
+        except Exception as e:
+            print(f"在线状态下线通知发送失败: {e}")
+
+
+cluster_presence = ClusterPresence()
+
+cluster.subscribe("presence_joined", cluster_presence.on_joined)
+cluster.subscribe("presence_left", cluster_presence.on_left)
+cluster.subscribe("spectators_changed", cluster_presence.on_spectators)
+cluster.subscribe("presence_snapshot", cluster_presence.on_snapshot)
+cluster.subscribe("presence_sync", cluster_presence.on_sync)
+cluster.subscribe("presence_heartbeat", cluster_presence.on_heartbeat)
+cluster.subscribe("presence_down", cluster_presence.on_down)
@@ -0,0 +1,20 @@
+"""
+Socket.IO JSON 序列化
+用 orjson 替代标准库 json，接口与 json 模块一致（忽略 separators 等格式参数，orjson 输出本身就是紧凑格式）
+"""
+from typing import Any
+
+import orjson
+
+
+class OrjsonSerializer:
+    """传给 AsyncServer(json=...) 的 json 模块替代品"""
+
+    @staticmethod
+    def dumps(obj: Any, *args, **kwargs) -> str:
+        # Socket.IO 包是文本帧，需要返回 str；允许非字符串键以兼容标准库行为
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    @staticmethod
+    def loads(s: Any, *args, **kwargs) -> Any:
+        return orjson.loads(s)
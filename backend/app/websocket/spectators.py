@@ -0,0 +1,151 @@
+"""
+观众推送
+观众连接不加入房间本身的 Socket.IO 房间，不逐条接收选手的事件；
+房间内的变化只做标记，按 SPECTATOR_MAX_UPDATES_PER_SECOND 定期合并为一条 spectator_update，
+每个刷新周期每个房间只发送最新状态。选手的事件照常立即发送，观众推送在其后进行
+按房间记录观众连接数（包括其他进程的观众），没有观众的房间不标记、不推送
+"""
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from ..core import metrics
+from ..core.config import get_settings
+from .presence import cluster_presence
+
+spectator_events = metrics.register(metrics.Counter(
+    "spectator_events_total", "合并进观众推送的房间事件数", ("kind",),
+))
+spectator_updates = metrics.register(metrics.Counter(
+    "spectator_updates_total", "发送的观众推送数（每个房间每个刷新周期至多一条）",
+))
+
+
+def spectate_room(room_id: str) -> str:
+    """观众所在的 Socket.IO 房间"""
+    return f"spectate:{room_id}"
+
+
+@dataclass(slots=True)
+class PendingUpdate:
+    """一个刷新周期内房间的待推送变化"""
+    users: bool = False
+    bp: bool = False
+    timer: Optional[Tuple[int, int]] = None  # (剩余秒数, BP 版本号)
+    chat: Deque[dict] = field(default_factory=lambda: deque(maxlen=get_settings().SPECTATOR_CHAT_BATCH))
+
+
+# 将待推送变化渲染为消息 / 发送消息
+RenderCallback = Callable[[str, PendingUpdate], Awaitable[dict]]
+EmitCallback = Callable[[str, dict], Awaitable[None]]
+
+
+class SpectatorFanout:
+    """按固定频率合并发送观众推送"""
+
+    def __init__(self):
+        self._pending: Dict[str, PendingUpdate] = {}
+        self.spectators: Dict[str, int] = {}  # 本进程的观众连接数: {room_id: 连接数}
+        self._render: Optional[RenderCallback] = None
+        self._emit: Optional[EmitCallback] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, room_id: str) -> int:
+        """本进程新增一个观众连接，返回本进程的观众数"""
+        count = self.spectators[room_id] = self.spectators.get(room_id, 0) + 1
+        return count
+
+    def unwatch(self, room_id: str) -> int:
+        """本进程的观众连接离开，返回本进程的观众数"""
+        count = self.spectators.get(room_id, 0) - 1
+        if count > 0:
+            self.spectators[room_id] = count
+            return count
+        self.spectators.pop(room_id, None)
+        return 0
+
+    def watching(self, room_id: str) -> bool:
+        """房间是否有观众（任意进程）"""
+        return room_id in self.spectators or cluster_presence.has_spectators(room_id)
+
+    def _get(self, room_id: str, kind: str) -> Optional[PendingUpdate]:
+        """房间的待推送变化，没有观众时返回 None"""
+        if not self.watching(room_id):
+            return None
+        spectator_events.inc(kind)
+        pending = self._pending.get(room_id)
+        if pending is None:
+            pending = self._pending[room_id] = PendingUpdate()
+        return pending
+
+    def mark_users(self, room_id: str) -> None:
+        """房间用户列表变化（加入、离开、选队、准备、改名）"""
+        pending = self._get(room_id, "users")
+        if pending is not None:
+            pending.users = True
+
+    def mark_bp(self, room_id: str) -> None:
+        """BP 状态变化"""
+        pending = self._get(room_id, "bp")
+        if pending is not None:
+            pending.bp = True
+
+    def set_timer(self, room_id: str, remaining: int, version: int) -> None:
+        """回合计时，只保留最新值"""
+        pending = self._get(room_id, "timer")
+        if pending is not None:
+            pending.timer = (remaining, version)
+
+    def add_chat(self, room_id: str, message: dict) -> None:
+        """聊天消息，每个周期最多保留 SPECTATOR_CHAT_BATCH 条"""
+        pending = self._get(room_id, "chat")
+        if pending is not None:
+            pending.chat.append(message)
+
+    async def flush(self) -> int:
+        """发送所有待推送的房间，返回发送条数"""
+        if not self._pending or self._emit is None:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        sent = 0
+        for room_id, update in pending.items():
+            # 每个房间之间让出事件循环，优先处理选手的请求和事件
+            await asyncio.sleep(0)
+            # 刷新周期内观众已全部离开
+            if not self.watching(room_id):
+                continue
+            try:
+                await self._emit(room_id, await self._render(room_id, update))
+            except Exception as e:
+                print(f"房间 {room_id} 观众推送失败: {e}")
+                continue
+            sent += 1
+        spectator_updates.inc(amount=sent)
+        return sent
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(1 / get_settings().SPECTATOR_MAX_UPDATES_PER_SECOND)
+            await self.flush()
+
+    def start(self, render: RenderCallback, emit: EmitCallback):
+        """启动定期推送任务"""
+        self._render = render
+        self._emit = emit
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止定期推送任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+spectator_fanout = SpectatorFanout()
@@ -0,0 +1,136 @@
+"""
+序列化基准测试
+对比标准库 json 与 orjson 在 BP 状态、BP 增量、房间用户列表三类消息上的单条耗时，
+分别覆盖 REST 响应渲染和 Socket.IO 包编解码
+
+用法:
+    python scripts/bench_serialization.py
+    python scripts/bench_serialization.py --number 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engineio import json as stdlib_json  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from socketio import packet  # noqa: E402
+
+from app.services.bp_format import compile_format, format_key  # noqa: E402
+from app.services.bp_service import BPEngine  # noqa: E402
+from app.websocket.serializer import OrjsonSerializer  # noqa: E402
+
+MAPS = [
+    {"name": name, "image": f"/images/maps/{name.lower()}.png"}
+    for name in ("Dust2", "Mirage", "Inferno", "Nuke", "Overpass", "Vertigo", "Ancient", "Anubis")
+]
+
+
+def build_payloads() -> Dict[str, dict]:
+    """构建与线上一致的消息：BP 进行到一半的状态、一条增量、10 人房间用户列表"""
+    maps = tuple(m["name"] for m in MAPS)
+    engine = BPEngine(
+        room_id=1,
+        status="in_progress",
+        maps=maps,
+        format=compile_format(format_key(None), len(maps)),
+        map_info=MAPS,
+    )
+    engine.begin("A")
+    for map_name in maps[:4]:
+        engine.advance(map_name)
+    result = engine.to_bp_result()
+
+    bp_state = {
+        "success": True,
+        "data": {
+            "room_id": "1",
+            "status": engine.status,
+            "bp_state": engine.to_bp_state(),
+            "maps": engine.map_info,
+            "banned_maps": result["banned_maps"],
+            "picked_maps": result["picked_maps"],
+            "decider_map": result["decider_map"],
+        },
+    }
+    bp_delta = engine.to_delta("ban", maps[3], "B")
+    room_users = {
+        "success": True,
+        "data": {
+            "room_id": "1",
+            "users": [
+                {
+                    "session_id": str(1000 + i),
+                    "username": f"player_{i}",
+                    "team": "A" if i % 2 == 0 else "B",
+                    "role": "player",
+                    "is_ready": True,
+                }
+                for i in range(10)
+            ],
+        },
+    }
+    return {"bp_state": bp_state, "bp_delta": bp_delta, "room_users": room_users}
+
+
+def per_call(fn: Callable[[], object], number: int) -> float:
+    """单次调用耗时（微秒），取 5 轮中的最小值"""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def socketio_encode(json_module, payload: dict) -> Callable[[], object]:
+    def encode():
+        packet.Packet.json = json_module
+        return packet.Packet(packet.EVENT, data=["bp_state", payload]).encode()
+    return encode
+
+
+def socketio_decode(json_module, payload: dict) -> Callable[[], object]:
+    packet.Packet.json = json_module
+    encoded = packet.Packet(packet.EVENT, data=["bp_state", payload]).encode()
+
+    def decode():
+        packet.Packet.json = json_module
+        return packet.Packet(encoded_packet=encoded)
+    return decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="json / orjson 序列化基准测试")
+    parser.add_argument("--number", type=int, default=10000, help="每轮调用次数")
+    args = parser.parse_args()
+
+    print(f"{'payload':<12}{'path':<22}{'bytes':>8}{'json(us)':>12}{'orjson(us)':>12}{'speedup':>10}")
+    print("-" * 76)
+    for name, payload in build_payloads().items():
+        size = len(OrjsonSerializer.dumps(payload))
+        cases = [
+            (
+                "REST render",
+                lambda: JSONResponse(payload).body,
+                lambda: ORJSONResponse(payload).body,
+            ),
+            (
+                "Socket.IO encode",
+                socketio_encode(stdlib_json, payload),
+                socketio_encode(OrjsonSerializer, payload),
+            ),
+            (
+                "Socket.IO decode",
+                socketio_decode(stdlib_json, payload),
+                socketio_decode(OrjsonSerializer, payload),
+            ),
+        ]
+        for path, baseline, candidate in cases:
+            before = per_call(baseline, args.number)
+            after = per_call(candidate, args.number)
+            print(f"{name:<12}{path:<22}{size:>8}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+
+    packet.Packet.json = stdlib_json
+
+
+if __name__ == "__main__":
+    main()
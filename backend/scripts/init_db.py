@@ -54,7 +54,7 @@ async def init_db(db: AsyncSession) -> None:
     if not default_mappool:
         # 创建默认地图池（不关联房间，作为模板）
         default_mappool = MapPool(
-            room_id=0,  # 临时值，实际使用时会关联到房间
+            room_id=None,  # 模板地图池不关联房间
             name="默认地图池",
             maps=default_maps,
             is_default=True
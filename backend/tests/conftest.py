@@ -0,0 +1,30 @@
+"""
+测试配置
+在导入 app 之前设置环境变量：使用 SQLite，关闭 SQL 日志
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("DEBUG", "false")
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+import app.models  # noqa: F401  注册所有模型
+
+
+@pytest.fixture
+async def session_maker(tmp_path):
+    """每个测试独立的 SQLite 数据库文件（多个会话可以并发访问）"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(session_maker):
+    async with session_maker() as session:
+        yield session
@@ -0,0 +1,113 @@
+"""管理后台房间接口：列表分页与 BP 记录"""
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api import admin
+from app.core.deps import get_current_user, get_db
+from app.models import MapPool, Room, RoomStatus, User
+from app.services import bp_service, map_registry
+from app.services.bp_service import apply_operation, begin_draft
+from app.services.bp_snapshot import invalidate_snapshot
+
+MAPS = ("Ancient", "Anubis", "Dust2", "Inferno", "Mirage", "Nuke", "Train")
+
+
+@pytest.fixture
+async def client(session_maker):
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/admin")
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1, "username": "admin"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def room_ids(db) -> list:
+    rooms = [
+        Room(room_code=f"T{i:04d}", room_name=f"room {i}", status=RoomStatus.WAITING, max_players=10)
+        for i in range(7)
+    ]
+    db.add_all(rooms)
+    await db.commit()
+    return sorted((room.id for room in rooms), reverse=True)
+
+
+async def _ids(client, **params) -> tuple:
+    response = await client.get("/api/admin/rooms", params=params)
+    assert response.status_code == 200
+    body = response.json()
+    return [int(item["id"]) for item in body["items"]], body["next_cursor"], body["total"]
+
+
+async def test_cursor_pages_cover_all_rooms(client, room_ids):
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3} if cursor is None else {"limit": 3, "cursor": cursor}
+        ids, cursor, total = await _ids(client, **params)
+        seen.extend(ids)
+        assert total == len(room_ids)
+        if cursor is None:
+            break
+    assert seen == room_ids
+
+
+async def test_skip_is_still_accepted(client, room_ids):
+    ids, next_cursor, _ = await _ids(client, skip=2, limit=3)
+    assert ids == room_ids[2:5]
+    assert next_cursor == str(room_ids[4])
+
+    # skip 与游标同时使用时，在游标之后再跳过
+    ids, _, _ = await _ids(client, cursor=room_ids[0], skip=1, limit=2)
+    assert ids == room_ids[2:4]
+
+    response = await client.get("/api/admin/rooms", params={"skip": -1})
+    assert response.status_code == 422
+
+
+async def test_bp_record_keeps_side_choices(db, client):
+    bp_service._engines.clear()
+    await map_registry.invalidate()
+    room = Room(
+        room_code="T0001", room_name="test", status=RoomStatus.PREPARING, max_players=10,
+        bp_config={"format": "bo3", "side_pick": True},
+    )
+    db.add(room)
+    await db.flush()
+    users = {"A": User(room_id=room.id, username="a", team="A"), "B": User(room_id=room.id, username="b", team="B")}
+    db.add(MapPool(room_id=room.id, name="pool", maps=[{"name": name} for name in MAPS], is_default=False))
+    db.add_all(users.values())
+    await db.commit()
+    invalidate_snapshot(room.id)
+
+    await begin_draft(db, room.id, "A", {"A": 90, "B": 10})
+    sides = iter(["CT", "T", "CT"])
+    while room.id in bp_service._engines:
+        engine = bp_service._engines[room.id]
+        operation, team = engine.current_turn()
+        if operation == "side":
+            choice = next(sides)
+        else:
+            choice = next(name for name in MAPS if not engine.used_mask & (1 << engine.map_index[name]))
+        await apply_operation(db, room.id, users[team].id, operation, choice)
+
+    response = await client.get(f"/api/admin/rooms/{room.id}/bp-record")
+    assert response.status_code == 200
+    record = response.json()
+
+    # 选边记录不覆盖同一轮次的 Pick，决胜图选边单独记录
+    assert record["phase_3_pick"] == {"map_id": "Nuke", "team": "B"}
+    assert record["phase_3_side"] == {"map_id": "Nuke", "team": "A", "side": "T"}
+    assert record["decider"]["map_id"] == "Train"
+    assert record["decider_side"] == {"map_id": "Train", "team": "A", "side": "CT"}
+    side_logs = [log for log in record["operation_logs"] if log["phase"].endswith("side")]
+    assert [(log["map_name"], log["side"]) for log in side_logs] == [("Mirage", "CT"), ("Nuke", "T"), ("Train", "CT")]
+
+    bp_service._engines.clear()
+    await map_registry.invalidate()
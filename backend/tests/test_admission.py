@@ -0,0 +1,86 @@
+"""房间准入：并发加入 / 切换队伍不会超员"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+
+from app.api import users
+from app.api.users import MAX_TEAM_PLAYERS
+from app.core.deps import get_db
+from app.models import Room, RoomStatus, User
+
+
+@pytest.fixture
+async def client(session_maker):
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(users.router, prefix="/api/users")
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def _create_room(db, max_players: int) -> int:
+    room = Room(room_code="T0001", room_name="test", status=RoomStatus.WAITING, max_players=max_players)
+    db.add(room)
+    await db.commit()
+    return room.id
+
+
+async def test_concurrent_joins_stop_at_capacity(db, client):
+    room_id = await _create_room(db, max_players=3)
+
+    responses = await asyncio.gather(*[
+        client.post("/api/users/join-room", json={"room_code": "T0001", "username": f"p{i}"})
+        for i in range(10)
+    ])
+
+    assert sorted(response.status_code for response in responses) == [200] * 3 + [400] * 7
+    assert {response.json()["detail"] for response in responses if response.status_code == 400} == {"房间已满"}
+    room = await db.get(Room, room_id)
+    assert room.player_count == 3
+    assert await db.scalar(select(func.count()).select_from(User).where(User.room_id == room_id)) == 3
+
+
+async def test_join_rejected_after_start(db, client):
+    room_id = await _create_room(db, max_players=10)
+    room = await db.get(Room, room_id)
+    room.status = RoomStatus.PREPARING
+    await db.commit()
+
+    response = await client.post("/api/users/join-room", json={"room_code": "T0001", "username": "late"})
+    assert response.status_code == 400
+    assert (await db.get(Room, room_id)).player_count == 0
+
+
+async def test_concurrent_team_switches_stop_at_team_size(db, client):
+    room_id = await _create_room(db, max_players=MAX_TEAM_PLAYERS * 2 + 2)
+    user_ids = []
+    for i in range(MAX_TEAM_PLAYERS + 3):
+        response = await client.post("/api/users/join-room", json={"room_code": "T0001", "username": f"p{i}"})
+        user_ids.append(int(response.json()["data"]["user_id"]))
+
+    responses = await asyncio.gather(*[
+        client.post("/api/users/select-team", json={"user_id": user_id, "team": "A"})
+        for user_id in user_ids
+    ])
+
+    assert sum(response.status_code == 200 for response in responses) == MAX_TEAM_PLAYERS
+    db.expire_all()
+    room = await db.get(Room, room_id)
+    assert room.team_a_count == MAX_TEAM_PLAYERS
+    team_a = await db.scalar(select(func.count()).select_from(User).where(User.room_id == room_id, User.team == "A"))
+    assert team_a == MAX_TEAM_PLAYERS
+
+    # 切换队伍时释放原队伍名额
+    moved = next(user_id for user_id, response in zip(user_ids, responses) if response.status_code == 200)
+    response = await client.post("/api/users/select-team", json={"user_id": moved, "team": "B"})
+    assert response.status_code == 200
+    db.expire_all()
+    room = await db.get(Room, room_id)
+    assert (room.team_a_count, room.team_b_count) == (MAX_TEAM_PLAYERS - 1, 1)
@@ -0,0 +1,99 @@
+"""BP 增量广播：按版本号顺序发出，版本号不连续时可单独重新同步"""
+import asyncio
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from app.models import MapPool, Room, RoomStatus, User
+from app.services import bp_service
+from app.services.bp_format import PRESETS
+from app.services.bp_service import apply_operation, begin_draft
+from app.services.bp_snapshot import invalidate_snapshot
+from app.websocket import manager
+
+MAPS = ("Ancient", "Anubis", "Dust2", "Inferno", "Mirage", "Nuke", "Train")
+
+
+@pytest.fixture
+def deltas():
+    """记录 bp_service 发出的增量"""
+    received = []
+
+    async def listener(delta):
+        received.append(delta)
+
+    bp_service._engines.clear()
+    bp_service.on_transition(listener)
+    yield received
+    bp_service._listeners.remove(listener)
+    bp_service._engines.clear()
+
+
+async def _create_room(db) -> tuple:
+    room = Room(room_code="T0001", room_name="test", status=RoomStatus.PREPARING, max_players=10)
+    db.add(room)
+    await db.flush()
+    db.add(MapPool(room_id=room.id, name="pool", maps=[{"name": name} for name in MAPS], is_default=False))
+    users = {"A": User(room_id=room.id, username="a", team="A"), "B": User(room_id=room.id, username="b", team="B")}
+    db.add_all(users.values())
+    await db.commit()
+    invalidate_snapshot(room.id)
+    return room.id, {team: user.id for team, user in users.items()}
+
+
+async def test_deltas_are_gapless_under_concurrent_operations(db, session_maker, deltas):
+    room_id, users = await _create_room(db)
+    state = await begin_draft(db, room_id, "A", {"A": 90, "B": 10})
+
+    async def attempt(operation, team, map_name):
+        async with session_maker() as session:
+            try:
+                await apply_operation(session, room_id, users[team], operation, map_name)
+            except HTTPException:
+                pass
+
+    # 每一轮都有两个请求争抢同一步骤
+    while True:
+        engine = bp_service._engines.get(room_id)
+        if engine is None or engine.finished:
+            break
+        operation, team = engine.current_turn()
+        free = [name for name in MAPS if not engine.used_mask & (1 << engine.map_index[name])]
+        await asyncio.gather(attempt(operation, team, free[0]), attempt(operation, team, free[-1]))
+
+    versions = [delta["version"] for delta in deltas]
+    assert versions == list(range(state["version"], state["version"] + len(deltas)))
+    assert deltas[0]["op"] == "start"
+    assert [delta["op"] for delta in deltas[1:]] == [op for op, _ in PRESETS["bo3"]]
+    assert deltas[-1]["next"]["op"] == "completed"
+    assert "decider" in deltas[-1]
+
+
+async def test_resync_sends_full_state_to_requester(db, session_maker, deltas, monkeypatch):
+    room_id, users = await _create_room(db)
+    await begin_draft(db, room_id, "A", {"A": 90, "B": 10})
+    await apply_operation(db, room_id, users["A"], "ban", "Dust2")
+
+    async def get_db():
+        async with session_maker() as session:
+            yield session
+
+    sent = []
+
+    async def emit(event, data, **kwargs):
+        sent.append((event, data, kwargs))
+
+    monkeypatch.setattr(manager, "get_db", get_db)
+    monkeypatch.setattr(manager.sio, "emit", emit)
+
+    await manager.bp_resync("sid-1", {"room_id": str(room_id)})
+
+    # 完整状态只发给请求的连接，版本号与最后一条增量一致
+    assert len(sent) == 1
+    event, data, kwargs = sent[0]
+    assert event == "bp_state"
+    assert kwargs == {"to": "sid-1"}
+    assert data["bp_state"]["version"] == deltas[-1]["version"]
+    assert data["bp_state"] == orjson.loads(orjson.dumps(bp_service._engines[room_id].to_bp_state()))
+    assert data["banned_maps"] == [{"map_name": "Dust2", "team": "A"}]
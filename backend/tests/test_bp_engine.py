@@ -0,0 +1,100 @@
+"""BP 状态机：快照恢复与事件回放结果一致"""
+import pytest
+
+from app.models import BPOperationType, RoomStatus
+from app.services.bp_format import compile_format, format_key
+from app.services.bp_service import BPEngine
+
+MAPS = ("Ancient", "Anubis", "Dust2", "Inferno", "Mirage", "Nuke", "Train")
+
+
+def _engine(config: dict) -> BPEngine:
+    return BPEngine(
+        room_id=1,
+        status=RoomStatus.PREPARING.value,
+        maps=MAPS,
+        format=compile_format(format_key(config), len(MAPS)),
+    )
+
+
+def _play(config: dict):
+    """按 bp_service 写入事件的方式完整进行一次 BP，返回 (最终状态机, 事件流, {seq: 快照})"""
+    live = _engine(config)
+    live.begin("B")
+    events = [(1, BPOperationType.ROLL.value, "B", None, {"rolls": {}, "deadline": live.deadline})]
+    snapshots = {}
+
+    while not live.finished:
+        operation, _ = live.current_turn()
+        if operation == BPOperationType.SIDE.value:
+            choice = "T" if len(live.sides) % 2 == 0 else "CT"
+        else:
+            # 与超时默认选择相反的顺序
+            choice = next(name for name in reversed(MAPS) if not live.used_mask & (1 << live.map_index[name]))
+        data = {"side": choice} if operation == BPOperationType.SIDE.value else {}
+
+        for _, entry_operation, team, map_name in live.advance(choice):
+            events.append(
+                (len(events) + 1, entry_operation, team, map_name, dict(data, deadline=live.deadline) if team else None)
+            )
+        live.seq = len(events)
+        snapshots[live.seq] = live.snapshot_state()
+    return live, events, snapshots
+
+
+def _state(engine: BPEngine) -> tuple:
+    return (
+        engine.first_team,
+        engine.step,
+        engine.used_mask,
+        list(engine.sequence),
+        list(engine.sides),
+        engine.decider,
+        engine.deadline,
+        engine.seq,
+        engine.to_bp_result(),
+    )
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"format": "bo1"},
+        {"format": "bo3"},
+        {"format": "bo5", "side_pick": True},
+        {"format": "bo3", "side_pick": True},
+    ],
+)
+def test_snapshot_restore_matches_full_replay(config):
+    live, events, snapshots = _play(config)
+    assert live.finished
+
+    replayed = _engine(config)
+    for event in events:
+        replayed.apply_event(*event)
+    assert _state(replayed) == _state(live)
+
+    # 从任意一个快照恢复并回放之后的事件，结果与完整回放相同
+    for seq, state in snapshots.items():
+        restored = _engine(config)
+        restored.restore(seq, state)
+        for event in events[seq:]:
+            restored.apply_event(*event)
+        assert _state(restored) == _state(live), seq
+
+
+def test_partial_replay_resumes_turn():
+    config = {"format": "bo3", "side_pick": True}
+    live, events, snapshots = _play(config)
+
+    # 回放到中途，当前轮次与快照一致
+    seq = sorted(snapshots)[4]
+    replayed = _engine(config)
+    for event in events[:seq]:
+        replayed.apply_event(*event)
+    restored = _engine(config)
+    restored.restore(seq, snapshots[seq])
+
+    assert not restored.finished
+    assert restored.current_turn() == replayed.current_turn()
+    assert _state(restored) == _state(replayed)
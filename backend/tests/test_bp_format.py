@@ -0,0 +1,130 @@
+"""BP 赛制编译"""
+import pytest
+
+from app.services.bp_format import DECIDER, compile_format, format_key
+
+
+def _plan(bp_format):
+    """步骤表简写为 [(操作, 先后手), ...]"""
+    return [(step.operation, step.order) for step in bp_format.steps]
+
+
+def test_bo1_bans_down_to_decider():
+    bp_format = compile_format(format_key({"format": "bo1"}), 7)
+
+    assert _plan(bp_format) == [("ban", 0), ("ban", 1)] * 3
+    assert bp_format.map_steps == (0, 1, 2, 3, 4, 5)
+    assert bp_format.side_steps == ()
+    assert bp_format.decider_after == 5
+
+
+def test_bo3_order():
+    bp_format = compile_format(format_key({"format": "bo3"}), 7)
+
+    assert _plan(bp_format) == [
+        ("ban", 0), ("ban", 1), ("ban", 0), ("ban", 1), ("pick", 0), ("pick", 1),
+    ]
+    assert [step.round for step in bp_format.steps] == [1, 1, 2, 2, 3, 3]
+    assert bp_format.decider_after == 5
+
+
+def test_bo5_order():
+    bp_format = compile_format(format_key({"format": "bo5"}), 7)
+
+    assert _plan(bp_format) == [
+        ("ban", 0), ("ban", 1), ("pick", 0), ("pick", 1), ("pick", 0), ("pick", 1),
+    ]
+
+
+def test_padding_alternates_bans_for_larger_pool():
+    bp_format = compile_format(format_key({"format": "bo3"}), 9)
+
+    # 预设 6 步之后补两次 Ban，继续交替
+    assert _plan(bp_format)[6:] == [("ban", 0), ("ban", 1)]
+    assert len(bp_format.map_steps) == 8
+    assert bp_format.decider_after == 7
+
+
+def test_custom_plan_is_padded():
+    key = format_key({"format": "custom", "steps": [["pick", 1]]})
+    bp_format = compile_format(key, 4)
+
+    assert _plan(bp_format) == [("pick", 1), ("ban", 1), ("ban", 0)]
+
+
+def test_side_pick_inserts_opponent_choice():
+    bp_format = compile_format(format_key({"format": "bo3", "side_pick": True}), 7)
+
+    assert _plan(bp_format) == [
+        ("ban", 0), ("ban", 1), ("ban", 0), ("ban", 1),
+        ("pick", 0), ("side", 1),
+        ("pick", 1), ("side", 0),
+        ("side", 0),  # 决胜图由最后一次 Ban 的对方选边
+    ]
+    assert bp_format.map_steps == (0, 1, 2, 3, 4, 6)
+    assert bp_format.side_steps == (5, 7, 8)
+    assert bp_format.steps[5].target == 4
+    assert bp_format.steps[8].target == DECIDER
+    # 最后一张图的选边完成后才选出决胜图
+    assert bp_format.decider_after == 7
+
+
+def test_side_pick_for_bo1_only_decider():
+    bp_format = compile_format(format_key({"format": "bo1", "side_pick": True}), 3)
+
+    assert _plan(bp_format) == [("ban", 0), ("ban", 1), ("side", 0)]
+    assert bp_format.decider_after == 1
+
+
+@pytest.mark.parametrize(
+    "steps, map_count, decider_side",
+    [
+        # 最后一步是 Pick 时仍由最后一次 Ban 的对方选边
+        ([["ban", 0], ["pick", 0], ["pick", 1]], 4, 1),
+        ([["ban", 1], ["pick", 0], ["pick", 1]], 4, 0),
+        # 没有 Ban 步骤时由最后一次 Pick 的对方选边
+        ([["pick", 0], ["pick", 1]], 3, 0),
+    ],
+)
+def test_decider_side_goes_to_opponent_of_last_ban(steps, map_count, decider_side):
+    key = format_key({"format": "custom", "steps": steps, "side_pick": True})
+    bp_format = compile_format(key, map_count)
+
+    decider = bp_format.steps[-1]
+    assert (decider.operation, decider.target) == ("side", DECIDER)
+    assert decider.order == decider_side
+
+
+@pytest.mark.parametrize(
+    "config, map_count",
+    [
+        ({"format": "bo3"}, 6),
+        ({"format": "bo5"}, 6),
+        ({"format": "bo1"}, 1),
+        ({"format": "custom", "steps": [["ban", 0], ["ban", 1], ["pick", 0]]}, 3),
+    ],
+)
+def test_pool_too_small(config, map_count):
+    with pytest.raises(ValueError):
+        compile_format(format_key(config), map_count)
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"format": "bo7"},
+        {"format": "custom", "steps": [["ban", 2]]},
+        {"format": "custom", "steps": [["side", 0]]},
+        {"format": "custom", "steps": ["ban"]},
+    ],
+)
+def test_invalid_config(config):
+    with pytest.raises(ValueError):
+        format_key(config)
+
+
+def test_format_key_is_case_insensitive_and_cached():
+    key = format_key({"format": "BO3"})
+
+    assert key == format_key({"format": "bo3"})
+    assert compile_format(key, 7) is compile_format(key, 7)
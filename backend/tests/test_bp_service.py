@@ -0,0 +1,119 @@
+"""BP 状态转移：乐观锁冲突与重试"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from app.core import cluster
+from app.core.config import get_settings
+from app.models import BPRecord, MapPool, Room, RoomStatus, User
+from app.services import bp_service
+from app.services.bp_service import apply_operation, begin_draft
+from app.services.bp_timer import timer_owner, timer_wheel
+
+MAPS = ("Ancient", "Anubis", "Dust2", "Inferno", "Mirage", "Nuke", "Train")
+
+
+@pytest.fixture(autouse=True)
+def clear_engines():
+    bp_service._engines.clear()
+    yield
+    bp_service._engines.clear()
+    timer_wheel.clear()
+
+
+async def _create_room(db) -> tuple:
+    """准备阶段的房间及双方各一名用户，返回 (room_id, A队用户ID, B队用户ID)"""
+    room = Room(room_code="T0001", room_name="test", status=RoomStatus.PREPARING, max_players=10)
+    db.add(room)
+    await db.flush()
+    db.add(MapPool(room_id=room.id, name="pool", maps=[{"name": name} for name in MAPS], is_default=False))
+    user_a = User(room_id=room.id, username="a", team="A")
+    user_b = User(room_id=room.id, username="b", team="B")
+    db.add_all([user_a, user_b])
+    await db.commit()
+    return room.id, user_a.id, user_b.id
+
+
+async def test_begin_draft_then_ban(db):
+    room_id, user_a, _ = await _create_room(db)
+
+    state = await begin_draft(db, room_id, "A", {"A": 90, "B": 10})
+    assert (state["current_phase"], state["current_team"]) == ("ban", "A")
+
+    result = await apply_operation(db, room_id, user_a, "ban", "Dust2")
+    assert result["bp_state"]["version"] == state["version"] + 1
+    assert result["bp_state"]["current_team"] == "B"
+
+    # 已经开始的 BP 不能再次开始
+    with pytest.raises(HTTPException) as exc:
+        await begin_draft(db, room_id, "B", {})
+    assert exc.value.status_code == 400
+
+
+async def test_stale_version_conflicts_and_retry_reloads(db, session_maker):
+    room_id, user_a, _ = await _create_room(db)
+    await begin_draft(db, room_id, "A", {"A": 90, "B": 10})
+
+    # 另一个进程先完成了一次状态转移
+    async with session_maker() as other:
+        await other.execute(update(Room).where(Room.id == room_id).values(bp_version=Room.bp_version + 1))
+        await other.commit()
+
+    with pytest.raises(HTTPException) as exc:
+        await apply_operation(db, room_id, user_a, "ban", "Dust2")
+    assert exc.value.status_code == 409
+    # 冲突时丢弃内存状态，没有写入任何记录
+    assert room_id not in bp_service._engines
+    records = await db.execute(select(BPRecord.map_name).where(BPRecord.room_id == room_id))
+    assert "Dust2" not in records.scalars().all()
+
+    # 重试时从数据库重新加载，基于最新版本号提交
+    version = await db.scalar(select(Room.bp_version).where(Room.id == room_id))
+    result = await apply_operation(db, room_id, user_a, "ban", "Dust2")
+    assert result["bp_state"]["version"] == version + 1
+
+
+async def test_concurrent_operations_on_one_turn(db, session_maker):
+    room_id, user_a, _ = await _create_room(db)
+    await begin_draft(db, room_id, "A", {"A": 90, "B": 10})
+
+    async def ban(map_name):
+        async with session_maker() as session:
+            try:
+                return await apply_operation(session, room_id, user_a, "ban", map_name)
+            except HTTPException as e:
+                return e.status_code
+
+    results = await asyncio.gather(ban("Dust2"), ban("Nuke"))
+
+    # 同一轮次只有一个操作生效，另一个因轮次已变化被拒绝
+    assert sum(isinstance(result, dict) for result in results) == 1
+    assert 400 in results
+
+
+async def test_only_timer_owner_arms_timers(db, monkeypatch):
+    monkeypatch.setattr(get_settings(), "SOCKETIO_MANAGER", "redis")
+    monkeypatch.setattr(timer_owner, "held", False)
+    published = []
+
+    async def publisher(message):
+        published.append(message)
+
+    cluster.set_publisher(publisher)
+    try:
+        room_id, user_a, _ = await _create_room(db)
+        await begin_draft(db, room_id, "A", {"A": 90, "B": 10})
+        result = await apply_operation(db, room_id, user_a, "ban", "Dust2")
+    finally:
+        cluster.set_publisher(None)
+    assert room_id not in timer_wheel.timers
+
+    # 计时器主进程收到状态变化后按新的步骤设置计时器
+    changed = published[-1]
+    assert changed["data"]["turn"]["version"] == result["bp_state"]["version"]
+    monkeypatch.setattr(timer_owner, "held", True)
+    await cluster.dispatch(changed)
+    assert timer_wheel.timers[room_id][1] == result["bp_state"]["version"]
+    assert 0 < timer_wheel.remaining(room_id) <= get_settings().BP_TURN_SECONDS
@@ -0,0 +1,113 @@
+"""BP 状态 SSE：Last-Event-ID 续传与队列溢出后的完整状态"""
+import pytest
+
+from app.core.config import get_settings
+from app.db import session as db_session
+from app.models import MapPool, Room, RoomStatus, User
+from app.services import bp_service, bp_stream
+from app.services.bp_service import apply_operation, begin_draft
+from app.services.bp_snapshot import invalidate_snapshot
+from app.services.bp_stream import open_stream
+
+MAPS = ("Ancient", "Anubis", "Dust2", "Inferno", "Mirage", "Nuke", "Train")
+
+
+@pytest.fixture(autouse=True)
+def clear_state(session_maker, monkeypatch):
+    bp_service._engines.clear()
+    bp_stream._streams.clear()
+    # 溢出后读取完整状态时使用新的会话
+    monkeypatch.setattr(db_session, "async_session_maker", session_maker)
+    yield
+    bp_service._engines.clear()
+    bp_stream._streams.clear()
+
+
+async def _create_room(db) -> tuple:
+    room = Room(room_code="T0001", room_name="test", status=RoomStatus.PREPARING, max_players=10)
+    db.add(room)
+    await db.flush()
+    db.add(MapPool(room_id=room.id, name="pool", maps=[{"name": name} for name in MAPS], is_default=False))
+    users = {"A": User(room_id=room.id, username="a", team="A"), "B": User(room_id=room.id, username="b", team="B")}
+    db.add_all(users.values())
+    await db.commit()
+    invalidate_snapshot(room.id)
+    return room.id, {team: user.id for team, user in users.items()}
+
+
+def _parse(frame: bytes) -> tuple:
+    """(事件类型, 事件 id)"""
+    fields = dict(line.split(": ", 1) for line in frame.decode().splitlines() if ": " in line)
+    return fields["event"], int(fields["id"])
+
+
+async def _frames(body, count: int) -> list:
+    assert await body.__anext__() == b"retry: %d\n\n" % get_settings().SSE_RETRY_MS
+    return [_parse(await body.__anext__()) for _ in range(count)]
+
+
+async def _ban(db, room_id, users, map_name):
+    engine = bp_service._engines[room_id]
+    _, team = engine.current_turn()
+    result = await apply_operation(db, room_id, users[team], "ban", map_name)
+    return result["bp_state"]["version"]
+
+
+async def test_resume_from_last_event_id(db):
+    room_id, users = await _create_room(db)
+    start = (await begin_draft(db, room_id, "A", {"A": 90, "B": 10}))["version"]
+
+    watcher = await open_stream(db, room_id, None)
+    assert await _frames(watcher, 1) == [("bp_state", start)]
+
+    versions = [await _ban(db, room_id, users, name) for name in ("Dust2", "Nuke", "Train")]
+
+    # 断线重连：只补发 Last-Event-ID 之后的增量
+    resumed = await open_stream(db, room_id, str(versions[0]))
+    assert await _frames(resumed, 2) == [("bp_delta", versions[1]), ("bp_delta", versions[2])]
+    # 已经在线的连接按顺序收到全部增量
+    assert [_parse(await watcher.__anext__()) for _ in versions] == [("bp_delta", version) for version in versions]
+
+    await resumed.aclose()
+    await watcher.aclose()
+    assert str(room_id) not in bp_stream._streams
+
+
+async def test_resume_outside_replay_window_sends_full_state(db, monkeypatch):
+    monkeypatch.setattr(get_settings(), "SSE_REPLAY_SIZE", 2)
+    room_id, users = await _create_room(db)
+    await begin_draft(db, room_id, "A", {"A": 90, "B": 10})
+
+    watcher = await open_stream(db, room_id, None)
+    await _frames(watcher, 1)
+    versions = [await _ban(db, room_id, users, name) for name in ("Dust2", "Nuke", "Train")]
+
+    # 缓冲区只保留最近两帧，无法从第一帧续传
+    resumed = await open_stream(db, room_id, str(versions[0] - 1))
+    assert await _frames(resumed, 1) == [("bp_state", versions[-1])]
+    # 无效的 Last-Event-ID 同样下发完整状态
+    invalid = await open_stream(db, room_id, "abc")
+    assert await _frames(invalid, 1) == [("bp_state", versions[-1])]
+
+    for body in (watcher, resumed, invalid):
+        await body.aclose()
+
+
+async def test_overflow_falls_back_to_full_state(db, monkeypatch):
+    monkeypatch.setattr(get_settings(), "SSE_QUEUE_SIZE", 2)
+    room_id, users = await _create_room(db)
+    await begin_draft(db, room_id, "A", {"A": 90, "B": 10})
+
+    slow = await open_stream(db, room_id, None)
+    await _frames(slow, 1)
+    versions = [await _ban(db, room_id, users, name) for name in ("Dust2", "Nuke", "Train")]
+
+    # 积压超过队列上限：丢弃积压的增量，改为下发一次最新的完整状态
+    subscriber = next(iter(bp_stream._streams[str(room_id)].subscribers))
+    assert subscriber.overflowed and subscriber.queue.empty()
+    assert _parse(await slow.__anext__()) == ("bp_state", versions[-1])
+
+    # 之后恢复接收增量
+    version = await _ban(db, room_id, users, "Ancient")
+    assert _parse(await slow.__anext__()) == ("bp_delta", version)
+    await slow.aclose()
@@ -0,0 +1,141 @@
+"""BP 回合计时器（时间轮）"""
+import asyncio
+
+from app.core.config import get_settings
+from app.core.leader import LeaderLock
+from app.services.bp_timer import TimerWheel
+
+
+def _advance(wheel: TimerWheel, ticks: int) -> list:
+    expired = []
+    for _ in range(ticks):
+        expired.extend(wheel.advance()[0])
+    return expired
+
+
+def test_expires_on_deadline_tick():
+    wheel = TimerWheel(slots=8)
+    wheel.schedule(1, 3, delay=5)
+
+    assert _advance(wheel, 4) == []
+    assert wheel.remaining(1) == 1
+    assert _advance(wheel, 1) == [(1, 3)]
+    assert wheel.remaining(1) is None
+    assert _advance(wheel, 16) == []
+
+
+def test_delay_longer_than_wheel():
+    wheel = TimerWheel(slots=4)
+    wheel.schedule(1, 0, delay=10)
+
+    # 槽位每 4 个刻度经过一次，只有到期的那一轮触发
+    assert _advance(wheel, 9) == []
+    assert _advance(wheel, 1) == [(1, 0)]
+
+
+def test_cancel():
+    wheel = TimerWheel(slots=8)
+    wheel.schedule(1, 0, delay=2)
+    wheel.schedule(2, 0, delay=2)
+    wheel.cancel(1)
+    wheel.cancel(3)  # 未设置计时器的房间
+
+    assert _advance(wheel, 2) == [(2, 0)]
+    assert wheel.timers == {}
+
+
+def test_reschedule_replaces_previous_timer():
+    wheel = TimerWheel(slots=8)
+    wheel.schedule(1, 1, delay=2)
+    wheel.schedule(1, 2, delay=5)
+
+    assert _advance(wheel, 4) == []
+    assert _advance(wheel, 1) == [(1, 2)]
+
+
+def test_overdue_deadline_fires_next_tick():
+    wheel = TimerWheel(slots=8)
+    # 重启后恢复已超时的回合
+    wheel.schedule(1, 0, delay=-30)
+
+    assert _advance(wheel, 1) == [(1, 0)]
+
+
+def test_tick_broadcast():
+    wheel = TimerWheel(slots=8, tick=0.5)
+    wheel.schedule(1, 7, delay=3)
+
+    expired, ticks = wheel.advance()
+    assert expired == []
+    assert ticks == [(1, 3, 7)]
+
+
+async def test_running_expiry_tasks_are_referenced():
+    wheel = TimerWheel(slots=8, tick=0.01)
+    release = asyncio.Event()
+    expired = []
+
+    async def on_expire(room_id, version):
+        await release.wait()
+        expired.append((room_id, version))
+
+    async def on_tick(ticks):
+        pass
+
+    wheel.schedule(1, 4, delay=0.01)
+    wheel.start(on_tick, on_expire)
+    try:
+        while not wheel._expiring:
+            await asyncio.sleep(0.01)
+        # 到期回调执行期间由时间轮持有任务引用
+        (task,) = wheel._expiring
+        release.set()
+        await task
+        assert expired == [(1, 4)]
+        assert not wheel._expiring
+    finally:
+        await wheel.stop()
+
+
+class SharedLock(LeaderLock):
+    """用字典代替 Redis 的锁"""
+
+    def __init__(self, store: dict):
+        super().__init__("test")
+        self.store = store
+
+    async def _acquire(self) -> bool:
+        holder = self.store.setdefault(self.key, self.token)
+        return holder == self.token
+
+    async def _release(self) -> None:
+        if self.store.get(self.key) == self.token:
+            del self.store[self.key]
+
+
+async def test_single_timer_owner(monkeypatch):
+    monkeypatch.setattr(get_settings(), "SOCKETIO_MANAGER", "redis")
+    store = {}
+    events = []
+    first, second = SharedLock(store), SharedLock(store)
+    for name, lock in (("first", first), ("second", second)):
+        async def acquired(name=name):
+            events.append((name, "acquired"))
+        lock.on_acquired = acquired
+        lock.on_lost = lambda name=name: events.append((name, "lost"))
+
+    await first.poll()
+    await second.poll()
+    assert (first.is_leader, second.is_leader) == (True, False)
+
+    # 锁过期后由另一个进程接管，原持有者续期失败时放弃
+    store.clear()
+    await second.poll()
+    await first.poll()
+    assert (first.is_leader, second.is_leader) == (False, True)
+    assert events == [("first", "acquired"), ("second", "acquired"), ("first", "lost")]
+
+
+def test_leader_without_redis(monkeypatch):
+    monkeypatch.setattr(get_settings(), "SOCKETIO_MANAGER", "memory")
+    assert LeaderLock("test").is_leader
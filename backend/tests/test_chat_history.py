@@ -0,0 +1,68 @@
+"""聊天记录：写库失败时的重新入队与时间戳"""
+from collections import deque
+from datetime import timezone
+
+import pytest
+
+from app.core.config import get_settings
+from app.db import session as db_session
+from app.websocket import chat_history
+from app.websocket.chat_history import flush_pending, get_history, record_message, record_remote_message
+
+
+@pytest.fixture(autouse=True)
+def clear_state(monkeypatch):
+    monkeypatch.setattr(get_settings(), "CHAT_PERSIST_ENABLED", True)
+    monkeypatch.setattr(chat_history, "_pending", deque(maxlen=5))
+    chat_history._histories.clear()
+    yield
+    chat_history._histories.clear()
+
+
+def _failing_session(arrivals: list):
+    """写库期间先收到新消息，随后写入失败"""
+    class FailingSession:
+        async def __aenter__(self):
+            for content in arrivals:
+                record_message("1", 1, "a", "A", content)
+            raise RuntimeError("database is down")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    return FailingSession
+
+
+def _pending_contents() -> list:
+    return [entry[3] for _, entry in chat_history._pending]
+
+
+async def test_failed_flush_requeues_before_new_messages(monkeypatch):
+    for content in ("m1", "m2"):
+        record_message("1", 1, "a", "A", content)
+    monkeypatch.setattr(db_session, "async_session_maker", _failing_session(["m3"]))
+
+    assert await flush_pending() == 0
+    assert _pending_contents() == ["m1", "m2", "m3"]
+
+
+async def test_failed_flush_drops_oldest_when_full(monkeypatch):
+    for content in ("m1", "m2", "m3", "m4"):
+        record_message("1", 1, "a", "A", content)
+    monkeypatch.setattr(db_session, "async_session_maker", _failing_session(["m5", "m6", "m7"]))
+
+    assert await flush_pending() == 0
+    # 上限 5 条：保留最新的消息，丢弃失败批次中最旧的部分
+    assert _pending_contents() == ["m3", "m4", "m5", "m6", "m7"]
+
+
+def test_timestamps_are_utc_and_round_trip():
+    message = record_message("1", 1, "a", "A", "hello")
+    assert message["timestamp"].endswith("Z")
+
+    chat_history._histories.clear()
+    record_remote_message(message)
+
+    (entry,) = chat_history._histories["1"].entries
+    assert entry[4].tzinfo is not None and entry[4].utcoffset() == timezone.utc.utcoffset(None)
+    assert get_history("1") == [message]
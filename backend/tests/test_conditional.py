@@ -0,0 +1,73 @@
+"""HTTP 条件请求"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from starlette.requests import Request
+
+from app.core.conditional import is_not_modified, make_etag
+
+ETAG = make_etag(3, 12)
+LAST_MODIFIED = datetime(2026, 10, 18, 12, 0, 0, 500000, tzinfo=timezone.utc)
+
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def _http_date(value: datetime) -> str:
+    return value.strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    [ETAG, f"W/{ETAG}", f'"0-0", {ETAG}', "*"],
+)
+def test_if_none_match_hit(if_none_match):
+    assert is_not_modified(_request(if_none_match=if_none_match), ETAG, LAST_MODIFIED)
+
+
+def test_if_none_match_miss():
+    assert not is_not_modified(_request(if_none_match='"3-11"'), ETAG, LAST_MODIFIED)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    later = _http_date(LAST_MODIFIED + timedelta(hours=1))
+
+    # ETag 不匹配时即使 If-Modified-Since 仍有效也返回完整响应
+    assert not is_not_modified(
+        _request(if_none_match='"3-11"', if_modified_since=later), ETAG, LAST_MODIFIED
+    )
+    # ETag 匹配时忽略已过期的 If-Modified-Since
+    earlier = _http_date(LAST_MODIFIED - timedelta(hours=1))
+    assert is_not_modified(
+        _request(if_none_match=ETAG, if_modified_since=earlier), ETAG, LAST_MODIFIED
+    )
+
+
+def test_if_modified_since():
+    # HTTP 日期精确到秒，忽略 Last-Modified 的微秒部分
+    assert is_not_modified(_request(if_modified_since=_http_date(LAST_MODIFIED)), ETAG, LAST_MODIFIED)
+    assert not is_not_modified(
+        _request(if_modified_since=_http_date(LAST_MODIFIED - timedelta(seconds=1))), ETAG, LAST_MODIFIED
+    )
+
+
+def test_if_modified_since_naive_datetime_is_utc():
+    naive = LAST_MODIFIED.replace(tzinfo=None)
+
+    assert is_not_modified(_request(if_modified_since=_http_date(LAST_MODIFIED)), ETAG, naive)
+
+
+@pytest.mark.parametrize(
+    "if_modified_since, last_modified",
+    [("not a date", LAST_MODIFIED), (_http_date(LAST_MODIFIED), None)],
+)
+def test_if_modified_since_unusable(if_modified_since, last_modified):
+    assert not is_not_modified(_request(if_modified_since=if_modified_since), ETAG, last_modified)
+
+
+def test_no_validators():
+    assert not is_not_modified(_request(), ETAG, LAST_MODIFIED)
@@ -0,0 +1,66 @@
+"""地图池版本：修改地图池不影响已开始 BP 的房间"""
+import pytest
+from sqlalchemy import select, update
+
+from app.models import MapPool, Room, RoomStatus, User
+from app.services import bp_service, map_registry
+from app.services.bp_service import apply_operation, begin_draft, evict_engine, get_engine
+from app.services.bp_snapshot import invalidate_snapshot
+
+MAPS = ("Ancient", "Anubis", "Dust2", "Inferno", "Mirage", "Nuke", "Train")
+
+
+@pytest.fixture(autouse=True)
+async def clear_state():
+    bp_service._engines.clear()
+    await map_registry.invalidate()
+    yield
+    bp_service._engines.clear()
+    await map_registry.invalidate()
+
+
+async def _create_room(db) -> tuple:
+    room = Room(room_code="T0001", room_name="test", status=RoomStatus.PREPARING, max_players=10)
+    db.add(room)
+    await db.flush()
+    pool = MapPool(room_id=room.id, name="pool", maps=[{"name": name} for name in MAPS], is_default=False)
+    user_a = User(room_id=room.id, username="a", team="A")
+    db.add_all([pool, user_a, User(room_id=room.id, username="b", team="B")])
+    await db.commit()
+    invalidate_snapshot(room.id)
+    return room.id, pool.id, user_a.id
+
+
+async def _edit_pool(db, pool_id: int, maps) -> int:
+    """按 PUT /mappools/{id} 的方式写入新版本"""
+    current = await db.get(MapPool, pool_id)
+    new = MapPool(room_id=current.room_id, name=current.name, maps=[{"name": name} for name in maps])
+    db.add(new)
+    await db.flush()
+    await db.execute(update(MapPool).where(MapPool.id == pool_id).values(replaced_by=new.id))
+    await db.commit()
+    await map_registry.invalidate()
+    return new.id
+
+
+async def test_draft_keeps_pinned_pool_version(db):
+    room_id, pool_id, user_a = await _create_room(db)
+    await begin_draft(db, room_id, "A", {"A": 90, "B": 10})
+    await apply_operation(db, room_id, user_a, "ban", "Dust2")
+
+    bp_config = await db.scalar(select(Room.bp_config).where(Room.id == room_id))
+    assert bp_config[map_registry.PINNED_KEY] == pool_id
+
+    # 删除已被 Ban 的地图：新版本生效，但进行中的房间重新加载后仍按原版本回放
+    new_id = await _edit_pool(db, pool_id, [name for name in MAPS if name != "Dust2"] + ["Vertigo"])
+    evict_engine(room_id)
+    engine = await get_engine(db, room_id)
+
+    assert engine.maps == MAPS
+    assert engine.mappool_id == pool_id
+    assert [engine.maps[index] for index in engine.sequence] == ["Dust2"]
+
+    # 新房间和按旧 ID 解析时使用最新版本
+    latest = await map_registry.resolve_pool(db, str(pool_id))
+    assert latest.id == new_id
+    assert "Vertigo" in latest and "Dust2" not in latest
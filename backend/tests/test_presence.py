@@ -0,0 +1,109 @@
+"""跨进程在线状态：合并其他进程的在线用户"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import cluster
+from app.websocket import manager, presence
+from app.websocket.presence import HOST_ID, cluster_presence
+from app.websocket.spectators import spectator_fanout
+
+ROOM_ID = "1"
+
+
+def _user(user_id: int, username: str) -> dict:
+    return {"id": str(user_id), "username": username, "team": None, "role": "player", "is_ready": False}
+
+
+@pytest.fixture
+def published():
+    messages = []
+
+    async def publisher(message):
+        messages.append(message)
+
+    cluster.set_publisher(publisher)
+    yield messages
+    cluster.set_publisher(None)
+    cluster_presence.users.clear()
+    cluster_presence.seen.clear()
+    spectator_fanout._pending.clear()
+
+
+@pytest.fixture
+def local_user():
+    user = _user(1, "a")
+    manager.presence.setdefault(ROOM_ID, {})[1] = user
+    manager.add_connection(ROOM_ID, "sid-1", 1)
+    yield user
+    manager.remove_connection(ROOM_ID, "sid-1")
+
+
+async def _from_host(host: str, event: str, **data):
+    await cluster.dispatch({"event": event, "data": {"host": host, **data}})
+
+
+async def test_room_users_include_other_hosts(published, local_user):
+    await _from_host("b", "presence_joined", room_id=ROOM_ID, user=_user(2, "b"))
+    await _from_host("c", "presence_joined", room_id=ROOM_ID, user=_user(3, "c"))
+    assert sorted(user["username"] for user in manager.room_users(ROOM_ID)) == ["a", "b", "c"]
+
+    # HTTP 接口修改的信息同样同步到其他进程的用户
+    await cluster.dispatch({
+        "event": "identity_changed",
+        "data": {"room_id": ROOM_ID, "user_id": "2", "fields": {"team": "B"}},
+    })
+    assert cluster_presence.room_users(ROOM_ID)[2]["team"] == "B"
+
+    await _from_host("b", "presence_left", room_id=ROOM_ID, user_id=2)
+    await _from_host("c", "presence_down")
+    assert [user["username"] for user in manager.room_users(ROOM_ID)] == ["a"]
+    assert cluster_presence.users == {}
+
+
+async def test_sync_request_is_answered_with_snapshot(published, local_user):
+    await _from_host("b", "presence_sync")
+    assert published == [{
+        "event": "presence_snapshot",
+        "data": {"host": HOST_ID, "users": {ROOM_ID: [local_user]}, "spectators": {}},
+    }]
+
+    # 完整状态替换之前记录的该进程状态
+    await _from_host("b", "presence_joined", room_id=ROOM_ID, user=_user(2, "b"))
+    await _from_host("b", "presence_snapshot", users={"2": [_user(3, "c")]})
+    assert cluster_presence.users == {"2": {"b": {3: _user(3, "c")}}}
+
+
+async def test_own_messages_are_ignored(published):
+    await _from_host(HOST_ID, "presence_joined", room_id=ROOM_ID, user=_user(2, "b"))
+    assert cluster_presence.users == {}
+
+
+async def test_last_local_connection_publishes_left(published, local_user):
+    manager.add_connection(ROOM_ID, "sid-2", 1)
+
+    await manager.drop_connection(ROOM_ID, "sid-2")
+    assert published == []
+
+    await manager.drop_connection(ROOM_ID, "sid-1")
+    assert published == [{
+        "event": "presence_left",
+        "data": {"host": HOST_ID, "room_id": ROOM_ID, "user_id": 1},
+    }]
+
+
+async def test_silent_host_expires(published, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(presence, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    await _from_host("b", "presence_joined", room_id=ROOM_ID, user=_user(2, "b"))
+    await _from_host("c", "presence_joined", room_id=ROOM_ID, user=_user(3, "c"))
+
+    interval = presence.get_settings().CLUSTER_HEARTBEAT_INTERVAL
+    now[0] += 2 * interval
+    await _from_host("c", "presence_heartbeat")
+    now[0] += 2 * interval
+    cluster_presence.prune()
+
+    # b 连续 3 个心跳间隔没有消息
+    assert list(cluster_presence.room_users(ROOM_ID)) == [3]
+    assert list(cluster_presence.seen) == ["c"]
@@ -0,0 +1,95 @@
+"""Socket.IO 身份：事件处理使用会话中的身份，不逐条查询数据库"""
+import pytest
+
+from app.core import cluster
+from app.models import Room, RoomStatus, User
+from app.websocket import manager
+from app.websocket.spectators import spectator_fanout
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    events = []
+
+    async def emit(event, data, **kwargs):
+        events.append((event, data))
+
+    monkeypatch.setattr(manager.sio, "emit", emit)
+    return events
+
+
+@pytest.fixture
+async def identity(db, monkeypatch):
+    """模拟已通过 join_room 加入房间的连接"""
+    room = Room(room_code="T0001", room_name="test", status=RoomStatus.WAITING, max_players=10)
+    db.add(room)
+    await db.flush()
+    user = User(room_id=room.id, username="a", team="A")
+    db.add(user)
+    await db.commit()
+
+    room_id = str(room.id)
+    info = (await manager.get_users_info(db, room_id, {user.id}))[user.id]
+    manager.presence.setdefault(room_id, {})[user.id] = info
+    manager.add_connection(room_id, "sid-1", user.id)
+
+    async def get_session(sid):
+        return {"identities": {room_id: info}}
+
+    monkeypatch.setattr(manager.sio, "get_session", get_session)
+    yield room_id, info
+    manager.remove_connection(room_id, "sid-1")
+    spectator_fanout._pending.clear()
+
+
+def _no_db(monkeypatch):
+    async def get_db():
+        raise AssertionError("不应访问数据库")
+        yield
+
+    monkeypatch.setattr(manager, "get_db", get_db)
+
+
+async def test_select_team_broadcasts_session_identity(identity, sent, monkeypatch):
+    room_id, info = identity
+    _no_db(monkeypatch)
+
+    # HTTP 接口修改队伍后经集群总线更新会话中的身份
+    await cluster.dispatch({
+        "event": "identity_changed",
+        "data": {"room_id": int(room_id), "user_id": int(info["id"]), "fields": {"team": "B"}},
+    })
+    # 客户端提交的队伍不被信任
+    await manager.select_team("sid-1", {"room_id": room_id, "team": "A"})
+
+    assert sent == [("team_updated", {"room_id": room_id, "session_id": info["id"], "team": "B"})]
+
+
+async def test_ready_broadcasts_session_identity(identity, sent, monkeypatch):
+    room_id, info = identity
+    _no_db(monkeypatch)
+
+    await cluster.dispatch({
+        "event": "identity_changed",
+        "data": {"room_id": int(room_id), "user_id": int(info["id"]), "fields": {"is_ready": True}},
+    })
+    await manager.ready("sid-1", {"room_id": room_id, "is_ready": False})
+
+    assert sent == [("ready_updated", {"room_id": room_id, "session_id": info["id"], "is_ready": True})]
+
+
+async def test_rename_emits_user_updated(identity, sent, session_maker, monkeypatch):
+    room_id, info = identity
+
+    async def get_db():
+        async with session_maker() as session:
+            yield session
+
+    monkeypatch.setattr(manager, "get_db", get_db)
+
+    await manager.update_name("sid-1", {"room_id": room_id, "display_name": " renamed "})
+
+    assert sent == [("user_updated", {"room_id": room_id, "session_id": info["id"], "display_name": "renamed"})]
+    assert manager.presence[room_id][int(info["id"])]["username"] == "renamed"
+    async with session_maker() as session:
+        assert (await session.get(User, int(info["id"]))).username == "renamed"
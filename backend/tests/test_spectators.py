@@ -0,0 +1,142 @@
+"""观众推送：每个刷新周期每个房间只发送一条合并后的最新状态"""
+import pytest
+
+from app.core import cluster
+from app.core.config import get_settings
+from app.websocket import manager
+from app.websocket.presence import cluster_presence
+from app.websocket.spectators import SpectatorFanout, spectator_fanout
+
+
+async def _render(room_id, pending):
+    return {
+        "room_id": room_id,
+        "users": pending.users,
+        "bp": pending.bp,
+        "timer": pending.timer,
+        "chat": list(pending.chat),
+    }
+
+
+def _fanout(sent: list, rooms=("1", "2")) -> SpectatorFanout:
+    async def emit(room_id, payload):
+        sent.append(payload)
+
+    fanout = SpectatorFanout()
+    # 不启动定期任务，由测试手动 flush
+    fanout._render, fanout._emit = _render, emit
+    for room_id in rooms:
+        fanout.watch(room_id)
+    return fanout
+
+
+@pytest.fixture
+def published():
+    messages = []
+
+    async def publisher(message):
+        messages.append(message)
+
+    cluster.set_publisher(publisher)
+    yield messages
+    cluster.set_publisher(None)
+    cluster_presence.spectators.clear()
+    cluster_presence.seen.clear()
+
+
+async def test_events_are_coalesced_per_room():
+    sent = []
+    fanout = _fanout(sent)
+
+    for remaining in (30, 29, 28):
+        fanout.set_timer("1", remaining, 5)
+    fanout.mark_users("1")
+    fanout.mark_users("1")
+    fanout.mark_bp("1")
+    fanout.mark_users("2")
+
+    assert await fanout.flush() == 2
+    assert sorted(sent, key=lambda payload: payload["room_id"]) == [
+        {"room_id": "1", "users": True, "bp": True, "timer": (28, 5), "chat": []},
+        {"room_id": "2", "users": True, "bp": False, "timer": None, "chat": []},
+    ]
+
+    # 没有新的变化时不再发送
+    assert await fanout.flush() == 0
+    assert len(sent) == 2
+
+
+async def test_chat_batch_keeps_latest_messages():
+    sent = []
+    fanout = _fanout(sent)
+    batch = get_settings().SPECTATOR_CHAT_BATCH
+
+    for i in range(batch + 5):
+        fanout.add_chat("1", {"message": str(i)})
+
+    assert await fanout.flush() == 1
+    assert [message["message"] for message in sent[0]["chat"]] == [str(i) for i in range(5, batch + 5)]
+
+
+async def test_failed_room_does_not_block_others():
+    sent = []
+    fanout = _fanout(sent)
+
+    async def render(room_id, pending):
+        if room_id == "1":
+            raise RuntimeError("boom")
+        return await _render(room_id, pending)
+
+    fanout._render = render
+    fanout.mark_bp("1")
+    fanout.mark_bp("2")
+
+    assert await fanout.flush() == 1
+    assert [payload["room_id"] for payload in sent] == ["2"]
+
+
+async def test_rooms_without_spectators_are_skipped():
+    sent = []
+    rendered = []
+    fanout = _fanout(sent, rooms=("1",))
+
+    async def render(room_id, pending):
+        rendered.append(room_id)
+        return await _render(room_id, pending)
+
+    fanout._render = render
+    fanout.mark_bp("1")
+    fanout.mark_bp("2")
+    fanout.set_timer("2", 10, 1)
+    fanout.add_chat("2", {"message": "hi"})
+    assert list(fanout._pending) == ["1"]
+
+    # 刷新周期内观众全部离开的房间不再渲染
+    fanout.unwatch("1")
+    assert await fanout.flush() == 0
+    assert rendered == [] and sent == []
+
+
+async def test_spectators_on_other_hosts_count(published):
+    sent = []
+    fanout = _fanout(sent, rooms=())
+
+    await cluster.dispatch({"event": "spectators_changed", "data": {"host": "b", "room_id": "1", "count": 2}})
+    fanout.mark_bp("1")
+    assert await fanout.flush() == 1
+
+    await cluster.dispatch({"event": "spectators_changed", "data": {"host": "b", "room_id": "1", "count": 0}})
+    fanout.mark_bp("1")
+    assert await fanout.flush() == 0
+
+
+async def test_spectator_connections_update_count(published):
+    await manager.watch_room("sid-1", "1")
+    await manager.watch_room("sid-1", "1")  # 重复观看不重复计数
+    await manager.watch_room("sid-2", "1")
+    assert spectator_fanout.spectators == {"1": 2}
+
+    await manager.unwatch_room("sid-1", "1")
+    await manager.disconnect("sid-2")
+    assert spectator_fanout.spectators == {} and manager.spectating == {}
+    assert [message["data"]["count"] for message in published] == [1, 2, 1, 0]
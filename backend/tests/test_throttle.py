@@ -0,0 +1,164 @@
+"""登录限流"""
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api import admin
+from app.core import throttle
+from app.core.config import get_settings
+from app.core.throttle import FailureThrottle
+from app.core.deps import get_db
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(throttle, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_lockout_after_max_failures(clock):
+    limiter = FailureThrottle(max_failures=3, window=60)
+    for _ in range(2):
+        limiter.record_failure("admin")
+        clock.now += 1
+    assert limiter.retry_after("admin") == 0
+
+    limiter.record_failure("admin")
+    clock.now += 10
+    # 从第一次失败起算窗口
+    assert limiter.retry_after("admin") == pytest.approx(48)
+    assert limiter.retry_after("other") == 0
+
+
+def test_sliding_window(clock):
+    limiter = FailureThrottle(max_failures=2, window=60)
+    limiter.record_failure("admin")
+    clock.now += 30
+    limiter.record_failure("admin")
+
+    clock.now += 30
+    # 第一次失败已移出窗口
+    assert limiter.retry_after("admin") == 0
+    limiter.record_failure("admin")
+    assert limiter.retry_after("admin") == pytest.approx(30)
+
+    clock.now += 60
+    assert limiter.retry_after("admin") == 0
+    assert "admin" not in limiter._failures
+
+
+def test_reset(clock):
+    limiter = FailureThrottle(max_failures=1, window=60)
+    limiter.record_failure("admin")
+    assert limiter.retry_after("admin") > 0
+
+    limiter.reset("admin")
+    assert limiter.retry_after("admin") == 0
+
+
+def test_tracked_keys_are_bounded(clock, monkeypatch):
+    monkeypatch.setattr(throttle, "MAX_TRACKED_KEYS", 2)
+    limiter = FailureThrottle(max_failures=1, window=60)
+    for key in ("a", "b", "c"):
+        limiter.record_failure(key)
+
+    assert list(limiter._failures) == ["b", "c"]
+
+
+async def _no_db():
+    yield None
+
+
+class _NoAdminSession:
+    """查询结果始终为空的会话"""
+
+    async def execute(self, statement):
+        return SimpleNamespace(scalar_one_or_none=lambda: None)
+
+
+async def _no_admin_db():
+    yield _NoAdminSession()
+
+
+async def test_login_rejected_with_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(admin, "username_throttle", FailureThrottle(max_failures=2, window=300))
+    monkeypatch.setattr(admin, "ip_throttle", FailureThrottle(max_failures=20, window=300))
+    admin.username_throttle.record_failure("admin")
+    admin.username_throttle.record_failure("admin")
+    clock.now += 100.5
+
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/admin")
+    # 被限流时在访问数据库之前拒绝
+    app.dependency_overrides[get_db] = _no_db
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/api/admin/login", json={"username": "admin", "password": "x"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "200"
+
+
+async def _bad_password(request, password_hash):
+    return False
+
+
+async def test_ip_limit_uses_forwarded_ip_from_trusted_proxy(clock, monkeypatch):
+    monkeypatch.setattr(get_settings(), "TRUSTED_PROXIES", ["127.0.0.0/8"])
+    monkeypatch.setattr(admin, "username_throttle", FailureThrottle(max_failures=100, window=300))
+    monkeypatch.setattr(admin, "ip_throttle", FailureThrottle(max_failures=2, window=300))
+    monkeypatch.setattr(admin, "verify_password_async", _bad_password)
+
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/admin")
+    app.dependency_overrides[get_db] = _no_admin_db
+
+    async def login(client, forwarded_ip):
+        return await client.post(
+            "/api/admin/login",
+            json={"username": "admin", "password": "x"},
+            headers={"X-Real-IP": forwarded_ip},
+        )
+
+    # 所有请求都经由同一个代理地址转发
+    transport = ASGITransport(app=app, client=("127.0.0.1", 50000))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert [(await login(client, "203.0.113.1")).status_code for _ in range(3)] == [401, 401, 429]
+        # 其他客户端不受影响
+        assert (await login(client, "203.0.113.2")).status_code == 401
+
+    assert set(admin.ip_throttle._failures) == {"203.0.113.1", "203.0.113.2"}
+
+
+async def test_forwarded_ip_ignored_from_untrusted_peer(clock, monkeypatch):
+    monkeypatch.setattr(get_settings(), "TRUSTED_PROXIES", ["127.0.0.0/8"])
+    monkeypatch.setattr(admin, "ip_throttle", FailureThrottle(max_failures=2, window=300))
+    monkeypatch.setattr(admin, "verify_password_async", _bad_password)
+
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/admin")
+    app.dependency_overrides[get_db] = _no_admin_db
+
+    # 直连客户端伪造 X-Real-IP 不能绕过 IP 限流
+    transport = ASGITransport(app=app, client=("198.51.100.7", 50000))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        for forwarded_ip in ("203.0.113.1", "203.0.113.2"):
+            await client.post(
+                "/api/admin/login",
+                json={"username": forwarded_ip, "password": "x"},
+                headers={"X-Real-IP": forwarded_ip},
+            )
+
+    assert list(admin.ip_throttle._failures) == ["198.51.100.7"]
+    assert admin.ip_throttle.retry_after("198.51.100.7") > 0
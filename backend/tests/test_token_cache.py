@@ -0,0 +1,87 @@
+"""令牌缓存：注销与禁用通过集群总线在所有进程生效"""
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from app.core import cluster, token_cache
+from app.core.security import create_access_token, get_current_user
+from app.models import Admin
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    token_cache._entries.clear()
+    token_cache._tokens_by_admin.clear()
+    token_cache._revoked.clear()
+    yield
+    token_cache._entries.clear()
+    token_cache._tokens_by_admin.clear()
+    token_cache._revoked.clear()
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """本进程发往其他进程的消息"""
+    messages = []
+
+    async def publisher(message):
+        messages.append(message)
+
+    monkeypatch.setattr(cluster, "_publisher", publisher)
+    return messages
+
+
+async def _create_admin(db) -> str:
+    db.add(Admin(username="admin", password_hash="x", is_active=True))
+    await db.commit()
+    return create_access_token({"sub": "admin"})
+
+
+async def test_cached_token_skips_database(db):
+    token = await _create_admin(db)
+    principal = await get_current_user(token, db)
+
+    # 缓存命中时不访问数据库
+    assert await get_current_user(token, None) == principal
+
+
+async def test_revoke_is_published_to_other_workers(db, published):
+    token = await _create_admin(db)
+    await get_current_user(token, db)
+
+    expires_at = time.time() + 60
+    await token_cache.revoke_token(token, expires_at)
+
+    assert published == [{"event": "token_revoked", "data": {"token": token, "expires_at": expires_at}}]
+    with pytest.raises(HTTPException):
+        await get_current_user(token, None)
+
+
+async def test_token_revoked_on_another_worker(db):
+    token = await _create_admin(db)
+    await get_current_user(token, db)
+
+    # 其他进程注销令牌，消息经集群总线到达本进程
+    await cluster.dispatch({"event": "token_revoked", "data": {"token": token, "expires_at": time.time() + 60}})
+
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(token, None)
+    assert exc.value.status_code == 401
+
+
+async def test_admin_revoked_on_another_worker(db):
+    token = await _create_admin(db)
+    await get_current_user(token, db)
+
+    await db.execute(update(Admin).where(Admin.username == "admin").values(is_active=False))
+    await db.commit()
+    # 禁用前缓存的令牌仍然有效，直到收到集群通知
+    assert await get_current_user(token, None) == {"id": 1, "username": "admin"}
+
+    await cluster.dispatch({"event": "admin_revoked", "data": {"username": "admin"}})
+
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(token, db)
+    assert exc.value.status_code == 403
@@ -5,6 +5,8 @@ const WS_BASE_URL = import.meta.env.VITE_WS_BASE_URL || 'http://localhost:8000';
 class SocketService {
   private socket: Socket | null = null;
   private listeners: Map<string, Function[]> = new Map();
+  // 每个房间最近应用的 BP 版本号，用于发现增量缺失
+  private bpVersions: Map<string, number> = new Map();
 
   connect(roomId: string, sessionId: string): void {
     if (this.socket) {
@@ -25,6 +27,7 @@ class SocketService {
       this.socket = null;
     }
     this.listeners.clear();
+    this.bpVersions.clear();
   }
 
   private setupEventListeners(): void {
@@ -40,6 +43,11 @@ class SocketService {
       this.emit('user_left', data);
     });
 
+    // 用户信息更新（改名）
+    this.socket.on('user_updated', (data) => {
+      this.emit('user_updated', data);
+    });
+
     // 队伍信息更新
     this.socket.on('team_updated', (data) => {
       this.emit('team_updated', data);
@@ -65,6 +73,26 @@ class SocketService {
       this.emit('map_picked', data);
     });
 
+    // BP 增量（版本号不连续时请求完整状态）
+    this.socket.on('bp_delta', (data) => {
+      const last = this.bpVersions.get(data.room_id);
+      if (last !== undefined && data.version <= last) {
+        return;
+      }
+      if (last !== undefined && data.version !== last + 1) {
+        this.emitBPResync(data.room_id);
+        return;
+      }
+      this.bpVersions.set(data.room_id, data.version);
+      this.emit('bp_delta', data);
+    });
+
+    // 完整 BP 状态
+    this.socket.on('bp_state', (data) => {
+      this.bpVersions.set(data.room_id, data.bp_state?.version ?? 0);
+      this.emit('bp_state', data);
+    });
+
     // 计时器更新
     this.socket.on('timer_tick', (data) => {
       this.emit('timer_tick', data);
@@ -142,6 +170,10 @@ class SocketService {
     this.socket?.emit('pick_map', { room_id: roomId, session_id: sessionId, map_id: mapId });
   }
 
+  emitBPResync(roomId: string): void {
+    this.socket?.emit('bp_resync', { room_id: roomId });
+  }
+
   emitSendChat(roomId: string, sessionId: string, content: string): void {
     this.socket?.emit('send_chat', { room_id: roomId, session_id: sessionId, content });
   }